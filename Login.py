@@ -1,7 +1,11 @@
+import startup_profile
+startup_profile.begin(__file__)
 import streamlit as st
-import pandas as pd
+from pymongo.errors import PyMongoError
 from db_connection import get_collections
-import bcrypt
+from auth import verify_password, needs_rehash, rehash_in_background, AuthBusyError
+from metrics import timed
+startup_profile.imports_done()
 
 st.set_page_config(
     page_title="Login - App de vagas",
@@ -19,6 +23,7 @@ if 'logged_in' not in st.session_state:
 
 
 #--- Funções de autenticação ---
+@timed()
 def login_user(email, password):
     """
     Verifica credenciais e retorna os dados do usuário se válido.
@@ -28,13 +33,30 @@ def login_user(email, password):
         st.error("Erro de conexão com o banco.")
         return None
 
-    #Busca o usuário pelo email
-    user_data = col_usuarios.find_one({"email": email})
+    #Busca o usuário pelo email (a conexão é preguiçosa: falhas do cluster aparecem aqui)
+    try:
+        user_data = col_usuarios.find_one({"email": email})
+    except PyMongoError as e:
+        st.error(f"Erro de conexão com o banco: {e}")
+        return None
 
     if user_data:
-        #Verifica a senha (bcrypt lida com o formato Binary do MongoDB automaticamente)
+        #Verifica a senha no pool de autenticação (bcrypt fora do thread do script)
         stored_hash = user_data['password_hash']
-        if bcrypt.checkpw(password.encode('utf-8'), stored_hash):
+        try:
+            senha_ok = verify_password(password, stored_hash)
+        except AuthBusyError as e:
+            st.warning(str(e))
+            return None
+
+        if senha_ok:
+            #Hash com custo antigo: atualiza para o BCRYPT_ROUNDS atual em segundo plano
+            if needs_rehash(stored_hash):
+                user_id = user_data['_id']
+                rehash_in_background(
+                    password,
+                    lambda novo_hash: col_usuarios.update_one({"_id": user_id}, {"$set": {"password_hash": novo_hash}})
+                )
             return user_data
 
     return None
@@ -98,4 +120,6 @@ else:
 
             st.rerun()
         else:
-            st.error("Email ou senha incorretos.")
\ No newline at end of file
+            st.error("Email ou senha incorretos.")
+
+startup_profile.rendered()
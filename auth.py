@@ -0,0 +1,145 @@
+"""
+Hash e verificação de senhas (bcrypt) em um pool de processos limitado.
+
+O bcrypt é propositalmente caro em CPU. Rodando no thread do script do Streamlit, um pico de
+logins enfileira todas as sessões atrás dos hashes; aqui eles vão para um pool com no máximo
+AUTH_WORKERS processos e AUTH_MAX_PENDING pedidos em voo.
+
+Este módulo não importa o db_connection no topo: os processos do pool só precisam do bcrypt.
+O bcrypt também é importado só dentro das funções do pool (as páginas que importam este
+módulo só para cadastrar/logar não pagam o import no carregamento).
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from metrics import timed
+
+#Custo padrão do bcrypt (2^12 iterações), o mesmo do bcrypt.gensalt()
+DEFAULT_BCRYPT_ROUNDS = 12
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = None
+
+
+class AuthBusyError(RuntimeError):
+    """O pool de autenticação está saturado (muitos pedidos em voo)."""
+
+
+def _settings():
+    #Import tardio: evita carregar o Streamlit nos processos do pool
+    from db_connection import get_config
+    return {
+        "rounds": int(get_config("BCRYPT_ROUNDS", DEFAULT_BCRYPT_ROUNDS)),
+        "workers": int(get_config("AUTH_WORKERS", os.cpu_count() or 1)),
+        "max_pending": int(get_config("AUTH_MAX_PENDING", 64)),
+        "timeout": float(get_config("AUTH_TIMEOUT_SECONDS", 10))
+    }
+
+
+def _hashpw(password_bytes, rounds):
+    import bcrypt
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds=rounds))
+
+
+def _checkpw(password_bytes, stored_hash):
+    import bcrypt
+    return bcrypt.checkpw(password_bytes, stored_hash)
+
+
+def _get_executor():
+    global _executor, _pending
+    with _executor_lock:
+        if _executor is None:
+            settings = _settings()
+            _pending = threading.BoundedSemaphore(settings["max_pending"])
+            try:
+                _executor = ProcessPoolExecutor(max_workers=settings["workers"])
+            except (OSError, NotImplementedError) as e:
+                #Ambiente sem suporte a processos: cai para execução no próprio thread
+                print(f"⚠️ Pool de autenticação indisponível, usando execução local: {e}")
+                _executor = False
+        return _executor
+
+
+def _run(fn, *args):
+    """Executa fn no pool, respeitando o limite de pedidos em voo."""
+    executor = _get_executor()
+    if executor is False:
+        return fn(*args)
+
+    timeout = _settings()["timeout"]
+    if not _pending.acquire(timeout=timeout):
+        raise AuthBusyError("Muitos logins simultâneos. Tente novamente em instantes.")
+    try:
+        future = executor.submit(fn, *args)
+    except Exception:
+        _pending.release()
+        raise
+    #A vaga só é devolvida quando o pool termina a tarefa (mesmo que o chamador desista antes)
+    future.add_done_callback(lambda _: _pending.release())
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise AuthBusyError("O servidor está ocupado. Tente novamente em instantes.") from None
+
+
+def _as_bytes(stored_hash):
+    return stored_hash.encode("utf-8") if isinstance(stored_hash, str) else bytes(stored_hash)
+
+
+def hash_rounds(stored_hash):
+    """Custo (rounds) gravado no hash: b"$2b$12$..." -> 12."""
+    try:
+        return int(_as_bytes(stored_hash).split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+@timed("bcrypt_hash")
+def hash_password(password):
+    """Gera o hash bcrypt da senha com o custo configurado (BCRYPT_ROUNDS)."""
+    return _run(_hashpw, password.encode("utf-8"), _settings()["rounds"])
+
+
+@timed("bcrypt_verify")
+def verify_password(password, stored_hash):
+    """Confere a senha contra o hash salvo (bcrypt lida com o formato Binary do MongoDB)."""
+    return _run(_checkpw, password.encode("utf-8"), _as_bytes(stored_hash))
+
+
+def needs_rehash(stored_hash):
+    """True se o hash foi gerado com um custo diferente do configurado."""
+    return hash_rounds(stored_hash) != _settings()["rounds"]
+
+
+def rehash_in_background(password, on_done):
+    """
+    Gera um novo hash com o custo atual sem bloquear o chamador.
+    on_done(novo_hash) é chamado quando o hash fica pronto; falhas são só registradas
+    (o hash antigo continua válido). Com o pool saturado, o rehash é descartado.
+    """
+    executor = _get_executor()
+    rounds = _settings()["rounds"]
+    if executor is False:
+        on_done(_hashpw(password.encode("utf-8"), rounds))
+        return
+
+    #Mesmo limite de pedidos em voo dos logins; com o pool cheio o rehash fica para o próximo login
+    if not _pending.acquire(blocking=False):
+        return
+
+    def _callback(future):
+        _pending.release()
+        try:
+            on_done(future.result())
+        except Exception as e:
+            print(f"⚠️ Falha ao atualizar o hash da senha: {e}")
+
+    try:
+        future = executor.submit(_hashpw, password.encode("utf-8"), rounds)
+    except Exception as e:
+        _pending.release()
+        print(f"⚠️ Falha ao atualizar o hash da senha: {e}")
+        return
+    future.add_done_callback(_callback)
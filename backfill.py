@@ -0,0 +1,84 @@
+"""
+Backfill de embeddings: gera o vetor dos documentos que ainda não têm `embedding`.
+
+A página "Gerar embeddings faltantes" cuida da interface (progresso, logs, espera entre
+tentativas); a busca dos pendentes e a gravação de cada lote ficam aqui, sem dependência
+de UI, para poderem ser medidas pelos benchmarks.
+"""
+from pymongo import UpdateOne
+from db_connection import (
+    create_embeddings_batch, get_embedding_provider, store_embedding, EMBEDDING_MODEL, CAMPOS_FILA_EMBEDDING
+)
+
+#Campos usados para montar o texto vetorizado de cada coleção
+CAMPOS_TEXTO = {
+    "vagas": ['titulo', 'descricao', 'skills', 'empresa', 'tipo_contratacao'],
+    "curriculos": ['formacao', 'experiencia', 'resumo', 'skills', 'idiomas']
+}
+
+#Pendentes: onde não existe OU onde é uma lista vazia []
+QUERY_PENDENTES = {"$or": [{"embedding": {"$exists": False}}, {"embedding": []}]}
+
+
+def montar_texto(doc, campos_texto):
+    """Monta o texto que será vetorizado a partir dos campos do documento."""
+    partes = []
+    for campo in campos_texto:
+        valor = doc.get(campo, "")
+        if isinstance(valor, list):
+            valor = ", ".join(valor)
+        partes.append(f"{str(campo).capitalize()}: {valor}")
+    return ". ".join(partes)
+
+
+def tempo_de_espera(tentativas):
+    """Backoff usado quando a API falha (cota estourada ou erro)."""
+    if tentativas == 1:
+        return 60
+    elif tentativas <= 3:
+        return 300
+    return 3600
+
+
+def query_outro_modelo(modelo):
+    """Documentos com vetor de um modelo diferente (sem `embedding_modelo` = vetor antigo do Gemini)."""
+    if modelo == EMBEDDING_MODEL:
+        return {"embedding_modelo": {"$exists": True, "$ne": modelo}}
+    return {"embedding_modelo": {"$ne": modelo}}
+
+
+def buscar_pendentes(collection, campos_texto, modelo=None):
+    """
+    Documentos sem embedding, em ordem de id, só com os campos necessários para o texto.
+    Com `modelo`, inclui também os vetorizados por outro modelo (troca de provedor).
+    """
+    query = QUERY_PENDENTES
+    if modelo:
+        query = {"$or": QUERY_PENDENTES["$or"] + [query_outro_modelo(modelo)]}
+    #Projeção: nunca trazemos vetores
+    projecao = {campo: 1 for campo in campos_texto}
+    projecao.update({"id": 1, "titulo": 1, "nome": 1})
+    return list(collection.find(query, projecao).sort("id", 1))
+
+
+def processar_lote(collection, lote, campos_texto, rate_limiter=None):
+    """
+    Gera os vetores de um lote e grava tudo com um único bulk_write.
+    Retorna quantos documentos foram salvos, ou None se o provedor falhou (o chamador decide a espera).
+    """
+    modelo = get_embedding_provider().name
+    textos = [montar_texto(doc, campos_texto) for doc in lote]
+    vectors = create_embeddings_batch(textos, rate_limiter=rate_limiter)
+    if not vectors:
+        return None
+
+    operacoes = [
+        UpdateOne({"_id": doc["_id"]}, {
+            "$set": {"embedding": store_embedding(vector), "embedding_modelo": modelo},
+            "$currentDate": {"embedding_atualizado_em": True},  #Marca d'água do índice local
+            "$unset": CAMPOS_FILA_EMBEDDING  #Sai da fila do embedding_worker, se estava nela
+        })
+        for doc, vector in zip(lote, vectors)
+    ]
+    collection.bulk_write(operacoes, ordered=False)
+    return len(operacoes)
@@ -0,0 +1,4 @@
+"""
+Ferramentas de benchmark e de estresse do LabBD_App.
+Cada módulo roda sozinho com `python -m benchmarks.<modulo>`.
+"""
@@ -0,0 +1,63 @@
+"""
+Compara dois resultados de `benchmarks.run` (ex: antes e depois de um commit).
+
+Uso:
+    python -m benchmarks.compare antes.json depois.json
+    python -m benchmarks.compare antes.json depois.json --limite 10 --falhar
+Com --falhar, sai com código 1 se algum caso ficou mais lento que o limite (em %).
+"""
+import argparse
+import json
+
+
+def carregar(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def comparar(antes, depois, limite):
+    """Lista (tamanho, caso, antes_ms, depois_ms, variação %, regressão?) dos casos presentes nos dois."""
+    linhas = []
+    for tamanho, casos in depois["resultados"].items():
+        casos_antes = antes["resultados"].get(tamanho, {})
+        for nome, medida in casos.items():
+            anterior = casos_antes.get(nome)
+            if not isinstance(medida, dict) or not isinstance(anterior, dict):
+                continue
+            if "mediana_ms" in medida and "mediana_ms" in anterior:
+                a, d = anterior["mediana_ms"], medida["mediana_ms"]
+                variacao = (d - a) / a * 100.0 if a else 0.0
+                linhas.append((tamanho, nome, a, d, variacao, variacao > limite))
+            elif "docs_por_segundo" in medida and "docs_por_segundo" in anterior:
+                #Vazão: maior é melhor, então a regressão é a queda
+                a, d = anterior["docs_por_segundo"], medida["docs_por_segundo"]
+                variacao = (a - d) / a * 100.0 if a else 0.0
+                linhas.append((tamanho, nome, a, d, variacao, variacao > limite))
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois JSONs de benchmarks.run.")
+    parser.add_argument("antes")
+    parser.add_argument("depois")
+    parser.add_argument("--limite", type=float, default=10.0, help="Piora (%%) tolerada antes de acusar regressão.")
+    parser.add_argument("--falhar", action="store_true", help="Sai com código 1 se houver regressão.")
+    args = parser.parse_args()
+
+    antes, depois = carregar(args.antes), carregar(args.depois)
+    print(f"antes:  {antes.get('commit')}\ndepois: {depois.get('commit')}")
+    print("(variação positiva = mais lento; no backfill, queda de docs/s)\n")
+
+    linhas = comparar(antes, depois, args.limite)
+    print(f"{'tamanho':>8} | {'caso':<32} | {'antes':>12} | {'depois':>12} | {'variação':>9}")
+    for tamanho, nome, a, d, variacao, regressao in linhas:
+        marca = " ⚠️" if regressao else ""
+        print(f"{tamanho:>8} | {nome:<32} | {a:12.2f} | {d:12.2f} | {variacao:+8.1f}%{marca}")
+
+    regressoes = [linha for linha in linhas if linha[5]]
+    print(f"\n{len(regressoes)} regressão(ões) acima de {args.limite:.0f}%.")
+    return 1 if args.falhar and regressoes else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+"""
+Verificação do custo de importar o db_connection (cold start das páginas).
+
+Cada medição roda em um interpretador novo (sem nada em sys.modules): primeiro importa o
+Streamlit (custo fixo de toda página), depois o módulo medido. Falha (código 1) se:
+- o import do módulo, descontado o Streamlit, passar do orçamento (menor tempo das repetições);
+- o import carregar alguma dependência que deveria ser tardia (SDK do Google, NumPy, pandas, bcrypt...).
+
+Uso:
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --orcamento-ms 500 --repeticoes 5
+    python -m benchmarks.import_budget --modulo listings --modulo auth
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+#Não podem ser carregados só por importar os módulos medidos (são importados no primeiro uso)
+PROIBIDOS = ("google.generativeai", "sentence_transformers", "onnxruntime", "torch", "numpy", "pandas", "bcrypt", "pyarrow")
+
+#Roda no processo filho; imprime uma linha JSON
+_SCRIPT = """
+import json, sys, time
+inicio = time.perf_counter()
+import streamlit
+base = set(sys.modules)
+meio = time.perf_counter()
+import {modulo}
+fim = time.perf_counter()
+print(json.dumps({{
+    "streamlit_ms": 1000.0 * (meio - inicio),
+    "modulo_ms": 1000.0 * (fim - meio),
+    "novos": sorted(set(sys.modules) - base)
+}}))
+"""
+
+
+def _parse_importtime(stderr, novos, top):
+    """Maiores tempos cumulativos do `-X importtime` entre os módulos carregados depois do Streamlit, em ms."""
+    novos = set(novos)
+    cumulativos = {}
+    for linha in stderr.splitlines():
+        if not linha.startswith("import time:") or linha.count("|") != 2:
+            continue
+        _, cumulativo, nome = linha[len("import time:"):].split("|")
+        if not cumulativo.strip().isdigit():
+            continue  #Cabeçalho
+        #A indentação indica o nível (2 espaços = topo): o módulo medido e os imports diretos dele
+        nivel = len(nome) - len(nome.lstrip(" "))
+        nome = nome.strip()
+        if nome in novos and nivel <= 4:
+            cumulativos[nome] = max(cumulativos.get(nome, 0), int(cumulativo) / 1000.0)
+    return sorted(cumulativos.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def medir(modulo, raiz):
+    """Importa `modulo` em um interpretador novo; retorna (medida, linhas do -X importtime)."""
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SCRIPT.format(modulo=modulo)],
+        cwd=raiz, capture_output=True, text=True
+    )
+    if processo.returncode != 0:
+        erro = [l for l in processo.stderr.splitlines() if not l.startswith("import time:")]
+        raise RuntimeError(f"falha ao importar {modulo}:\n" + "\n".join(erro[-10:]))
+    return json.loads(processo.stdout.strip().splitlines()[-1]), processo.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orçamento de tempo do import do db_connection.")
+    parser.add_argument("--modulo", action="append", default=None,
+                        help="Módulo a medir (pode repetir; padrão: db_connection).")
+    parser.add_argument("--orcamento-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", 1000)),
+                        help="Tempo máximo do import, sem contar o Streamlit (padrão: IMPORT_BUDGET_MS ou 1000).")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Processos por módulo (vale o menor tempo).")
+    parser.add_argument("--top", type=int, default=10, help="Quantos imports mais caros listar.")
+    args = parser.parse_args()
+
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    falhou = False
+    for modulo in args.modulo or ["db_connection"]:
+        medidas = []
+        for _ in range(max(1, args.repeticoes)):
+            medidas.append(medir(modulo, raiz))
+        #Menor tempo: a primeira execução ainda paga o cache de disco / compilação dos .pyc
+        medida, stderr = min(medidas, key=lambda m: m[0]["modulo_ms"])
+
+        proibidos = sorted({p for p in PROIBIDOS for nome in medida["novos"] if nome == p or nome.startswith(p + ".")})
+        estourou = medida["modulo_ms"] > args.orcamento_ms
+        falhou = falhou or estourou or bool(proibidos)
+
+        print(f"{'❌' if estourou or proibidos else '✅'} import {modulo}: {medida['modulo_ms']:.0f} ms "
+              f"(orçamento {args.orcamento_ms:.0f} ms; streamlit antes: {medida['streamlit_ms']:.0f} ms)")
+        if proibidos:
+            print(f"   carregou dependências que deveriam ser tardias: {', '.join(proibidos)}")
+        print("   imports mais caros (cumulativo):")
+        for nome, ms in _parse_importtime(stderr, medida["novos"], args.top):
+            print(f"     {ms:8.1f} ms  {nome}")
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+"""
+Benchmark de logins/s do módulo auth com 1, 8 e 32 sessões simultâneas.
+
+Cada sessão é um thread que verifica a senha em loop (como sessões do Streamlit fazendo login).
+Compara o pool de processos (auth.verify_password) com o bcrypt direto no thread (modo antigo).
+
+Uso:
+    python -m benchmarks.login_throughput
+    python -m benchmarks.login_throughput --sessions 1 8 32 --duration 5 --rounds 12
+"""
+import argparse
+import os
+import time
+import threading
+import bcrypt
+
+
+def medir(verify, sessions, duration):
+    """Roda `sessions` threads verificando senhas por `duration` segundos; retorna logins/s."""
+    contador = [0]
+    lock = threading.Lock()
+    fim = time.perf_counter() + duration
+
+    def sessao():
+        feitos = 0
+        while time.perf_counter() < fim:
+            verify()
+            feitos += 1
+        with lock:
+            contador[0] += feitos
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=sessao) for _ in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return contador[0] / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de logins/s (bcrypt).")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0, help="Segundos por medição.")
+    parser.add_argument("--rounds", type=int, default=12, help="Custo do bcrypt.")
+    args = parser.parse_args()
+
+    #O auth lê a configuração do ambiente quando não há secrets.toml
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ.setdefault("AUTH_MAX_PENDING", str(max(args.sessions) * 2))
+    import auth
+
+    senha = "senha-de-teste"
+    stored_hash = bcrypt.hashpw(senha.encode("utf-8"), bcrypt.gensalt(rounds=args.rounds))
+
+    modos = {
+        "thread do script": lambda: bcrypt.checkpw(senha.encode("utf-8"), stored_hash),
+        "pool (auth)": lambda: auth.verify_password(senha, stored_hash)
+    }
+
+    auth.verify_password(senha, stored_hash)  #Aquece o pool (cria os processos)
+    print(f"bcrypt rounds={args.rounds} | CPUs={os.cpu_count()} | {args.duration:.0f}s por medição")
+    print(f"{'sessões':>8} | " + " | ".join(f"{nome:>18}" for nome in modos))
+    for sessions in args.sessions:
+        linha = [f"{medir(verify, sessions, args.duration):14.1f} l/s" for verify in modos.values()]
+        print(f"{sessions:>8} | " + " | ".join(f"{v:>18}" for v in linha))
+
+
+if __name__ == "__main__":
+    main()
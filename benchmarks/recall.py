@@ -0,0 +1,146 @@
+"""
+Recall@k x latência da busca em dois estágios (pré-filtro reduzido + reordenação) contra a busca exata.
+
+Para cada redução (truncado:<d> e pca:<d>) e cada fator de shortlist, roda as mesmas consultas no
+LocalVectorIndex e mede:
+- recall@k: fração do top-k exato que o modo dois_estagios também devolveu;
+- latência por consulta (mediana e p95), comparada com a da busca exata.
+
+Fontes dos vetores:
+- "mongo": os embeddings reais de uma coleção (MONGO_URI/MONGO_DB), com consultas tiradas da outra
+  coleção (ex: currículos procurando vagas), que é o que define a escolha da redução;
+- "sintetico": vetores agrupados com espectro decrescente (aproximação grosseira de embeddings de texto,
+  só para testar o script sem banco).
+
+Uso:
+    python -m benchmarks.recall --fonte mongo --colecao vagas --k 10
+    python -m benchmarks.recall --fonte sintetico --n 100000 --output recall.json
+"""
+import argparse
+import json
+import statistics
+import time
+import numpy as np
+from vector_index import LocalVectorIndex, EMBEDDING_DIM
+from embedding_reduction import Reducao, ajustar_pca
+
+
+def vetores_sinteticos(rng, n, dim=EMBEDDING_DIM, grupos=200, ruido=0.6):
+    """Vetores em torno de `grupos` centros, com a variância concentrada nas primeiras dimensões."""
+    espectro = (1.0 / np.sqrt(1.0 + np.arange(dim) / 32.0)).astype(np.float32)
+    centros = rng.standard_normal((grupos, dim), dtype=np.float32) * espectro
+    matriz = centros[rng.integers(grupos, size=n)] + ruido * rng.standard_normal((n, dim), dtype=np.float32) * espectro
+    return matriz / np.linalg.norm(matriz, axis=1, keepdims=True)
+
+
+def carregar_mongo(colecao, consultas_colecao, n_consultas, seed):
+    """(matriz da coleção, matriz de consultas) a partir dos embeddings salvos."""
+    from db_connection import get_db, SEARCH_TARGETS
+    from embedding_storage import unpack_embedding, EMBEDDING_PRESENTE
+
+    db = get_db(read_only=True)
+    if db is None:
+        raise SystemExit("❌ Erro crítico: não conectou ao MongoDB.")
+
+    def _matriz(cursor):
+        vetores = [unpack_embedding(doc["embedding"]) for doc in cursor]
+        vetores = [v for v in vetores if v is not None and v.shape == (EMBEDDING_DIM,)]
+        return np.array(vetores, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+
+    base = _matriz(db[SEARCH_TARGETS[colecao]["collection"]].find(EMBEDDING_PRESENTE, {"embedding": 1}))
+    consultas = _matriz(db[SEARCH_TARGETS[consultas_colecao]["collection"]].aggregate([
+        {"$match": EMBEDDING_PRESENTE}, {"$sample": {"size": n_consultas}}, {"$project": {"embedding": 1}}
+    ]))
+    return base, consultas
+
+
+def montar_indice(matriz):
+    index = LocalVectorIndex(lambda: None, {}, refresh_interval=float("inf"))
+    for i, vetor in enumerate(matriz):
+        index.upsert({"_id": i, "embedding": vetor})
+    return index
+
+
+def medir_consultas(busca, consultas):
+    """(resultados, latências em ms) de busca(q) para cada consulta."""
+    resultados, tempos = [], []
+    for q in consultas:
+        inicio = time.perf_counter()
+        resultados.append({r["_id"] for r in busca(q)})
+        tempos.append(1000.0 * (time.perf_counter() - inicio))
+    return resultados, tempos
+
+
+def resumo_tempos(tempos):
+    ordenados = sorted(tempos)
+    return {
+        "mediana_ms": statistics.median(ordenados),
+        "p95_ms": ordenados[min(len(ordenados) - 1, int(0.95 * len(ordenados)))]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k x latência da busca em dois estágios.")
+    parser.add_argument("--fonte", choices=("mongo", "sintetico"), default="sintetico")
+    parser.add_argument("--colecao", choices=("vagas", "curriculos"), default="vagas",
+                        help="Coleção pesquisada (fonte mongo); as consultas vêm da outra.")
+    parser.add_argument("--n", type=int, default=50000, help="Vetores (fonte sintetico).")
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--truncado", type=int, nargs="+", default=[64, 128, 256])
+    parser.add_argument("--pca", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--fatores", type=int, nargs="+", default=[5, 10, 20], help="shortlist = fator x k.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Arquivo JSON com o relatório.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.fonte == "mongo":
+        outra = "curriculos" if args.colecao == "vagas" else "vagas"
+        base, consultas = carregar_mongo(args.colecao, outra, args.consultas, args.seed)
+    else:
+        base = vetores_sinteticos(rng, args.n)
+        consultas = vetores_sinteticos(np.random.default_rng(args.seed + 1), args.consultas)
+    if len(base) <= args.k or len(consultas) == 0:
+        raise SystemExit("❌ Vetores insuficientes para o relatório.")
+    print(f"📦 {len(base)} vetores, {len(consultas)} consultas, k={args.k}")
+
+    index = montar_indice(base)
+    exatos, tempos_exatos = medir_consultas(lambda q: index.search(q, args.k), consultas)
+    exato = resumo_tempos(tempos_exatos)
+    print(f"{'modo':<16}{'shortlist':>10}{'recall@k':>10}{'mediana ms':>12}{'p95 ms':>10}{'speedup':>9}")
+    print(f"{'exato':<16}{'-':>10}{1.0:>10.3f}{exato['mediana_ms']:>12.2f}{exato['p95_ms']:>10.2f}{1.0:>9.2f}")
+
+    reducoes = [Reducao("truncado", d) for d in args.truncado if d < EMBEDDING_DIM]
+    amostra = base[rng.choice(len(base), size=min(len(base), 20000), replace=False)]
+    for d in args.pca:
+        try:
+            reducoes.append(ajustar_pca(amostra, d)[0])
+        except ValueError as e:
+            print(f"⚠️ pca:{d}: {e}")
+
+    linhas = []
+    for reducao in reducoes:
+        index.set_reduction(reducao)
+        for fator in args.fatores:
+            shortlist = fator * args.k
+            achados, tempos = medir_consultas(lambda q: index.search(q, args.k, shortlist=shortlist), consultas)
+            recall = statistics.mean(len(a & e) / len(e) for a, e in zip(achados, exatos) if e)
+            tempo = resumo_tempos(tempos)
+            speedup = exato["mediana_ms"] / tempo["mediana_ms"] if tempo["mediana_ms"] else 0.0
+            linhas.append({"reducao": reducao.nome, "shortlist": shortlist, "recall": recall, **tempo, "speedup": speedup})
+            print(f"{reducao.nome:<16}{shortlist:>10}{recall:>10.3f}{tempo['mediana_ms']:>12.2f}"
+                  f"{tempo['p95_ms']:>10.2f}{speedup:>9.2f}")
+
+    if args.output:
+        relatorio = {
+            "fonte": args.fonte, "vetores": len(base), "consultas": len(consultas), "k": args.k,
+            "exato": exato, "dois_estagios": linhas
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"💾 Relatório salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
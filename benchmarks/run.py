@@ -0,0 +1,332 @@
+"""
+Suíte de benchmarks de desempenho com dados sintéticos (1k, 10k, 100k vagas/currículos).
+
+Para cada tamanho, popula um banco descartável (benchmarks.synthetic) e mede:
+- as listagens de vagas e currículos (as mesmas consultas das páginas 02/03, via listings): KPIs,
+  páginas por keyset (primeira, filtrada, por texto e o percurso de todas) e detalhes sob demanda;
+- as cadeias de filtros em pandas que as páginas usavam antes (linha de base);
+- a busca textual indexada;
+- o ranking de currículos por skills em comum com uma vaga (bitsets em memória x agregação no MongoDB);
+- a detecção de repostagens (assinaturas MinHash de todas as vagas e a verificação LSH de uma vaga);
+- search_rag com o backend vetorial local (carga do índice e consultas, com e sem filtros);
+- o laço do backfill com um provedor de embeddings falso (sem chamar a API).
+
+O resultado vai para um JSON (commit, ambiente, tempos por caso) que pode ser comparado entre
+commits com `python -m benchmarks.compare antes.json depois.json`.
+
+Uso:
+    python -m benchmarks.run --uri mongodb://localhost:27017 --output bench.json
+    python -m benchmarks.run --mongomock --sizes 1000 10000
+Casos que o backend não suporta (ex: $text no mongomock) são registrados com o erro.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import numpy as np
+import pandas as pd
+
+DB_BENCH = "labbd_bench"
+BACKFILL_MAX_DOCS = 2000
+
+
+class FakeProvider:
+    """
+    Provedor de embeddings falso (mesma interface de embedding_providers): devolve vetores unitários
+    determinísticos (derivados do hash do texto), com uma latência simulada por chamada.
+    Simula um provedor remoto com o limite de lote do Gemini.
+    """
+
+    remote = True
+    max_batch = 100
+
+    def __init__(self, latencia_ms=0.0, dim=768):
+        self.name = "bench:falso"
+        self.latencia = latencia_ms / 1000.0
+        self.dim = dim
+        self.chamadas = 0
+
+    def _vetor(self, texto):
+        seed = int.from_bytes(hashlib.sha256(texto.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed(self, texts, task_type="RETRIEVAL_DOCUMENT"):
+        self.chamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        return [self._vetor(texto) for texto in texts]
+
+
+class ContadorDeChamadas:
+    """Envolve um provedor real (ex: HashingProvider) contando as chamadas a embed."""
+
+    def __init__(self, provider):
+        self._provider = provider
+        self.chamadas = 0
+
+    def __getattr__(self, nome):
+        return getattr(self._provider, nome)
+
+    def embed(self, texts, task_type="RETRIEVAL_DOCUMENT"):
+        self.chamadas += 1
+        return self._provider.embed(texts, task_type)
+
+
+def medir(fn, repeticoes):
+    """Roda fn `repeticoes` vezes (após um aquecimento) e resume os tempos em ms."""
+    fn()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append((time.perf_counter() - inicio) * 1000.0)
+    tempos.sort()
+    return {
+        "mediana_ms": statistics.median(tempos),
+        "min_ms": tempos[0],
+        "p95_ms": tempos[min(len(tempos) - 1, int(round(0.95 * (len(tempos) - 1))))],
+        "repeticoes": repeticoes
+    }
+
+
+def caso(resultados, nome, fn, repeticoes):
+    """Mede um caso e registra o erro (sem interromper a suíte) se o backend não suportar."""
+    try:
+        resultados[nome] = medir(fn, repeticoes)
+        print(f"   {nome:<32} {resultados[nome]['mediana_ms']:10.2f} ms (mediana)")
+    except Exception as e:
+        resultados[nome] = {"erro": f"{type(e).__name__}: {e}"}
+        print(f"   {nome:<32} {'erro':>10}    {type(e).__name__}: {e}")
+
+
+#--- Linha de base: filtros em pandas como as páginas faziam antes de irem para o MongoDB ---
+def filtrar_vagas_pandas(col_vagas, search_query, tipo_contratacao, salario_range):
+    df = pd.DataFrame(list(col_vagas.find({}, {"embedding": 0})))
+    df["salario_float"] = pd.to_numeric(df["salario"], errors="coerce")
+    mask = (
+        df["titulo"].str.contains(search_query, case=False, na=False)
+        | df["empresa"].str.contains(search_query, case=False, na=False)
+        | df["cidade"].str.contains(search_query, case=False, na=False)
+        | df["skills"].astype(str).str.contains(search_query, case=False, na=False)
+    )
+    df = df[mask]
+    df = df[df["tipo_contratacao"] == tipo_contratacao]
+    df = df[df["salario_float"].between(*salario_range) | df["salario_float"].isna()]
+    return len(df), df["salario_float"].mean(), df["cidade"].mode()
+
+
+def filtrar_curriculos_pandas(col_curriculos, search_query):
+    df = pd.DataFrame(list(col_curriculos.find({}, {"embedding": 0})))
+    mask = (
+        df["skills"].astype(str).str.contains(search_query, case=False, na=False)
+        | df["idiomas"].astype(str).str.contains(search_query, case=False, na=False)
+        | df["formacao"].str.contains(search_query, case=False, na=False)
+    )
+    return df[mask]
+
+
+def medir_backfill(db, n_docs, latencia_ms, provider):
+    """Zera o embedding de n_docs vagas e mede o laço de backfill (docs/s) com o provedor do benchmark."""
+    from backfill import CAMPOS_TEXTO, buscar_pendentes, processar_lote
+
+    col_vagas = db["vagas"]
+    ids = [doc["_id"] for doc in col_vagas.find({}, {"_id": 1}).limit(n_docs)]
+    col_vagas.update_many({"_id": {"$in": ids}}, {"$set": {"embedding": []}})
+    #Textos novos para o cache de embeddings não mascarar o custo
+    db["embedding_cache"].drop()
+
+    chamadas_antes = provider.chamadas
+    inicio = time.perf_counter()
+    pendentes = buscar_pendentes(col_vagas, CAMPOS_TEXTO["vagas"])
+    processados = 0
+    for start in range(0, len(pendentes), provider.max_batch):
+        processados += processar_lote(col_vagas, pendentes[start:start + provider.max_batch], CAMPOS_TEXTO["vagas"]) or 0
+    decorrido = time.perf_counter() - inicio
+    return {
+        "documentos": processados,
+        "segundos": decorrido,
+        "docs_por_segundo": processados / decorrido if decorrido > 0 else 0.0,
+        "chamadas_api": provider.chamadas - chamadas_antes,
+        "provedor": provider.name,
+        "latencia_simulada_ms": latencia_ms if provider.remote else None
+    }
+
+
+def rodar_tamanho(db, n, args, provider):
+    import db_connection
+    import listings
+    from benchmarks.synthetic import popular
+
+    print(f"📦 {n} vagas / {n} currículos")
+    inicio = time.perf_counter()
+    popular(db, n, n, seed=args.seed, armazenamento=db_connection.get_embedding_storage())
+    resultados = {"geracao_s": time.perf_counter() - inicio}
+    col_vagas, col_curriculos = db["vagas"], db["curriculos"]
+    rep = args.repeticoes
+
+    #Listagens (mesmas consultas das páginas)
+    caso(resultados, "vagas_opcoes", lambda: listings.consultar_opcoes_vagas(), rep)
+    caso(resultados, "vagas_kpis", lambda: listings.consultar_kpis_vagas(), rep)
+    caso(resultados, "vagas_pagina", lambda: listings.consultar_pagina_vagas(), rep)
+    caso(resultados, "vagas_pagina_filtrada", lambda: listings.consultar_pagina_vagas(
+        salario_range=(3000.0, 12000.0), tipo_contratacao="CLT", empresa="TechNova"
+    ), rep)
+    caso(resultados, "vagas_pagina_texto", lambda: listings.consultar_pagina_vagas(search_query="python"), rep)
+
+    def ultima_pagina_vagas():
+        #Percorre todas as páginas pelo cursor: cada uma deve custar o mesmo que a primeira
+        pagina, paginas = listings.consultar_pagina_vagas(tamanho=100), 1
+        while pagina["proximo"]:
+            pagina, paginas = listings.consultar_pagina_vagas(cursor=pagina["proximo"], tamanho=100), paginas + 1
+        return paginas
+    caso(resultados, "vagas_todas_paginas", ultima_pagina_vagas, max(1, rep // 5))
+    ids = [v["_id"] for v in listings.consultar_pagina_vagas()["itens"][:5]]
+    caso(resultados, "vagas_detalhes", lambda: listings.consultar_detalhes("vagas", ids), rep)
+    caso(resultados, "curriculos_pagina", lambda: listings.consultar_pagina_curriculos(), rep)
+    caso(resultados, "curriculos_busca_texto", lambda: listings.consultar_pagina_curriculos("python"), rep)
+
+    #Repostagens: assinaturas MinHash de todas as vagas e a verificação de uma vaga nova (dedup.py)
+    import dedup
+    caso(resultados, "dedup_backfill", lambda: dedup.backfill(col_vagas, refazer=True, progresso=False), 1)
+    modelo = col_vagas.find_one({}, {"id": 1, "titulo": 1, "descricao": 1, "empresa": 1})
+    caso(resultados, "dedup_verificacao", lambda: dedup.marcar_duplicatas(col_vagas, [{
+        "id": -1, "titulo": modelo["titulo"], "descricao": f"{modelo['descricao']} Vaga repostada.",
+        "empresa": modelo["empresa"]
+    }]), rep)
+
+    #Ranking por skills em comum: bitsets em memória x agregação no MongoDB (índice multikey)
+    import skills
+    dicionario = db_connection.get_skill_dictionary()
+    caso(resultados, "skills_backfill", lambda: [
+        skills.backfill(c, dicionario, progresso=False) for c in (col_vagas, col_curriculos)
+    ], 1)
+    vaga = col_vagas.find_one({"skill_ids.2": {"$exists": True}}, {"skill_ids": 1})
+    pedidas = vaga["skill_ids"] if vaga else []
+
+    def carregar_skills():
+        db_connection.get_skill_index.clear()
+        db_connection.get_skill_index("curriculos").refresh(force=True)
+    caso(resultados, "skills_indice_carga", carregar_skills, max(1, rep // 5))
+    caso(resultados, "skills_ranking_bitset", lambda: db_connection.get_skill_index("curriculos").rank(pedidas, 2, 50), rep)
+    caso(resultados, "skills_ranking_mongo", lambda: skills.ranquear_no_mongo(col_curriculos, pedidas, 2, 50), rep)
+
+    #Linha de base em pandas
+    caso(resultados, "vagas_filtros_pandas", lambda: filtrar_vagas_pandas(
+        col_vagas, "python", "CLT", (3000.0, 12000.0)
+    ), rep)
+    caso(resultados, "curriculos_filtros_pandas", lambda: filtrar_curriculos_pandas(col_curriculos, "python"), rep)
+
+    #Busca vetorial local: carga completa do índice e consultas
+    def carregar_indice():
+        db_connection.get_local_index.clear()
+        db_connection.get_local_index("vagas").refresh(force=True)
+    caso(resultados, "indice_local_carga", carregar_indice, max(1, rep // 5))
+    consultas = ["desenvolvedor python sênior", "analista de dados com power bi", "devops kubernetes aws"]
+    caso(resultados, "search_rag_local", lambda: [
+        db_connection.search_rag(q, "vagas", limit=10) for q in consultas
+    ], rep)
+    caso(resultados, "search_rag_local_filtrado", lambda: [
+        db_connection.search_rag(q, "vagas", limit=10, filtros={"estado": "SP", "salario_min": 5000})
+        for q in consultas
+    ], rep)
+    caso(resultados, "search_rag_local_dois_estagios", lambda: [
+        db_connection.search_rag(q, "vagas", limit=10, modo="dois_estagios") for q in consultas
+    ], rep)
+
+    #Backfill com provedor falso
+    try:
+        resultados["backfill"] = medir_backfill(db, min(n, args.backfill_docs), args.latencia_ms, provider)
+        print(f"   {'backfill':<32} {resultados['backfill']['docs_por_segundo']:10.1f} docs/s")
+    except Exception as e:
+        resultados["backfill"] = {"erro": f"{type(e).__name__}: {e}"}
+        print(f"   {'backfill':<32} {'erro':>10}    {type(e).__name__}: {e}")
+    return resultados
+
+
+def commit_atual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de desempenho com dados sintéticos.")
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="mongod local (nunca o de produção).")
+    parser.add_argument("--db", default=DB_BENCH, help="Banco descartável usado nos testes.")
+    parser.add_argument("--mongomock", action="store_true", help="Usa mongomock em vez de um mongod.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backfill-docs", type=int, default=BACKFILL_MAX_DOCS)
+    parser.add_argument("--provedor", choices=["falso", "hashing"], default="falso",
+                        help="Embeddings do benchmark: falso (simula a API) ou o HashingProvider local.")
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Latência simulada por chamada (provedor falso).")
+    parser.add_argument("--output", default="bench.json")
+    args = parser.parse_args()
+
+    if args.db == "Empregos":
+        parser.error("use um banco descartável, não o banco da aplicação.")
+
+    #O db_connection lê a configuração do ambiente quando não há secrets.toml
+    os.environ["MONGO_URI"] = args.uri
+    os.environ["MONGO_DB"] = args.db
+    os.environ["VECTOR_BACKEND"] = "local"
+    os.environ["LOCAL_INDEX_REFRESH_SECONDS"] = "3600"  #O índice só recarrega quando o benchmark pede
+    import db_connection
+
+    if args.mongomock:
+        import mongomock
+        db_connection.MongoClient = mongomock.MongoClient
+
+    #Nenhuma chamada à API do Google: provedor falso ou o backend local de CPU
+    if args.provedor == "hashing":
+        from embedding_providers import HashingProvider
+        provider = ContadorDeChamadas(HashingProvider())
+    else:
+        provider = FakeProvider(latencia_ms=args.latencia_ms)
+    db_connection.get_embedding_provider = lambda: provider
+
+    db = db_connection.get_db()
+    if db is None:
+        print("❌ Não conectou ao MongoDB.")
+        return 1
+    if db.name != args.db:
+        #secrets.toml tem precedência sobre o ambiente: não arrisca escrever em outro banco
+        print(f"❌ O db_connection está apontando para '{db.name}', não para '{args.db}'. Abortando.")
+        return 1
+
+    saida = {
+        "commit": commit_atual(),
+        "executado_em": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "backend": "mongomock" if args.mongomock else "mongod"
+        },
+        "parametros": {k: v for k, v in vars(args).items() if k != "uri"},
+        "resultados": {}
+    }
+    try:
+        for n in args.sizes:
+            saida["resultados"][str(n)] = rodar_tamanho(db, n, args, provider)
+    finally:
+        db.client.drop_database(args.db)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(saida, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultados gravados em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+"""
+Teste de concorrência do IdAllocator: várias threads (e vários "processos" simulados,
+cada um com seu próprio alocador) pedem ids ao mesmo tempo; nenhum id pode se repetir.
+
+Uso:
+    python -m benchmarks.stress_id_allocator --uri mongodb://localhost:27017
+    python -m benchmarks.stress_id_allocator --threads 64 --ids 200 --block-size 50
+
+Usa o banco descartável `labbd_stress` (apagado no início e no fim).
+Sai com código 1 se encontrar ids duplicados.
+"""
+import argparse
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import MongoClient
+from id_allocator import IdAllocator
+
+DB_STRESS = "labbd_stress"
+
+
+def run(uri, threads, ids_per_thread, allocators, block_size, seed_max_id):
+    client = MongoClient(uri)
+    client.drop_database(DB_STRESS)
+    db = client[DB_STRESS]
+
+    #Simula uma base antiga, criada antes da coleção counters
+    if seed_max_id:
+        db["vagas"].insert_one({"id": seed_max_id, "titulo": "Vaga legada"})
+
+    #Cada alocador representa um processo do Streamlit com seu próprio bloco local
+    pool = [IdAllocator(lambda: db, block_size=block_size) for _ in range(allocators)]
+
+    def worker(n):
+        allocator = pool[n % allocators]
+        return [allocator.next_id("vagas") for _ in range(ids_per_thread)]
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        resultados = list(executor.map(worker, range(threads)))
+    decorrido = time.perf_counter() - inicio
+
+    ids = [i for lote in resultados for i in lote]
+    duplicados = [i for i, n in Counter(ids).items() if n > 1]
+    abaixo_do_seed = [i for i in ids if i <= seed_max_id]
+
+    total = len(ids)
+    print(f"{total} ids em {decorrido:.2f}s ({total / decorrido:.0f} ids/s) | "
+          f"{threads} threads, {allocators} alocadores, bloco de {block_size}")
+    print(f"Faixa: {min(ids)}..{max(ids)} | lacunas: {max(ids) - min(ids) + 1 - len(set(ids))}")
+
+    client.drop_database(DB_STRESS)
+
+    if duplicados or abaixo_do_seed:
+        print(f"❌ FALHOU: {len(duplicados)} ids duplicados, {len(abaixo_do_seed)} ids <= {seed_max_id}.")
+        return 1
+    print("✅ Nenhum id duplicado.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de concorrência do IdAllocator.")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--ids", type=int, default=100, help="Ids pedidos por thread.")
+    parser.add_argument("--allocators", type=int, default=4, help="Processos simulados.")
+    parser.add_argument("--block-size", type=int, default=1)
+    parser.add_argument("--seed-max-id", type=int, default=1000, help="Maior id já existente na base.")
+    args = parser.parse_args()
+    return run(args.uri, args.threads, args.ids, args.allocators, args.block_size, args.seed_max_id)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
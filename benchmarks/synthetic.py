@@ -0,0 +1,170 @@
+"""
+Gerador de dados sintéticos (vagas e currículos) no mesmo formato das páginas de cadastro.
+
+Os textos são montados a partir de listas de títulos, skills, cidades e empresas em português;
+os embeddings são vetores unitários aleatórios de 768 dimensões (sem chamar a API).
+Tudo é determinístico a partir da seed.
+
+Uso direto (popula um banco descartável):
+    python -m benchmarks.synthetic --uri mongodb://localhost:27017 --db labbd_bench --vagas 10000 --curriculos 10000
+"""
+import argparse
+import datetime
+import numpy as np
+from pymongo import MongoClient
+from vector_index import EMBEDDING_DIM
+from embedding_storage import pack_embedding, EMBEDDING_STORAGES
+
+TITULOS = [
+    "Desenvolvedor Python", "Desenvolvedor Java", "Engenheiro de Dados", "Cientista de Dados",
+    "Analista de Sistemas", "Analista de Suporte", "Desenvolvedor Front-end", "Desenvolvedor Back-end",
+    "Engenheiro de Software", "Analista de BI", "DBA", "Engenheiro DevOps", "Analista de Segurança",
+    "Product Owner", "Scrum Master", "Designer UX/UI", "Analista de Testes", "Administrador de Redes"
+]
+NIVEIS = ["Júnior", "Pleno", "Sênior", "Estagiário", "Especialista"]
+SKILLS = [
+    "Python", "Java", "SQL", "MongoDB", "PostgreSQL", "Docker", "Kubernetes", "AWS", "Azure",
+    "React", "Angular", "JavaScript", "TypeScript", "Git", "Linux", "Pandas", "Spark", "Power BI",
+    "Scrum", "Kanban", "Figma", "Selenium", "Redes", "Segurança da informação", "FastAPI", "Django"
+]
+IDIOMAS = ["Inglês", "Espanhol", "Francês", "Alemão", "Italiano"]
+FORMACOES = [
+    "Bacharelado em Ciência da Computação", "Engenharia de Computação", "Sistemas de Informação",
+    "Análise e Desenvolvimento de Sistemas", "Engenharia Elétrica", "Estatística", "Matemática"
+]
+EMPRESAS = [
+    "TechNova", "DataBrasil", "Soluções Digitais", "InovaSoft", "Nuvem Sul", "Código Certo",
+    "Banco Horizonte", "Varejo Plus", "Saúde Conectada", "AgroTech Cerrado", "LogiMais", "EduNet"
+]
+#(cidade, estado)
+CIDADES = [
+    ("São Paulo", "SP"), ("Campinas", "SP"), ("São Carlos", "SP"), ("Rio de Janeiro", "RJ"),
+    ("Belo Horizonte", "MG"), ("Curitiba", "PR"), ("Porto Alegre", "RS"), ("Florianópolis", "SC"),
+    ("Recife", "PE"), ("Salvador", "BA"), ("Fortaleza", "CE"), ("Brasília", "DF"), ("Goiânia", "GO"),
+    ("Manaus", "AM"), ("Belém", "PA")
+]
+NOMES = ["Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela",
+         "João", "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Tiago"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Costa", "Ferreira",
+              "Almeida", "Ribeiro", "Carvalho", "Gomes"]
+TIPOS_CONTRATACAO = ["CLT", "PJ", "Estágio", "Temporário"]
+
+
+def vetores_unitarios(rng, n, dim=EMBEDDING_DIM):
+    """n vetores float32 aleatórios com norma 1."""
+    matrix = rng.standard_normal((n, dim), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix
+
+
+def _escolher(rng, opcoes, minimo, maximo):
+    k = int(rng.integers(minimo, maximo + 1))
+    return [opcoes[i] for i in rng.choice(len(opcoes), size=k, replace=False)]
+
+
+def gerar_vagas(n, seed=0, fracao_com_embedding=1.0, primeiro_id=1, armazenamento="float32"):
+    """Gera n vagas; uma fração delas já vem com embedding (o resto fica para o backfill)."""
+    rng = np.random.default_rng(seed)
+    com_embedding = rng.random(n) < fracao_com_embedding
+    vetores = vetores_unitarios(rng, int(com_embedding.sum()))
+    agora = datetime.datetime.now(datetime.timezone.utc)
+
+    vagas, v = [], 0
+    for i in range(n):
+        titulo = f"{TITULOS[rng.integers(len(TITULOS))]} {NIVEIS[rng.integers(len(NIVEIS))]}"
+        cidade, estado = CIDADES[rng.integers(len(CIDADES))]
+        skills = _escolher(rng, SKILLS, 2, 6)
+        #Parte dos registros com salário não informado, como na base real
+        salario = float(round(rng.uniform(1500, 25000), -2)) if rng.random() > 0.1 else None
+        vaga = {
+            "id": primeiro_id + i,
+            "titulo": titulo,
+            "descricao": f"Buscamos {titulo} com experiência em {', '.join(skills)}.",
+            "cidade": cidade,
+            "estado": estado,
+            "tipo_contratacao": TIPOS_CONTRATACAO[rng.integers(len(TIPOS_CONTRATACAO))],
+            "salario": salario,
+            "empresa": EMPRESAS[rng.integers(len(EMPRESAS))],
+            "skills": skills,
+            "embedding": [],
+            "data_cadastro": agora
+        }
+        if com_embedding[i]:
+            vaga["embedding"] = pack_embedding(vetores[v], armazenamento)
+            vaga["embedding_atualizado_em"] = agora
+            v += 1
+        vagas.append(vaga)
+    return vagas
+
+
+def gerar_curriculos(n, seed=0, fracao_com_embedding=1.0, primeiro_id=1, armazenamento="float32"):
+    """Gera n currículos; uma fração deles já vem com embedding (o resto fica para o backfill)."""
+    rng = np.random.default_rng(seed + 1)
+    com_embedding = rng.random(n) < fracao_com_embedding
+    vetores = vetores_unitarios(rng, int(com_embedding.sum()))
+    agora = datetime.datetime.now(datetime.timezone.utc)
+
+    curriculos, v = [], 0
+    for i in range(n):
+        nome = f"{NOMES[rng.integers(len(NOMES))]} {SOBRENOMES[rng.integers(len(SOBRENOMES))]}"
+        skills = _escolher(rng, SKILLS, 3, 8)
+        cargo = TITULOS[rng.integers(len(TITULOS))]
+        anos = int(rng.integers(0, 15))
+        curriculo = {
+            "id": primeiro_id + i,
+            "nome": nome,
+            "email": f"{nome.lower().replace(' ', '.')}.{primeiro_id + i}@exemplo.com",
+            "telefone": f"(11) 9{rng.integers(1000, 9999)}-{rng.integers(1000, 9999)}",
+            "formacao": FORMACOES[rng.integers(len(FORMACOES))],
+            "experiencia": f"{anos} anos como {cargo}.",
+            "skills": skills,
+            "idiomas": _escolher(rng, IDIOMAS, 0, 2),
+            "certificacoes": [],
+            "resumo": f"{cargo} com foco em {', '.join(skills[:3])}.",
+            "empresas_previas": _escolher(rng, EMPRESAS, 0, 3),
+            "embedding": [],
+            "data_cadastro": agora
+        }
+        if com_embedding[i]:
+            curriculo["embedding"] = pack_embedding(vetores[v], armazenamento)
+            curriculo["embedding_atualizado_em"] = agora
+            v += 1
+        curriculos.append(curriculo)
+    return curriculos
+
+
+def inserir(collection, docs, chunk=5000):
+    """insert_many em blocos (não monta um único comando gigante)."""
+    for start in range(0, len(docs), chunk):
+        collection.insert_many(docs[start:start + chunk], ordered=False)
+
+
+def popular(db, n_vagas, n_curriculos, seed=0, fracao_com_embedding=1.0, armazenamento="float32"):
+    """Apaga e recria as coleções vagas/curriculos do banco com dados sintéticos."""
+    db["vagas"].drop()
+    db["curriculos"].drop()
+    inserir(db["vagas"], gerar_vagas(n_vagas, seed, fracao_com_embedding, armazenamento=armazenamento))
+    inserir(db["curriculos"], gerar_curriculos(n_curriculos, seed, fracao_com_embedding, armazenamento=armazenamento))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Popula um banco descartável com vagas e currículos sintéticos.")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="labbd_bench", help="Banco de destino (é sobrescrito).")
+    parser.add_argument("--vagas", type=int, default=1000)
+    parser.add_argument("--curriculos", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fracao-com-embedding", type=float, default=1.0)
+    parser.add_argument("--armazenamento", choices=EMBEDDING_STORAGES, default="float32",
+                        help="Formato do campo embedding.")
+    args = parser.parse_args()
+
+    if args.db == "Empregos":
+        parser.error("use um banco descartável, não o banco da aplicação.")
+    db = MongoClient(args.uri)[args.db]
+    popular(db, args.vagas, args.curriculos, args.seed, args.fracao_com_embedding, args.armazenamento)
+    print(f"✅ {args.vagas} vagas e {args.curriculos} currículos gravados em {args.db}.")
+
+
+if __name__ == "__main__":
+    main()
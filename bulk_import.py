@@ -0,0 +1,239 @@
+"""
+Importação em lote de vagas e currículos a partir de CSV ou JSONL (arquivos de parceiros).
+
+O arquivo é lido em streaming, em blocos de --chunk registros, então a memória não cresce com o
+tamanho do arquivo. Cada registro passa pelo mesmo esquema dos formulários (schemas.py); os
+inválidos são rejeitados (e gravados em --rejeitados, com a linha e o motivo) sem parar a carga.
+Para cada bloco:
+- os ids sequenciais saem de uma única reserva (IdAllocator.reserve);
+- com um provedor de embeddings local, os vetores são gerados em lote (create_embeddings_batch);
+  com o Gemini, os documentos vão com `embedding_pendente: true` (fila do embedding_worker no
+  próprio documento, sem um insert a mais);
+- vagas quase idênticas a uma já publicada (ou a outra do bloco) entram marcadas como
+  repostagem (dedup.py), sem contar no total de vagas;
+- os documentos são gravados com insert_many(ordered=False): uma falha (ex: id duplicado) rejeita
+  só aquele documento.
+
+Nas colunas de lista do CSV (skills, idiomas, certificacoes, empresas_previas) os itens são
+separados por ';' ou por quebra de linha; no JSONL podem vir como listas.
+
+Uso:
+    python -m bulk_import vagas parceiro.csv
+    python -m bulk_import curriculos cvs.jsonl --chunk 2000 --rejeitados rejeitados.jsonl
+    python -m bulk_import vagas vagas.csv --empresa "TechNova" --dry-run
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from pymongo.errors import BulkWriteError
+from db_connection import (
+    get_collections, get_id_allocator, inline_embedding_fields_batch, get_skill_dictionary
+)
+from schemas import montar_vaga, montar_curriculo, SchemaError
+import dedup
+
+FORMATOS = ("csv", "jsonl")
+
+
+def detectar_formato(caminho):
+    return "jsonl" if caminho.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def ler_registros(arquivo, formato, delimitador=","):
+    """Gera (número da linha, registro dict ou a exceção de leitura), um por vez."""
+    if formato == "csv":
+        reader = csv.DictReader(arquivo, delimiter=delimitador)
+        for registro in reader:
+            #Colunas a mais viram a chave None no DictReader
+            registro.pop(None, None)
+            yield reader.line_num, registro
+        return
+
+    for numero, linha in enumerate(arquivo, start=1):
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except json.JSONDecodeError as e:
+            yield numero, ValueError(f"JSON inválido: {e}")
+            continue
+        if not isinstance(registro, dict):
+            yield numero, ValueError("A linha não é um objeto JSON.")
+            continue
+        yield numero, registro
+
+
+class Importacao:
+    """Estado e contadores de uma importação (um bloco é gravado por vez)."""
+
+    def __init__(self, colecao, chunk=1000, empresa=None, dry_run=False, rejeitados=None):
+        self.colecao = colecao
+        self.chunk = max(1, int(chunk))
+        self.empresa = empresa
+        self.dry_run = dry_run
+        self._rejeitados = rejeitados
+        self.lidos = 0
+        self.inseridos = 0
+        self.rejeitados = 0
+        self.enfileirados = 0
+        self.vetorizados = 0
+        self.repostagens = 0
+        self.empresas = set()
+        self.dedup = dedup.configuracao() if colecao == "vagas" else None
+        #No dry-run as skills não são normalizadas (normalizar registra as skills novas)
+        self.dicionario = None if dry_run else get_skill_dictionary()
+        self.inicio = time.perf_counter()
+
+    def rejeitar(self, linha, erro, registro=None):
+        self.rejeitados += 1
+        if self._rejeitados is not None:
+            self._rejeitados.write(json.dumps(
+                {"linha": linha, "erro": str(erro), "registro": registro}, ensure_ascii=False, default=str
+            ) + "\n")
+
+    def montar(self, registro):
+        if self.colecao == "vagas":
+            return montar_vaga(registro, empresa=self.empresa, dicionario=self.dicionario)
+        return montar_curriculo(registro, dicionario=self.dicionario)
+
+    def gravar(self, collection, bloco):
+        """bloco: lista de (linha, registro, documento, texto). Grava e atualiza os contadores."""
+        if self.dry_run or not bloco:
+            self.inseridos += len(bloco)
+            return
+
+        ids = get_id_allocator().reserve(self.colecao, len(bloco))
+        campos_embedding = inline_embedding_fields_batch([texto for _, _, _, texto in bloco])
+        docs = [
+            {"id": novo_id, **doc, **campos}
+            for novo_id, (_, _, doc, _), campos in zip(ids, bloco, campos_embedding)
+        ]
+        if self.dedup is not None:
+            #Repostagens (contra o banco e dentro do próprio bloco) entram marcadas com duplicata_de
+            limiar, mesma_empresa = self.dedup
+            dedup.marcar_duplicatas(collection, docs, limiar, mesma_empresa)
+
+        falhas = {}
+        try:
+            collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            #ordered=False: os demais documentos do bloco foram gravados
+            falhas = {erro["index"]: erro.get("errmsg", "erro de escrita") for erro in e.details.get("writeErrors", [])}
+
+        for i, ((linha, registro, _, _), doc) in enumerate(zip(bloco, docs)):
+            if i in falhas:
+                self.rejeitar(linha, falhas[i], registro)
+                continue
+            self.inseridos += 1
+            if self.colecao == "vagas":
+                self.empresas.add(doc["empresa"])
+                self.repostagens += "duplicata_de" in doc
+            if doc.get("embedding_pendente"):
+                self.enfileirados += 1
+            else:
+                self.vetorizados += 1
+
+    def linhas_por_segundo(self):
+        decorrido = time.perf_counter() - self.inicio
+        return self.lidos / decorrido if decorrido > 0 else 0.0
+
+    def resumo(self):
+        return {
+            "colecao": self.colecao,
+            "lidos": self.lidos,
+            "inseridos": self.inseridos,
+            "rejeitados": self.rejeitados,
+            "vetorizados_na_hora": self.vetorizados,
+            "enfileirados": self.enfileirados,
+            "repostagens": self.repostagens,
+            "segundos": time.perf_counter() - self.inicio,
+            "linhas_por_segundo": self.linhas_por_segundo(),
+            "dry_run": self.dry_run
+        }
+
+
+def importar(colecao, registros, chunk=1000, empresa=None, dry_run=False, rejeitados=None, progresso=True):
+    """
+    Importa os registros (iterável de (linha, dict ou exceção), ver ler_registros).
+    Retorna o resumo (lidos, inseridos, rejeitados, linhas/s...) ou None sem conexão.
+    """
+    col_vagas, col_curriculos, _ = get_collections()
+    collection = col_vagas if colecao == "vagas" else col_curriculos
+    if collection is None:
+        return None
+
+    estado = Importacao(colecao, chunk, empresa, dry_run, rejeitados)
+    bloco = []
+    for linha, registro in registros:
+        estado.lidos += 1
+        if isinstance(registro, Exception):
+            estado.rejeitar(linha, registro)
+            continue
+        try:
+            doc, texto = estado.montar(registro)
+        except SchemaError as e:
+            estado.rejeitar(linha, e, registro)
+            continue
+        bloco.append((linha, registro, doc, texto))
+
+        if len(bloco) >= estado.chunk:
+            estado.gravar(collection, bloco)
+            bloco = []
+            if progresso:
+                print(f"… {estado.lidos} linhas | {estado.inseridos} inseridas | {estado.rejeitados} rejeitadas | "
+                      f"{estado.linhas_por_segundo():.0f} linhas/s")
+    estado.gravar(collection, bloco)
+
+    if estado.inseridos and not dry_run:
+        #Invalida os caches das listagens (e das visões por empresa, no caso das vagas)
+        from data_cache import bump_data_version
+        bump_data_version(colecao)
+        for nome_empresa in estado.empresas:
+            bump_data_version(colecao, nome_empresa)
+    return estado.resumo()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa vagas ou currículos de um arquivo CSV/JSONL.")
+    parser.add_argument("colecao", choices=("vagas", "curriculos"))
+    parser.add_argument("arquivo", help="Caminho do arquivo ('-' para a entrada padrão).")
+    parser.add_argument("--formato", choices=FORMATOS, default=None, help="Padrão: pela extensão do arquivo.")
+    parser.add_argument("--delimitador", default=",", help="Delimitador do CSV.")
+    parser.add_argument("--chunk", type=int, default=1000, help="Documentos por insert_many.")
+    parser.add_argument("--empresa", default=None, help="Força a empresa de todas as vagas importadas.")
+    parser.add_argument("--rejeitados", default=None, help="Arquivo JSONL com as linhas rejeitadas e o motivo.")
+    parser.add_argument("--dry-run", action="store_true", help="Só valida; não grava nada.")
+    args = parser.parse_args()
+
+    formato = args.formato or ("jsonl" if args.arquivo == "-" else detectar_formato(args.arquivo))
+    arquivo = sys.stdin if args.arquivo == "-" else open(args.arquivo, encoding="utf-8-sig", newline="")
+    rejeitados = open(args.rejeitados, "w", encoding="utf-8") if args.rejeitados else None
+    try:
+        resumo = importar(
+            args.colecao, ler_registros(arquivo, formato, args.delimitador),
+            chunk=args.chunk, empresa=args.empresa, dry_run=args.dry_run, rejeitados=rejeitados
+        )
+    finally:
+        if arquivo is not sys.stdin:
+            arquivo.close()
+        if rejeitados is not None:
+            rejeitados.close()
+
+    if resumo is None:
+        print("❌ Erro crítico: não conectou ao MongoDB.")
+        return 1
+    print(f"{'🔎' if args.dry_run else '✅'} {resumo['inseridos']} {args.colecao} "
+          f"{'válidos' if args.dry_run else 'inseridos'} de {resumo['lidos']} linhas em {resumo['segundos']:.1f}s "
+          f"({resumo['linhas_por_segundo']:.0f} linhas/s) | {resumo['rejeitados']} rejeitadas | "
+          f"{resumo['vetorizados_na_hora']} vetorizados na hora | {resumo['enfileirados']} na fila do worker")
+    if resumo["repostagens"]:
+        print(f"   🔁 {resumo['repostagens']} vagas marcadas como repostagem (duplicata_de)")
+    if resumo["rejeitados"] and args.rejeitados:
+        print(f"   Linhas rejeitadas em {args.rejeitados}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,203 @@
+"""
+Gerenciador da conexão com o MongoDB.
+
+- Conexão preguiçosa: o MongoClient é criado na primeira consulta, sem ping bloqueante
+  (o pymongo descobre o cluster em segundo plano);
+- Sem "None" permanente: se a criação do cliente falhar (URI ausente/inválida, DNS do SRV fora),
+  o erro fica registrado e uma nova tentativa é feita depois de retry_interval segundos.
+  Quedas do cluster depois de conectado são tratadas pelo próprio pymongo (reconexão automática);
+- Pool, timeouts, compressão e read preference vêm das opções passadas;
+- Estatísticas do pool (conexões abertas, em uso, espera por checkout) via ConnectionPoolListener.
+"""
+import time
+import threading
+from pymongo import monitoring, ReadPreference
+from metrics import observe, incr
+
+#Nomes aceitos em MONGO_READ_PREFERENCE_*
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primarypreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondarypreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST
+}
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Contadores do pool de conexões (todas as réplicas somadas) + espera por checkout em metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checkout_start = {}
+        self.stats = {
+            "abertas": 0, "em_uso": 0, "criadas": 0, "fechadas": 0,
+            "checkouts": 0, "checkouts_falhos": 0, "pools_limpos": 0
+        }
+
+    def _add(self, campo, valor=1):
+        with self._lock:
+            self.stats[campo] += valor
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        #Acontece quando o servidor cai ou some do topology: as conexões são descartadas
+        self._add("pools_limpos")
+        incr("mongo_pool_cleared_total")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add("criadas")
+        self._add("abertas")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add("fechadas")
+        self._add("abertas", -1)
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._checkout_start[threading.get_ident()] = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._checkout_start.pop(threading.get_ident(), None)
+            self.stats["checkouts_falhos"] += 1
+        incr("mongo_pool_checkout_failures_total")
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            inicio = self._checkout_start.pop(threading.get_ident(), None)
+            self.stats["checkouts"] += 1
+            self.stats["em_uso"] += 1
+        if inicio is not None:
+            observe("mongo_pool_checkout_seconds", time.perf_counter() - inicio)
+
+    def connection_checked_in(self, event):
+        self._add("em_uso", -1)
+
+
+class MongoConnectionManager:
+    """
+    Mantém um MongoClient por processo. `client()` devolve o cliente (criando-o se preciso)
+    ou None enquanto a criação estiver falhando; `database(name, read_only)` aplica a read
+    preference de leitura quando read_only=True.
+    """
+
+    def __init__(self, uri_getter, options=None, listeners=(), client_factory=None,
+                 read_only_preference="primary", retry_interval=5.0):
+        self._uri_getter = uri_getter
+        self.options = dict(options or {})
+        self.pool_listener = PoolStatsListener()
+        self._listeners = list(listeners) + [self.pool_listener]
+        self._client_factory = client_factory
+        self.read_only_preference = READ_PREFERENCES.get(
+            str(read_only_preference).replace("_", "").lower(), ReadPreference.PRIMARY
+        )
+        self.retry_interval = retry_interval
+
+        self._client = None
+        self._uri = None
+        self._last_error = None
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+
+    def _create(self, uri):
+        factory = self._client_factory
+        if factory is None:
+            from pymongo import MongoClient
+            factory = MongoClient
+        #connect=True só inicia o monitoramento em segundo plano; o construtor não espera o cluster
+        return factory(uri, event_listeners=self._listeners, **self.options)
+
+    def client(self):
+        uri = self._uri_getter()
+        with self._lock:
+            #URI trocada nos secrets: fecha o cliente antigo e recria
+            if self._client is not None and uri != self._uri:
+                self._close_locked()
+            if self._client is not None:
+                return self._client
+
+            if not uri:
+                self._last_error = "MONGO_URI não configurada nos secrets nem nas variáveis de ambiente."
+                return None
+            #Espera entre tentativas para não martelar um DNS/cluster fora do ar a cada rerun
+            if self._last_error and time.monotonic() - self._last_attempt < self.retry_interval:
+                return None
+
+            self._last_attempt = time.monotonic()
+            inicio = time.perf_counter()
+            try:
+                self._client = self._create(uri)
+            except Exception as e:
+                self._last_error = f"{type(e).__name__}: {e}"
+                incr("mongo_connect_failures_total")
+                print(f"❌ Falha ao criar o cliente do MongoDB: {self._last_error}")
+                return None
+            observe("latency_seconds", time.perf_counter() - inicio, op="mongo_connect")
+            self._uri = uri
+            self._last_error = None
+            return self._client
+
+    def database(self, name, read_only=False):
+        client = self.client()
+        if client is None:
+            return None
+        if read_only and self.read_only_preference != ReadPreference.PRIMARY:
+            return client.get_database(name, read_preference=self.read_only_preference)
+        return client[name]
+
+    def _close_locked(self):
+        try:
+            self._client.close()
+        except Exception:
+            pass
+        self._client = None
+        self._uri = None
+
+    def reset(self):
+        """Fecha o cliente; o próximo acesso cria outro (ex: botão de reconexão na página de métricas)."""
+        with self._lock:
+            if self._client is not None:
+                self._close_locked()
+            self._last_error = None
+
+    @property
+    def last_error(self):
+        return self._last_error
+
+    def status(self):
+        """Estado da conexão e do pool (sem fazer nenhuma chamada ao servidor)."""
+        with self._lock:
+            client = self._client
+        servidores = []
+        if client is not None:
+            try:
+                servidores = [
+                    {"endereco": f"{host}:{port}", "tipo": sd.server_type_name, "rtt_ms": (sd.round_trip_time or 0) * 1000}
+                    for (host, port), sd in client.topology_description.server_descriptions().items()
+                ]
+            except Exception:
+                servidores = []
+        return {
+            "cliente_criado": client is not None,
+            "ultimo_erro": self._last_error,
+            "servidores": servidores,
+            "opcoes": {k: v for k, v in self.options.items() if "password" not in k.lower()},
+            "read_preference_leitura": self.read_only_preference.name,
+            "pool": self.pool_listener.snapshot()
+        }
@@ -0,0 +1,158 @@
+"""
+Cache versionado dos dados das páginas de listagem.
+
+Cada coleção tem uma versão na coleção `cache_versions` (e uma versão por empresa,
+para as visões filtradas de empregador). Os loaders recebem a versão atual como parte da chave
+do st.cache_data: quando alguém grava, só a versão daquela coleção (e daquela empresa) muda,
+e só as entradas correspondentes deixam de ser usadas. As demais continuam em cache.
+As entradas antigas saem pelo TTL / max_entries.
+
+A versão é o instante da escrita (time_ns). Um cache miss de uma versão recente (menos de
+CACHE_LEITURA_PRIMARIA_SECONDS, padrão 60s) lê do primário: com MONGO_READ_PREFERENCE_LEITURA
+apontando para secundários, a primeira carga depois da escrita poderia vir de um secundário
+atrasado e ficar em cache, sem a escrita, até o TTL.
+"""
+import time
+import inspect
+import functools
+import threading
+import streamlit as st
+from pymongo import UpdateOne
+from db_connection import get_db, get_config, leitura_primaria, COL_CACHE_VERSIONS
+
+#Versões lidas recentemente: chave -> (versão, instante da leitura)
+_versions = {}
+_versions_lock = threading.Lock()
+
+#Estatísticas por loader: chamadas (pedidos ao cache) e execuções (misses que foram ao banco)
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _version_key(collection_name, empresa=None):
+    if empresa:
+        return f"{collection_name}|{empresa.strip().lower()}"
+    return collection_name
+
+
+def get_data_version(collection_name, empresa=None):
+    """
+    Versão atual dos dados da coleção (ou da empresa dentro da coleção).
+    Para não pagar um round trip a cada rerun, a versão lida fica válida por
+    CACHE_VERSION_POLL_SECONDS (padrão: 2s) neste processo.
+    """
+    key = _version_key(collection_name, empresa)
+    poll = float(get_config("CACHE_VERSION_POLL_SECONDS", 2))
+    with _versions_lock:
+        cached = _versions.get(key)
+        if cached and time.monotonic() - cached[1] < poll:
+            return cached[0]
+
+    versao = 0
+    db = get_db()
+    if db is not None:
+        try:
+            doc = db[COL_CACHE_VERSIONS].find_one({"_id": key})
+            versao = doc["versao"] if doc else 0
+        except Exception as e:
+            print(f"⚠️ Erro ao ler a versão do cache '{key}': {e}")
+            return cached[0] if cached else 0
+
+    with _versions_lock:
+        _versions[key] = (versao, time.monotonic())
+    return versao
+
+
+def bump_data_version(collection_name, empresa=None):
+    """
+    Invalida os caches de uma coleção após uma escrita.
+    Com empresa, invalida também as visões filtradas por aquela empresa (e só elas).
+    A versão nova é um valor único gerado aqui (time_ns), então todas as chaves vão em um
+    único bulk_write e este processo já sabe a versão sem ler de volta.
+    """
+    db = get_db()
+    if db is None:
+        return
+
+    keys = [_version_key(collection_name)]
+    if empresa:
+        keys.append(_version_key(collection_name, empresa))
+
+    versao = time.time_ns()
+    try:
+        db[COL_CACHE_VERSIONS].bulk_write(
+            [UpdateOne({"_id": key}, {"$set": {"versao": versao}}, upsert=True) for key in keys],
+            ordered=False
+        )
+    except Exception as e:
+        print(f"⚠️ Erro ao invalidar o cache {keys}: {e}")
+        return
+    #Este processo já enxerga a versão nova no próximo rerun
+    with _versions_lock:
+        for key in keys:
+            _versions[key] = (versao, time.monotonic())
+
+
+def _versao_recente(versao):
+    """True se a versão (time_ns da escrita) é mais nova que CACHE_LEITURA_PRIMARIA_SECONDS."""
+    janela = float(get_config("CACHE_LEITURA_PRIMARIA_SECONDS", 60))
+    return bool(versao) and time.time_ns() - versao < janela * 1e9
+
+
+def versioned_cache(collection_name, empresa_param=None, ttl=600, max_entries=64):
+    """
+    Decorator: st.cache_data com a versão da coleção na chave, TTL e limite de entradas.
+    empresa_param é o nome do argumento que filtra por empresa (quando houver); nesse caso
+    a versão usada é a da empresa, e escritas de outras empresas não invalidam a entrada.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        with _stats_lock:
+            stats = _stats.setdefault(fn.__name__, {"chamadas": 0, "execucoes": 0})
+
+        def _load(versao_dados, *args, **kwargs):
+            #Só roda em cache miss
+            with _stats_lock:
+                stats["execucoes"] += 1
+            if _versao_recente(versao_dados):
+                with leitura_primaria():
+                    return fn(*args, **kwargs)
+            return fn(*args, **kwargs)
+
+        #Nome próprio para o st.cache_data separar os loaders (sem __wrapped__, para que a
+        #versão continue sendo o primeiro argumento da chave)
+        _load.__module__ = fn.__module__
+        _load.__name__ = fn.__name__
+        _load.__qualname__ = fn.__qualname__
+
+        cached = st.cache_data(ttl=ttl, max_entries=max_entries, show_spinner=False)(_load)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            empresa = None
+            if empresa_param:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                empresa = bound.arguments.get(empresa_param)
+            versao = get_data_version(collection_name, empresa)
+            with _stats_lock:
+                stats["chamadas"] += 1
+            return cached(versao, *args, **kwargs)
+
+        wrapper.clear = cached.clear
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Hit rate por loader (neste processo)."""
+    with _stats_lock:
+        resultado = {}
+        for nome, stats in _stats.items():
+            hits = stats["chamadas"] - stats["execucoes"]
+            resultado[nome] = {
+                **stats,
+                "hits": max(hits, 0),
+                "hit_rate": hits / stats["chamadas"] if stats["chamadas"] else 0.0
+            }
+        return resultado
@@ -1,14 +1,58 @@
+import os
+import time
+import datetime
+import threading
+import functools
+import contextlib
 import streamlit as st
-from pymongo import MongoClient
-import google.generativeai as genai
+from pymongo import MongoClient, TEXT
 from pymongo.errors import ConnectionFailure
+from pymongo.operations import SearchIndexModel
 from typing import Literal
+from concurrent.futures import ThreadPoolExecutor, wait
+from embedding_cache import EmbeddingCache, make_cache_key
+from rate_limiter import estimate_tokens
+from embedding_scheduler import EmbeddingScheduler, INTERATIVA, BACKGROUND
+from id_allocator import IdAllocator
+from metrics import timed, get_command_listener, start_exporter
+from connection_manager import MongoConnectionManager
 
 #Nome do banco e coleções
 DB_NAME = "Empregos"
 COL_VAGAS = "vagas"
 COL_CURRICULOS = "curriculos"
 COL_USUARIOS = "usuarios"
+COL_EMBEDDING_CACHE = "embedding_cache"
+COL_EMBEDDING_OUTBOX = "embedding_outbox"  #Fila antiga (ver embedding_worker --migrar-outbox)
+COL_COUNTERS = "counters"
+COL_CACHE_VERSIONS = "cache_versions"
+COL_MATCHES = "matches"
+COL_MATCHES_STATE = "matches_state"
+COL_EMBEDDING_REDUCOES = "embedding_reducoes"
+COL_SKILLS = "skills"
+
+#Constantes de opções das vagas (formulário de cadastro e filtros de busca)
+TIPOS_CONTRATACAO = ["CLT", "PJ", "Estágio", "Temporário"]
+ESTADOS_BRASIL = [
+    "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA", "MT", "MS", "MG",
+    "PA", "PB", "PR", "PE", "PI", "RJ", "RN", "RS", "RO", "RR", "SC", "SP", "SE", "TO"
+]
+
+#Modelo de embeddings do provedor Gemini (768 dimensões)
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+
+def get_config(name, default=None):
+    """
+    Lê uma configuração do secrets.toml; se não existir, tenta as variáveis de ambiente.
+    """
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except Exception:
+        pass  #Sem secrets.toml (ex: script rodando fora do Streamlit)
+    return os.environ.get(name, default)
+
 
 #--- Conexão ao Google AI Studio ---
 @st.cache_resource
@@ -18,8 +62,10 @@ def configure_google_ai():
     """
     try:
         #Pega a chave do secrets.toml
-        if "GOOGLE_AI_KEY" in st.secrets:
-            google_api_key = st.secrets["GOOGLE_AI_KEY"]
+        google_api_key = get_config("GOOGLE_AI_KEY")
+        if google_api_key:
+            #Import tardio: o SDK do Google é pesado e só o provedor Gemini precisa dele
+            import google.generativeai as genai
             genai.configure(api_key=google_api_key)
             return True
         else:
@@ -30,119 +76,874 @@ def configure_google_ai():
         return False
 
 
-def create_embedding(text_to_embed):
+@st.cache_resource
+def get_embedding_cache():
     """
-    Gera o embedding (vetor) para o texto.
-    Modelo: text-embedding-004 (768 dimensões).
+    Cache de embeddings compartilhado pelo processo (LRU em memória + coleção no Mongo).
+    A coleção é resolvida a cada acesso, então o cache continua funcionando (só em memória)
+    se o banco estiver fora.
     """
-    if not configure_google_ai():
-        return None
+    def _collection():
+        db = get_db()
+        return db[COL_EMBEDDING_CACHE] if db is not None else None
+
+    max_size = int(get_config("EMBEDDING_CACHE_SIZE", 2048))
+    return EmbeddingCache(_collection, max_size=max_size)
+
+
+@st.cache_resource
+def get_embedding_provider():
+    """
+    Provedor de embeddings do processo, escolhido pelo secret EMBEDDING_PROVIDER:
+    - "gemini" (padrão): API do Google (text-embedding-004);
+    - "local": modelo sentence-transformers/ONNX em EMBEDDING_MODEL_PATH ou, sem caminho,
+      o HashingProvider (sem modelo). Ambos rodam em CPU, sem rede e sem cota.
+    """
+    #Import tardio: os provedores (e o NumPy) só são carregados na primeira chamada
+    from embedding_providers import GeminiProvider, HashingProvider, SentenceTransformerProvider
+
+    nome = str(get_config("EMBEDDING_PROVIDER", "gemini")).lower()
+    if nome == "local":
+        model_path = get_config("EMBEDDING_MODEL_PATH")
+        if model_path:
+            return SentenceTransformerProvider(model_path, batch_size=int(get_config("EMBEDDING_LOCAL_BATCH", 64)))
+        workers = get_config("EMBEDDING_WORKERS")
+        return HashingProvider(workers=int(workers) if workers else None)
+    if nome != "gemini":
+        print(f"⚠️ EMBEDDING_PROVIDER inválido ({nome}); usando 'gemini'.")
+    #lambda: configure_google_ai é resolvida a cada chamada (pode ser trocada em scripts)
+    return GeminiProvider(lambda: configure_google_ai(), model=EMBEDDING_MODEL)
+
+
+@st.cache_resource
+def get_embedding_scheduler():
+    """
+    Escalonador único do processo para as chamadas ao provedor (ver embedding_scheduler):
+    cota compartilhada (EMBEDDING_RPM / EMBEDDING_TPM), buscas e formulários antes do backfill
+    (EMBEDDING_RESERVA_INTERATIVA: fração da cota que o background não usa) e textos idênticos
+    em voo resolvidos por uma única chamada. Os vetores vão para o cache assim que chegam.
+    """
+    cache = get_embedding_cache()
+    #lambda: o provedor é resolvido a cada chamada (pode ser trocado em scripts e benchmarks)
+    return EmbeddingScheduler(
+        lambda: get_embedding_provider(),
+        requests_per_minute=int(get_config("EMBEDDING_RPM", 100)),
+        tokens_per_minute=int(get_config("EMBEDDING_TPM", 1_000_000)),
+        workers=int(get_config("EMBEDDING_SCHEDULER_WORKERS", 2)),
+        reserva_interativa=float(get_config("EMBEDDING_RESERVA_INTERATIVA", 0.2)),
+        on_result=cache.set_many
+    )
+
 
+@timed()
+def create_embedding(text_to_embed, task_type="RETRIEVAL_DOCUMENT", prioridade=INTERATIVA, timeout=None):
+    """
+    Gera o embedding (vetor) para o texto com o provedor configurado.
+    Modelo padrão: text-embedding-004 (768 dimensões).
+    Textos já vetorizados antes são servidos pelo cache, sem chamar o provedor.
+    A chamada passa pelo escalonador do processo; interativa espera no máximo timeout segundos
+    (padrão EMBEDDING_TIMEOUT_INTERATIVO = 20) pela fila e pela cota.
+    """
+    provider = get_embedding_provider()
+    cache = get_embedding_cache()
+    cache_key = make_cache_key(provider.name, task_type, text_to_embed)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    if timeout is None and prioridade == INTERATIVA:
+        timeout = float(get_config("EMBEDDING_TIMEOUT_INTERATIVO", 20))
     try:
-        #O modelo text-embedding-004 gera 768 dimensões por padrão.
-        #Não definimos output_dimensionality para evitar cortes.
-        result = genai.embed_content(
-            model='models/text-embedding-004',
-            content=text_to_embed,
-            task_type="RETRIEVAL_DOCUMENT"
-        )
-        return result['embedding']
+        return get_embedding_scheduler().embed([text_to_embed], task_type, prioridade, timeout=timeout)[0]
     except Exception as e:
-        #Retorna None para que o script saiba que falhou (cota ou erro)
-        print(f"⚠️ Erro na API do Google: {e}")
+        #Retorna None para que o script saiba que falhou (cota, tempo esgotado ou erro)
+        print(f"⚠️ Erro no provedor de embeddings ({provider.name}): {e}")
         return None
 
+@timed()
+def create_embeddings_batch(texts, task_type="RETRIEVAL_DOCUMENT", rate_limiter=None, prioridade=BACKGROUND):
+    """
+    Gera embeddings para uma lista de textos, em lotes de até provider.max_batch por chamada.
+    Textos já presentes no cache não vão para o provedor.
+    As chamadas passam pelo escalonador do processo (cota compartilhada, prioridade background);
+    rate_limiter, se passado, é um teto extra só deste chamador (ex: a cota escolhida na página 06).
+    Provedores locais não são limitados.
+    Retorna a lista de vetores na mesma ordem dos textos, ou None se o provedor falhar.
+    """
+    provider = get_embedding_provider()
+    cache = get_embedding_cache()
+    keys = [make_cache_key(provider.name, task_type, text) for text in texts]
+    vectors = cache.get_many(keys)
+
+    #Textos distintos que ainda precisam ir para o provedor
+    pendentes = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors:
+            pendentes[key] = text
+
+    if pendentes:
+        scheduler = get_embedding_scheduler()
+        itens = list(pendentes.items())
+        for start in range(0, len(itens), provider.max_batch):
+            lote = itens[start:start + provider.max_batch]
+            lote_textos = [text for _, text in lote]
+            if rate_limiter is not None and provider.remote:
+                rate_limiter.acquire(sum(estimate_tokens(text) for text in lote_textos))
+            try:
+                lote_vetores = scheduler.embed(lote_textos, task_type, prioridade)
+            except Exception as e:
+                print(f"⚠️ Erro no provedor de embeddings {provider.name} (lote de {len(lote)}): {e}")
+                return None
+
+            vectors.update((key, vector) for (key, _), vector in zip(lote, lote_vetores))
+
+    return [vectors[key] for key in keys]
+
+
+def get_embedding_storage():
+    """Formato do campo embedding nas gravações novas (EMBEDDING_STORAGE: float32, int8 ou array)."""
+    from embedding_storage import EMBEDDING_STORAGES
+
+    storage = str(get_config("EMBEDDING_STORAGE", "float32")).lower()
+    if storage not in EMBEDDING_STORAGES:
+        print(f"⚠️ EMBEDDING_STORAGE inválido ({storage}); usando 'float32'.")
+        return "float32"
+    return storage
+
+
+def store_embedding(vector):
+    """Vetor no formato de armazenamento configurado, pronto para o $set do campo embedding."""
+    from embedding_storage import pack_embedding
+    return pack_embedding(vector, get_embedding_storage())
+
+
+#Fila de embeddings no próprio documento (ver embedding_worker): o $unset ao gravar o vetor
+CAMPOS_FILA_EMBEDDING = {"embedding_pendente": "", "embedding_disponivel_em": "", "embedding_lease": "", "embedding_tentativas": ""}
+CAMPOS_PENDENTE = {"embedding": [], "embedding_pendente": True}
+
+
+def inline_embedding_fields(text_to_embed, task_type="RETRIEVAL_DOCUMENT"):
+    """
+    Campos de embedding para um documento novo.
+    Com um provedor local o vetor é gerado na hora (custa milissegundos); com o Gemini o documento
+    vai com `embedding: []` e `embedding_pendente: true`, e o vetor fica para o embedding_worker:
+    o próprio insert põe o documento na fila.
+    """
+    provider = get_embedding_provider()
+    if not provider.remote:
+        vector = create_embedding(text_to_embed, task_type)
+        if vector is not None:
+            return {
+                "embedding": store_embedding(vector),
+                "embedding_modelo": provider.name,
+                "embedding_atualizado_em": datetime.datetime.now(datetime.timezone.utc)
+            }
+    return dict(CAMPOS_PENDENTE)
+
+
+def inline_embedding_fields_batch(texts, task_type="RETRIEVAL_DOCUMENT"):
+    """
+    Versão em lote de inline_embedding_fields (importação): com um provedor local, os vetores
+    saem de create_embeddings_batch (lotes de provider.max_batch); com o Gemini, ou se o provedor
+    falhar, todos os documentos vão com `embedding: []` para a fila do embedding_worker.
+    """
+    provider = get_embedding_provider()
+    if not provider.remote and texts:
+        vectors = create_embeddings_batch(texts, task_type)
+        if vectors is not None:
+            agora = datetime.datetime.now(datetime.timezone.utc)
+            return [
+                {"embedding": store_embedding(v), "embedding_modelo": provider.name, "embedding_atualizado_em": agora}
+                for v in vectors
+            ]
+    return [dict(CAMPOS_PENDENTE) for _ in texts]
+
 #--- Conexão ao MongoDB Atlas ---
+def _int_config(name, default=None):
+    value = get_config(name, default)
+    return int(value) if value not in (None, "") else None
+
+
+def mongo_client_options():
+    """
+    Opções do MongoClient (secrets.toml ou variáveis de ambiente). Ausentes = padrão do pymongo.
+    MONGO_COMPRESSORS aceita "zstd,snappy,zlib" (zstd e snappy precisam dos pacotes zstandard / python-snappy).
+    """
+    options = {
+        "maxPoolSize": _int_config("MONGO_MAX_POOL_SIZE", 50),
+        "minPoolSize": _int_config("MONGO_MIN_POOL_SIZE", 0),
+        "maxIdleTimeMS": _int_config("MONGO_MAX_IDLE_TIME_MS", 300_000),
+        "waitQueueTimeoutMS": _int_config("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10_000),
+        "connectTimeoutMS": _int_config("MONGO_CONNECT_TIMEOUT_MS", 5000),
+        "serverSelectionTimeoutMS": _int_config("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "socketTimeoutMS": _int_config("MONGO_SOCKET_TIMEOUT_MS", 30_000),
+        "appname": get_config("MONGO_APP_NAME", "LabBD_App")
+    }
+    compressors = get_config("MONGO_COMPRESSORS")
+    if compressors:
+        options["compressors"] = compressors
+    return {k: v for k, v in options.items() if v is not None}
+
+
 @st.cache_resource
+def get_connection_manager():
+    """
+    Gerenciador da conexão do processo (ver connection_manager.py). Nunca é None: se a conexão
+    falhar, o gerenciador tenta de novo nos próximos acessos, sem precisar reiniciar o app.
+    """
+    listener = get_command_listener(
+        slow_ms=float(get_config("METRICS_SLOW_MS", 100)),
+        measure_reply_bytes=str(get_config("METRICS_REPLY_BYTES", "true")).lower() != "false"
+    )
+    start_metrics_exporter()
+    return MongoConnectionManager(
+        lambda: get_config("MONGO_URI"),
+        options=mongo_client_options(),
+        listeners=[listener],
+        #Resolvido a cada criação (scripts podem trocar db_connection.MongoClient, ex: mongomock)
+        client_factory=lambda uri, **kwargs: MongoClient(uri, **kwargs),
+        read_only_preference=get_config("MONGO_READ_PREFERENCE_LEITURA", "primary"),
+        retry_interval=float(get_config("MONGO_RETRY_SECONDS", 5))
+    )
+
+
 def get_mongo_client():
     """
-    Conecta-se ao MongoDB Atlas usando a URI dos segredos.
-    Usa @st.cache_resource para manter a conexão viva.
+    Cliente do MongoDB Atlas (URI dos segredos ou da variável de ambiente MONGO_URI).
+    A conexão é preguiçosa e não há ping bloqueante; retorna None só enquanto o cliente
+    não puder ser criado (o erro aparece na tela e a próxima chamada tenta de novo).
     """
+    manager = get_connection_manager()
+    client = manager.client()
+    if client is None and manager.last_error:
+        st.error(f"Falha ao conectar ao MongoDB: {manager.last_error}", icon="🚨")
+    return client
+
+
+#Threads dentro de leitura_primaria(): get_db(read_only=True) ignora a read preference de leitura
+_leitura_primaria = threading.local()
+
+
+@contextlib.contextmanager
+def leitura_primaria():
+    """
+    Dentro do bloco, as leituras desta thread vão para o primário mesmo com read_only=True
+    (data_cache: a primeira carga depois de uma escrita não pode vir de um secundário atrasado).
+    """
+    anterior = getattr(_leitura_primaria, "ativa", False)
+    _leitura_primaria.ativa = True
     try:
-        mongo_uri = st.secrets["MONGO_URI"]
-        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-        #Testa a conexão
-        client.server_info()
-        print("Conectado ao MongoDB Atlas com sucesso!")
-        return client
-    except ConnectionFailure:
-        st.error("Falha ao conectar ao MongoDB Atlas. Verifique sua MONGO_URI e o IP Access List.", icon="🚨")
-        return None
-    except Exception as e:
-        st.error(f"Erro inesperado ao conectar ao Mongo: {e}")
-        return None
+        yield
+    finally:
+        _leitura_primaria.ativa = anterior
 
 
-def get_db():
-    """Retorna a instância do banco de dados 'Empregos'."""
-    client = get_mongo_client()
-    if client:  #Esta checagem (if client) está OK!
-        return client[DB_NAME]
-    return None
+def get_db(read_only=False):
+    """
+    Retorna a instância do banco de dados 'Empregos' (ou do banco em MONGO_DB, ex: benchmarks).
+    read_only=True usa a read preference de leitura (MONGO_READ_PREFERENCE_LEITURA), para as
+    páginas que só listam/buscam, exceto dentro de leitura_primaria().
+    """
+    if get_mongo_client() is None:
+        return None
+    read_only = read_only and not getattr(_leitura_primaria, "ativa", False)
+    return get_connection_manager().database(get_config("MONGO_DB", DB_NAME), read_only=read_only)
 
 
-def get_collections():
+def get_collections(read_only=False):
     """Retorna as coleções de vagas, currículos e usuários."""
-    db = get_db()
+    db = get_db(read_only=read_only)
 
     if db is not None:
         return db[COL_VAGAS], db[COL_CURRICULOS], db[COL_USUARIOS]
     return None, None, None
 
-#--- Função de Pesquisa RAG (Retrieval) ---
-#Vetoriza a consulta e usa o Atlas Vector Search
-def search_rag(
-    user_query: str,
-    target_collection: Literal["vagas", "curriculos"],
-    limit: int = 5
-):
+@st.cache_resource
+def start_metrics_exporter():
     """
-    Realiza a busca semântica no MongoDB Atlas.
+    Sobe o endpoint /metrics (formato Prometheus) na porta METRICS_PORT, uma vez por processo.
+    Sem METRICS_PORT, as métricas ficam só na página de métricas (admin).
     """
-    vagas_col, curriculos_col, _ = get_collections()
+    port = get_config("METRICS_PORT")
+    if not port:
+        return None
+    try:
+        server = start_exporter(int(port), gauges_fn=metrics_gauges)
+        print(f"📈 Métricas em http://0.0.0.0:{port}/metrics")
+        return server
+    except OSError as e:
+        #Outro processo já usa a porta (ex: várias instâncias na mesma máquina)
+        print(f"⚠️ Não foi possível abrir o endpoint de métricas na porta {port}: {e}")
+        return None
 
-    if target_collection == "vagas":
-        collection = vagas_col
-        index_name = "vagas_embedding_index" 
-        return_fields = {"titulo": 1, "descricao": 1, "empresa": 1, "salario": 1, "skills": 1}
-    elif target_collection == "curriculos":
-        collection = curriculos_col
-        index_name = "curriculos_embedding_index"
-        return_fields = {"nome": 1, "resumo": 1, "experiencia": 1, "skills": 1, "formacao": 1}
-    else:
-        print("Coleção alvo inválida.")
-        return []
 
-    #Gera embedding da pergunta
-    query_vector = create_embedding(user_query)
-    if query_vector is None:
+def metrics_gauges():
+    """Caches (listagens e embeddings) e fila de embeddings no formato de gauges do metrics.prometheus_text."""
+    from data_cache import cache_stats  #data_cache importa este módulo
+
+    embeddings = get_embedding_cache().snapshot()
+    fila = get_embedding_scheduler().snapshot()
+    loaders = cache_stats()
+    pool = get_connection_manager().pool_listener.snapshot()
+    return {
+        "mongo_pool_connections": [({"estado": "abertas"}, pool["abertas"]), ({"estado": "em_uso"}, pool["em_uso"])],
+        "embedding_cache_hits": [
+            ({"nivel": "memoria"}, embeddings["memory_hits"]),
+            ({"nivel": "persistente"}, embeddings["persistent_hits"])
+        ],
+        "embedding_cache_misses": embeddings["misses"],
+        "embedding_cache_hit_rate": embeddings["hit_rate"],
+        "embedding_cache_size": embeddings["memory_size"],
+        "embedding_fila": [({"prioridade": prioridade}, textos) for prioridade, textos in fila["fila"].items()],
+        "embedding_em_voo": fila["em_voo"],
+        "data_cache_calls": [({"loader": nome}, stats["chamadas"]) for nome, stats in loaders.items()],
+        "data_cache_hit_rate": [({"loader": nome}, stats["hit_rate"]) for nome, stats in loaders.items()]
+    }
+
+
+#--- Índices ---
+#Índices de texto (o MongoDB permite um por coleção), com stemming em português.
+#Os pesos definem a relevância de cada campo no textScore.
+TEXT_INDEXES = {
+    COL_VAGAS: {"titulo": 10, "skills": 5, "empresa": 5, "cidade": 5, "descricao": 1},
+    COL_CURRICULOS: {"skills": 10, "formacao": 5, "idiomas": 5, "resumo": 1, "experiencia": 1}
+}
+
+
+def once_per_process(fn):
+    """
+    Como @st.cache_resource para funções sem argumentos, mas sem guardar o resultado None
+    (banco fora do ar): a próxima chamada tenta de novo, em vez de o processo ficar sem os
+    índices até reiniciar. Qualquer outro resultado fica guardado; .clear() força nova execução.
+    """
+    lock = threading.Lock()
+    estado = {}
+
+    @functools.wraps(fn)
+    def wrapper():
+        if "resultado" in estado:
+            return estado["resultado"]
+        with lock:
+            if "resultado" not in estado:
+                resultado = fn()
+                if resultado is None:
+                    return None
+                estado["resultado"] = resultado
+            return estado["resultado"]
+
+    wrapper.clear = estado.clear
+    return wrapper
+
+
+@once_per_process
+def ensure_indexes():
+    """
+    Cria (uma vez por processo) os índices usados pelas consultas do app.
+    create_index é idempotente, então rodar de novo não custa nada além de um round trip.
+    Retorna None sem banco (nova tentativa na próxima chamada; o get_db já espera o retry_interval).
+    """
+    db = get_db()
+    if db is None:
+        return None
+
+    #O id sequencial é único (protege contra qualquer alocação duplicada)
+    for nome_colecao in (COL_VAGAS, COL_CURRICULOS):
+        try:
+            db[nome_colecao].create_index("id", unique=True, name=f"{nome_colecao}_id_unique")
+        except Exception as e:
+            print(f"⚠️ Não foi possível criar o índice único de id em '{nome_colecao}': {e}")
+        #Ordem das listagens paginadas por keyset (mais recentes primeiro)
+        try:
+            db[nome_colecao].create_index([("data_cadastro", -1), ("_id", -1)], name=f"{nome_colecao}_listagem")
+        except Exception as e:
+            print(f"⚠️ Não foi possível criar o índice de listagem em '{nome_colecao}': {e}")
+
+    #Skills canônicas (skills.py): multikey nos documentos; alias único no vocabulário
+    for nome_colecao in (COL_VAGAS, COL_CURRICULOS):
+        try:
+            db[nome_colecao].create_index("skill_ids", name=f"{nome_colecao}_skill_ids")
+        except Exception as e:
+            print(f"⚠️ Não foi possível criar o índice de skill_ids em '{nome_colecao}': {e}")
+        #Atualização incremental do SkillIndex (marca d'água em skills_atualizado_em)
+        try:
+            db[nome_colecao].create_index("skills_atualizado_em", sparse=True, name=f"{nome_colecao}_skills_atualizado")
+        except Exception as e:
+            print(f"⚠️ Não foi possível criar o índice de skills_atualizado_em em '{nome_colecao}': {e}")
+    try:
+        db[COL_SKILLS].create_index("aliases", unique=True, name=f"{COL_SKILLS}_aliases_unique")
+    except Exception as e:
+        print(f"⚠️ Não foi possível criar o índice de aliases em '{COL_SKILLS}': {e}")
+
+    #Faixas LSH das vagas (dedup.py): multikey, consultado com $in na verificação de repostagens
+    try:
+        db[COL_VAGAS].create_index("lsh_bandas", sparse=True, name=f"{COL_VAGAS}_lsh")
+    except Exception as e:
+        print(f"⚠️ Não foi possível criar o índice LSH em '{COL_VAGAS}': {e}")
+
+    for nome_colecao, pesos in TEXT_INDEXES.items():
+        try:
+            db[nome_colecao].create_index(
+                [(campo, TEXT) for campo in pesos],
+                weights=pesos,
+                default_language="portuguese",
+                name=f"{nome_colecao}_text_index"
+            )
+        except Exception as e:
+            print(f"⚠️ Não foi possível criar o índice de texto de '{nome_colecao}': {e}")
+    return True
+
+#--- IDs sequenciais ---
+@st.cache_resource
+def get_id_allocator():
+    """
+    Alocador de ids compartilhado pelo processo (contadores na coleção `counters`).
+    ID_BLOCK_SIZE > 1 reserva blocos de ids por processo (menos round trips, ids com lacunas).
+    """
+    ensure_indexes()
+    block_size = int(get_config("ID_BLOCK_SIZE", 1))
+    return IdAllocator(get_db, counters_collection=COL_COUNTERS, block_size=block_size)
+
+
+#--- Vocabulário de skills ---
+@st.cache_resource(ttl=600)
+def get_skill_dictionary():
+    """
+    Vocabulário canônico de skills (skills.py), relido a cada 10 min para pegar aliases e skills
+    registrados por outros processos. Sem conexão, fica vazio (as skills são gravadas como digitadas).
+    """
+    def _collection():
+        db = get_db()
+        return db[COL_SKILLS] if db is not None else None
+
+    from skills import SkillDictionary
+
+    dicionario = SkillDictionary(_collection, lambda count: get_id_allocator().reserve(COL_SKILLS, count))
+    try:
+        ensure_indexes()
+        dicionario.carregar()
+    except Exception as e:
+        print(f"⚠️ Erro ao carregar o vocabulário de skills: {e}")
+    return dicionario
+
+
+@st.cache_resource
+def get_skill_index(target_collection: Literal["vagas", "curriculos"] = "curriculos"):
+    """Bitsets de skill_ids da coleção (ranking por skills em comum), mantidos pelo processo."""
+    def _collection():
+        db = get_db(read_only=True)
+        return db[target_collection] if db is not None else None
+
+    from skills import SkillIndex
+    return SkillIndex(_collection, refresh_interval=float(get_config("LOCAL_INDEX_REFRESH_SECONDS", 30)))
+
+
+def next_id(target_collection: Literal["vagas", "curriculos"]):
+    """Próximo id sequencial (campo `id`) para um novo documento da coleção."""
+    return get_id_allocator().next_id(target_collection)
+
+#--- Matching em lote (ver matching_job.py) ---
+def get_top_matches(origem: Literal["vagas", "curriculos"], doc_id):
+    """
+    Top-k pré-calculado pelo matching_job para um documento (_id) de vagas ou currículos:
+    lista de {doc_id, id, score} da outra coleção, do mais parecido para o menos.
+    """
+    db = get_db()
+    if db is None:
         return []
+    doc = db[COL_MATCHES].find_one({"_id": f"{origem}:{doc_id}"}, {"matches": 1})
+    return doc.get("matches", []) if doc else []
+
+#--- Busca textual (índice de texto do MongoDB) ---
+def text_search_filter(user_query: str):
+    """
+    Filtro $text para usar no primeiro $match de um find/aggregate.
+    O índice em português ignora acentos, maiúsculas e flexões (ex: "desenvolvedora" acha "desenvolvedor").
+    """
+    ensure_indexes()
+    return {"$text": {"$search": user_query, "$language": "portuguese"}}
+
+#--- Função de Pesquisa RAG (Retrieval) ---
+#Configuração de cada coleção pesquisável.
+#filter_fields são os campos que podem ser usados no filtro do $vectorSearch (precisam
+#estar declarados como "filter" na definição do índice vetorial).
+SEARCH_TARGETS = {
+    "vagas": {
+        "collection": COL_VAGAS,
+        "index_name": "vagas_embedding_index",
+        "return_fields": {"titulo": 1, "descricao": 1, "empresa": 1, "salario": 1, "skills": 1},
+        "filter_fields": ("estado", "cidade", "tipo_contratacao", "salario", "empresa")
+    },
+    "curriculos": {
+        "collection": COL_CURRICULOS,
+        "index_name": "curriculos_embedding_index",
+        "return_fields": {"nome": 1, "resumo": 1, "experiencia": 1, "skills": 1, "formacao": 1},
+        "filter_fields": ()
+    }
+}
+
+#Backends de busca vetorial:
+#  "atlas" -> $vectorSearch do MongoDB Atlas (padrão)
+#  "local" -> índice NumPy em memória (funciona com um mongod local comum)
+#  "auto"  -> tenta o Atlas e cai para o índice local se ele falhar
+VECTOR_BACKENDS = ("atlas", "local", "auto")
+
+#Modos de busca no índice local:
+#  "exato"         -> produto com todos os vetores completos (padrão)
+#  "dois_estagios" -> pré-filtro na representação reduzida (VECTOR_REDUCAO) + reordenação da
+#                     shortlist com os vetores completos
+SEARCH_MODES = ("exato", "dois_estagios")
+
+#numCandidates = limit * fator (recomendação do Atlas: 10x a 20x), entre os limites abaixo
+NUM_CANDIDATES_MIN = 100
+NUM_CANDIDATES_MAX = 10000
+
+
+def vector_index_definition(target_collection: Literal["vagas", "curriculos"]):
+    """Definição do índice do Atlas Vector Search (vetor + campos de filtro)."""
+    from vector_index import EMBEDDING_DIM
+    target = SEARCH_TARGETS[target_collection]
+    fields = [{"type": "vector", "path": "embedding", "numDimensions": EMBEDDING_DIM, "similarity": "cosine"}]
+    fields += [{"type": "filter", "path": campo} for campo in target["filter_fields"]]
+    return {"fields": fields}
+
+
+@once_per_process
+def ensure_vector_indexes():
+    """
+    Cria ou atualiza (uma vez por processo) os índices vetoriais do Atlas para que
+    aceitem os campos de filtro. Em um mongod comum isso falha e é ignorado (False fica guardado).
+    Só atualiza quando a definição mudou, para não disparar reconstruções à toa.
+    Sem banco retorna None, e a próxima chamada tenta de novo.
+    """
+    db = get_db()
+    if db is None:
+        return None
+
+    for target_collection, target in SEARCH_TARGETS.items():
+        collection = db[target["collection"]]
+        definition = vector_index_definition(target_collection)
+        try:
+            existentes = {idx["name"]: idx for idx in collection.list_search_indexes()}
+            atual = existentes.get(target["index_name"])
+            if atual is None:
+                collection.create_search_index(
+                    SearchIndexModel(definition=definition, name=target["index_name"], type="vectorSearch")
+                )
+                print(f"🆕 Índice vetorial '{target['index_name']}' criado.")
+            elif atual.get("latestDefinition") != definition:
+                collection.update_search_index(target["index_name"], definition)
+                print(f"🔄 Índice vetorial '{target['index_name']}' atualizado.")
+        except Exception as e:
+            print(f"⚠️ Não foi possível verificar o índice vetorial '{target['index_name']}': {e}")
+            return False
+    return True
+
+
+def num_candidates_for(limit):
+    """Quantos vizinhos o ANN avalia: cresce com o limit (VECTOR_NUM_CANDIDATES_FACTOR, padrão 20)."""
+    factor = int(get_config("VECTOR_NUM_CANDIDATES_FACTOR", 20))
+    return max(NUM_CANDIDATES_MIN, min(NUM_CANDIDATES_MAX, limit * factor))
+
+
+def build_vector_filter(filtros: dict = None):
+    """
+    Converte os filtros estruturados da busca em um filtro MQL para o $vectorSearch.
+    Chaves aceitas: estado, cidade, tipo_contratacao, empresa (valor único ou lista),
+    salario_min e salario_max. Valores vazios são ignorados.
+    Retorna None quando não há filtro.
+    """
+    if not filtros:
+        return None
+
+    condicoes = []
+    for campo in ("estado", "cidade", "tipo_contratacao", "empresa"):
+        valor = filtros.get(campo)
+        if isinstance(valor, (list, tuple, set)):
+            valores = [v for v in valor if v]
+            if valores:
+                condicoes.append({campo: {"$in": valores}})
+        elif valor:
+            condicoes.append({campo: {"$eq": valor}})
+
+    faixa = {}
+    if filtros.get("salario_min") is not None:
+        faixa["$gte"] = float(filtros["salario_min"])
+    if filtros.get("salario_max") is not None:
+        faixa["$lte"] = float(filtros["salario_max"])
+    if faixa:
+        condicoes.append({"salario": faixa})
+
+    if not condicoes:
+        return None
+    if len(condicoes) == 1:
+        return condicoes[0]
+    return {"$and": condicoes}
+
+
+def get_vector_backend():
+    """Backend configurado em VECTOR_BACKEND (secrets ou variável de ambiente)."""
+    backend = str(get_config("VECTOR_BACKEND", "atlas")).lower()
+    if backend not in VECTOR_BACKENDS:
+        print(f"⚠️ VECTOR_BACKEND '{backend}' inválido. Usando 'atlas'.")
+        return "atlas"
+    return backend
+
+
+def get_search_mode(modo=None):
+    """Modo pedido na chamada ou o configurado em VECTOR_MODO."""
+    modo = str(modo or get_config("VECTOR_MODO", "exato")).lower()
+    if modo not in SEARCH_MODES:
+        print(f"⚠️ VECTOR_MODO '{modo}' inválido. Usando 'exato'.")
+        return "exato"
+    return modo
+
+
+def shortlist_for(limit):
+    """Tamanho da shortlist do modo dois_estagios (VECTOR_SHORTLIST_FATOR x limit, mínimo 100)."""
+    return max(100, limit * int(get_config("VECTOR_SHORTLIST_FATOR", 10)))
+
+
+@st.cache_resource(ttl=600)
+def get_vector_reduction(target_collection: Literal["vagas", "curriculos"]):
+    """
+    Redução configurada em VECTOR_REDUCAO (padrão "truncado:128"; "pca" usa a projeção salva
+    por `python -m embedding_reduction`). None se não houver redução utilizável.
+    Relida a cada 10 min, para pegar um PCA reajustado sem reiniciar.
+    """
+    from embedding_reduction import Reducao, parse_reducao
+    from vector_index import EMBEDDING_DIM
+
+    try:
+        tipo, dim = parse_reducao(get_config("VECTOR_REDUCAO", "truncado:128"))
+    except ValueError as e:
+        print(f"⚠️ {e}")
+        return None
+    if tipo == "truncado":
+        return Reducao("truncado", min(dim or 128, EMBEDDING_DIM))
+
+    db = get_db(read_only=True)
+    doc = db[COL_EMBEDDING_REDUCOES].find_one({"_id": target_collection}) if db is not None else None
+    if doc is None:
+        print(f"⚠️ Nenhum PCA ajustado para '{target_collection}' (python -m embedding_reduction). Busca exata.")
+        return None
+    return Reducao.from_doc(doc)
+
+
+@st.cache_resource
+def get_local_index(target_collection: Literal["vagas", "curriculos"]):
+    """
+    Índice vetorial local (um por coleção), carregado sob demanda e mantido pelo processo.
+    Com VECTOR_SNAPSHOT_DIR, começa pelo snapshot Parquet da coleção (python -m snapshot) e o
+    primeiro refresh só lê do Mongo o que mudou depois dele.
+    """
+    from vector_index import LocalVectorIndex
+
+    target = SEARCH_TARGETS[target_collection]
+
+    def _collection():
+        db = get_db(read_only=True)
+        return db[target["collection"]] if db is not None else None
+
+    refresh_interval = float(get_config("LOCAL_INDEX_REFRESH_SECONDS", 30))
+    index = LocalVectorIndex(
+        _collection,
+        target["return_fields"],
+        filter_fields=target["filter_fields"],
+        refresh_interval=refresh_interval
+    )
+
+    pasta = get_config("VECTOR_SNAPSHOT_DIR")
+    if pasta:
+        #Import tardio: o pyarrow só é carregado quando o warm start está configurado
+        from snapshot import aquecer_indice, caminho_snapshot
+        caminho = caminho_snapshot(pasta, target["collection"])
+        if os.path.exists(caminho):
+            idade_maxima = datetime.timedelta(hours=float(get_config("VECTOR_SNAPSHOT_MAX_HORAS", 24)))
+            try:
+                carregados = aquecer_indice(index, caminho, idade_maxima=idade_maxima)
+                print(f"🔥 Índice local '{target_collection}': {carregados} vetores do snapshot {caminho}.")
+            except Exception as e:
+                #Índice pela metade não serve: recomeça vazio e carrega tudo do Mongo
+                print(f"⚠️ Erro no warm start do índice local: {e}")
+                index = LocalVectorIndex(
+                    _collection,
+                    target["return_fields"],
+                    filter_fields=target["filter_fields"],
+                    refresh_interval=refresh_interval
+                )
+    return index
+
+
+def _atlas_vector_search(collection, target, query_vector, limit, vector_filter=None):
+    ensure_vector_indexes()
+    vector_search = {
+        "index": target["index_name"],
+        "path": "embedding",
+        #O vetor da consulta vai no mesmo formato dos vetores indexados (binário float32/int8 ou array)
+        "queryVector": store_embedding(query_vector),
+        "numCandidates": num_candidates_for(limit),
+        "limit": limit
+    }
+    if vector_filter:
+        #Pré-filtro: o ANN só considera documentos que passam no filtro
+        vector_search["filter"] = vector_filter
 
-    #Vector Search
     aggregation_pipeline = [
-        {
-            "$vectorSearch": {
-                "index": index_name,
-                "path": "embedding", 
-                "queryVector": query_vector,
-                "numCandidates": 100, 
-                "limit": limit
-            }
-        },
+        {"$vectorSearch": vector_search},
         {
             "$project": {
                 "_id": 1,
                 "score": { "$meta": "vectorSearchScore" },
-                **return_fields
+                **target["return_fields"]
             }
         }
     ]
+    return list(collection.aggregate(aggregation_pipeline))
+
+
+def _local_vector_search(target_collection, query_vector, limit, vector_filter=None, modo="exato"):
+    index = get_local_index(target_collection)
+    index.refresh()
+    shortlist = None
+    if modo == "dois_estagios":
+        reducao = get_vector_reduction(target_collection)
+        atual = index.reduction
+        #A matriz reduzida só é (re)calculada quando a redução muda (ex: PCA reajustado)
+        if reducao is not None and (atual is None or (atual.nome, atual.ajustado_em) != (reducao.nome, reducao.ajustado_em)):
+            index.set_reduction(reducao)
+        if index.reduction is not None:
+            shortlist = shortlist_for(limit)
+    return index.search(query_vector, limit, vector_filter=vector_filter, shortlist=shortlist)
+
+
+@timed()
+def search_by_vector(
+    query_vector,
+    target_collection: Literal["vagas", "curriculos"],
+    limit: int = 5,
+    filtros: dict = None,
+    modo: str = None
+):
+    """
+    Busca vetorial a partir de um vetor já calculado (sem chamar a API de embeddings),
+    no backend configurado (VECTOR_BACKEND).
+    modo (ver SEARCH_MODES, padrão VECTOR_MODO) vale para o índice local; o Atlas já é
+    aproximado (ANN) e ignora o modo.
+    """
+    if target_collection not in SEARCH_TARGETS:
+        print("Coleção alvo inválida.")
+        return []
+    target = SEARCH_TARGETS[target_collection]
+
+    vector_filter = build_vector_filter(filtros)
+    if vector_filter and not target["filter_fields"]:
+        print(f"⚠️ Filtros estruturados não se aplicam a '{target_collection}'. Ignorando.")
+        vector_filter = None
+
+    backend = get_vector_backend()
+
+    if backend in ("atlas", "auto"):
+        db = get_db(read_only=True)
+        try:
+            if db is None:
+                raise ConnectionFailure("Sem conexão com o MongoDB.")
+            results = _atlas_vector_search(db[target["collection"]], target, query_vector, limit, vector_filter)
+            print(f"✅ Encontrados {len(results)} documentos similares em '{target_collection}'.")
+            return results
+        except Exception as e:
+            print(f"❌ Erro na Pesquisa Vetorial: {e}")
+            if backend == "atlas":
+                return []
+            print("↪️ Usando o índice vetorial local.")
 
     try:
-        results = list(collection.aggregate(aggregation_pipeline))
-        print(f"✅ Encontrados {len(results)} documentos similares em '{target_collection}'.")
+        results = _local_vector_search(target_collection, query_vector, limit, vector_filter, get_search_mode(modo))
+        print(f"✅ Encontrados {len(results)} documentos similares em '{target_collection}' (índice local).")
         return results
     except Exception as e:
-        print(f"❌ Erro na Pesquisa Vetorial: {e}")
-        return []
\ No newline at end of file
+        print(f"❌ Erro na Pesquisa Vetorial local: {e}")
+        return []
+
+
+#Vetoriza a consulta e usa o Atlas Vector Search (ou o índice local)
+@timed()
+def search_rag(
+    user_query: str,
+    target_collection: Literal["vagas", "curriculos"],
+    limit: int = 5,
+    filtros: dict = None,
+    modo: str = None
+):
+    """
+    Realiza a busca semântica no backend configurado (VECTOR_BACKEND).
+    filtros (ver build_vector_filter) são aplicados dentro da busca vetorial, não depois.
+    modo: "exato" ou "dois_estagios" (padrão VECTOR_MODO; ver SEARCH_MODES).
+    Todos os backends retornam o mesmo formato: _id, score e os campos de return_fields.
+    """
+    if target_collection not in SEARCH_TARGETS:
+        print("Coleção alvo inválida.")
+        return []
+
+    #Gera embedding da pergunta
+    query_vector = create_embedding(user_query)
+    if query_vector is None:
+        return []
+
+    return search_by_vector(query_vector, target_collection, limit, filtros, modo)
+
+
+@st.cache_resource
+def get_search_executor():
+    """Pool de threads compartilhado para as buscas concorrentes (SEARCH_WORKERS, padrão 8)."""
+    return ThreadPoolExecutor(max_workers=int(get_config("SEARCH_WORKERS", 8)), thread_name_prefix="busca")
+
+
+@timed()
+def search_rag_multi(
+    user_query: str,
+    targets=("vagas", "curriculos"),
+    limit: int = 5,
+    filtros: dict = None,
+    timeout: float = None
+):
+    """
+    Busca semântica em várias coleções de uma vez: o embedding da pergunta é gerado uma única vez
+    e as buscas rodam em paralelo, sob um orçamento de tempo compartilhado
+    (timeout, padrão SEARCH_TIMEOUT_SECONDS = 5s, contando também o embedding).
+    Retorna {coleção: resultados}; uma coleção que não respondeu a tempo (ou falhou) vem como None,
+    e as demais são devolvidas mesmo assim (resultado parcial).
+    Os filtros estruturados só são aplicados às coleções que os suportam (vagas).
+    """
+    if timeout is None:
+        timeout = float(get_config("SEARCH_TIMEOUT_SECONDS", 5))
+    inicio = time.monotonic()
+
+    resultados = {target: None for target in targets}
+    #O embedding usa o mesmo orçamento: um embedding lento falha dentro do prazo da busca
+    query_vector = create_embedding(user_query, timeout=timeout)
+    if query_vector is None:
+        return resultados
+
+    executor = get_search_executor()
+    futures = {}
+    for target in targets:
+        if target not in SEARCH_TARGETS:
+            print(f"Coleção alvo inválida: {target}")
+            continue
+        filtros_target = filtros if SEARCH_TARGETS[target]["filter_fields"] else None
+        futures[executor.submit(search_by_vector, query_vector, target, limit, filtros_target)] = target
+
+    restante = max(0.0, timeout - (time.monotonic() - inicio))
+    done, not_done = wait(futures, timeout=restante)
+
+    for future in done:
+        try:
+            resultados[futures[future]] = future.result()
+        except Exception as e:
+            print(f"❌ Erro na busca em '{futures[future]}': {e}")
+    for future in not_done:
+        #A busca continua no pool, mas o resultado é descartado
+        future.cancel()
+        print(f"⏱️ Busca em '{futures[future]}' excedeu o orçamento de {timeout:.1f}s.")
+
+    return resultados
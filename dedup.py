@@ -0,0 +1,263 @@
+"""
+Detecção de vagas quase duplicadas (repostagens com pequenas edições) por MinHash + LSH.
+
+Cada vaga recebe, na gravação:
+- `minhash`: assinatura MinHash (NUM_PERMUTACOES inteiros, binário uint32) dos shingles de
+  TAMANHO_SHINGLE palavras de titulo + descricao (sem acentos, minúsculas);
+- `lsh_bandas`: a assinatura cortada em BANDAS faixas, cada uma resumida em um hash. Duas vagas
+  com similaridade de Jaccard s dividem ao menos uma faixa com probabilidade 1 - (1 - s^r)^b.
+
+As faixas ficam no próprio documento, com um índice multikey (`vagas_lsh`): achar os candidatos
+é uma consulta $in indexada (uma por lote), sem varrer a coleção e sem reconstruir nada na subida
+do app. Os candidatos de cada vaga são ordenados pelo número de faixas em comum (até
+MAX_CANDIDATOS por vaga) e só eles são comparados pela assinatura (Jaccard estimado); acima de DEDUP_LIMIAR (0.8) a vaga
+nova é gravada como repostagem: `duplicata_de` = id da vaga original e `similaridade_duplicata`.
+Repostagens ficam fora do "Total de vagas" e das listagens (a não ser que o filtro peça).
+
+Vagas antigas (sem assinatura):
+    python -m dedup --backfill            # só calcula as assinaturas
+    python -m dedup --backfill --marcar   # e marca as repostagens já existentes (ordem de _id)
+
+Mudar NUM_PERMUTACOES, BANDAS, TAMANHO_SHINGLE ou SEMENTE invalida as assinaturas gravadas:
+rode o backfill com --refazer.
+"""
+import re
+import argparse
+import hashlib
+import unicodedata
+from collections import defaultdict
+import numpy as np
+from bson.binary import Binary
+from bson.regex import Regex
+from pymongo import UpdateOne
+from db_connection import get_config
+
+NUM_PERMUTACOES = 128
+BANDAS = 16  #16 faixas de 8 linhas: chance de virar candidato ~60% com Jaccard 0.7, ~95% com 0.8, >99% com 0.85
+LINHAS_POR_BANDA = NUM_PERMUTACOES // BANDAS
+TAMANHO_SHINGLE = 3
+SEMENTE = 20240601
+
+#Primo de Mersenne 2^31 - 1: (a * h + b) cabe em uint64 com h de 32 bits
+PRIMO = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(SEMENTE)
+_A = _rng.integers(1, int(PRIMO), size=NUM_PERMUTACOES, dtype=np.uint64)
+_B = _rng.integers(0, int(PRIMO), size=NUM_PERMUTACOES, dtype=np.uint64)
+
+LIMIAR_PADRAO = 0.8
+#Teto de candidatos comparados por vaga verificada (textos muito genéricos dividem faixas com muitas vagas);
+#os que dividem mais faixas vêm primeiro, então o corte descarta os menos parecidos
+MAX_CANDIDATOS = 50
+
+CAMPOS_DUPLICATA = ("minhash", "lsh_bandas", "duplicata_de", "similaridade_duplicata")
+
+
+def configuracao():
+    """(limiar, mesma_empresa) dos secrets: DEDUP_LIMIAR (0.8) e DEDUP_MESMA_EMPRESA (true)."""
+    limiar = float(get_config("DEDUP_LIMIAR", LIMIAR_PADRAO))
+    mesma_empresa = str(get_config("DEDUP_MESMA_EMPRESA", "true")).lower() != "false"
+    return limiar, mesma_empresa
+
+
+def palavras(texto):
+    texto = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode().lower()
+    return re.findall(r"[a-z0-9]+", texto)
+
+
+def shingles(titulo, descricao):
+    tokens = palavras(f"{titulo} {descricao}")
+    if len(tokens) <= TAMANHO_SHINGLE:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + TAMANHO_SHINGLE]) for i in range(len(tokens) - TAMANHO_SHINGLE + 1)}
+
+
+def assinatura(titulo, descricao):
+    """Assinatura MinHash (NUM_PERMUTACOES,) uint32 do texto da vaga."""
+    hashes = np.array([
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little")
+        for s in shingles(titulo, descricao)
+    ], dtype=np.uint64)
+    return ((hashes[:, None] * _A + _B) % PRIMO).min(axis=0).astype(np.uint32)
+
+
+def bandas(sig):
+    """Chaves LSH: "<faixa>:<hash das linhas da faixa>"."""
+    return [
+        f"{i}:{hashlib.blake2b(sig[i * LINHAS_POR_BANDA:(i + 1) * LINHAS_POR_BANDA].tobytes(), digest_size=8).hexdigest()}"
+        for i in range(BANDAS)
+    ]
+
+
+def similaridade(sig_a, sig_b):
+    """Jaccard estimado: fração de posições iguais nas assinaturas."""
+    return float(np.mean(sig_a == sig_b))
+
+
+def ler_assinatura(valor):
+    return np.frombuffer(valor, dtype="<u4").astype(np.uint32)
+
+
+def _empresa(valor):
+    #Mesma comparação do filtro no banco (_filtro_empresas: regex sem diferenciar maiúsculas)
+    return (valor or "").strip().lower()
+
+
+def _filtro_empresas(docs):
+    """Empresas das vagas do lote para o $match, com a mesma normalização de _empresa."""
+    filtro = []
+    for empresa in sorted({_empresa(doc.get("empresa")) for doc in docs}):
+        filtro.append(Regex(f"^\\s*{re.escape(empresa)}\\s*$", "i"))
+        if not empresa:
+            filtro.append(None)  #Vagas sem o campo empresa
+    return {"$in": filtro}
+
+
+def _candidatos(collection, docs, mesma_empresa, antes_de):
+    """
+    Vagas gravadas que dividem alguma faixa com as vagas do lote, em uma consulta só (a faixa é
+    indexada). Só originais viram candidatos: a repostagem de uma repostagem aponta para a
+    primeira vaga. Retorna {faixa: [candidatos]}; o corte por vaga fica com _ranquear.
+    """
+    match = {"lsh_bandas": {"$in": sorted({banda for doc in docs for banda in doc["lsh_bandas"]})}, "duplicata_de": None}
+    if antes_de is not None:
+        match["_id"] = {"$lt": antes_de}
+    if mesma_empresa:
+        match["empresa"] = _filtro_empresas(docs)
+    por_banda = defaultdict(list)
+    for candidato in collection.find(match, {"id": 1, "titulo": 1, "empresa": 1, "minhash": 1, "lsh_bandas": 1}):
+        candidato["assinatura"] = ler_assinatura(candidato.pop("minhash"))
+        for banda in candidato.pop("lsh_bandas"):
+            por_banda[banda].append(candidato)
+    return por_banda
+
+
+def _ranquear(por_banda, bs):
+    """
+    Candidatos de uma vaga, dos que dividem mais faixas com `bs` para os que dividem menos (as
+    mais parecidas; empate: menor _id), até MAX_CANDIDATOS.
+    """
+    comuns = defaultdict(int)
+    candidatos = {}
+    for banda in bs:
+        for candidato in por_banda.get(banda, ()):
+            comuns[candidato["_id"]] += 1
+            candidatos[candidato["_id"]] = candidato
+    ordem = sorted(comuns, key=lambda _id: (-comuns[_id], _id))[:MAX_CANDIDATOS]
+    return [candidatos[_id] for _id in ordem]
+
+
+def marcar_duplicatas(collection, docs, limiar=LIMIAR_PADRAO, mesma_empresa=True, antes_de=None):
+    """
+    Acrescenta `minhash` e `lsh_bandas` a cada vaga (precisa de id, titulo, descricao e empresa) e
+    marca as repostagens com `duplicata_de` / `similaridade_duplicata`. Compara com as vagas já
+    gravadas (uma consulta indexada para o lote inteiro; por vaga, os candidatos são ordenados por
+    faixas em comum) e com as anteriores do próprio lote. antes_de restringe as gravadas a _id
+    menor (backfill em ordem de _id).
+    Retorna [(vaga, original)] das repostagens encontradas.
+    """
+    assinaturas = []
+    for doc in docs:
+        sig = assinatura(doc["titulo"], doc["descricao"])
+        doc["minhash"] = Binary(sig.astype("<u4").tobytes())
+        doc["lsh_bandas"] = bandas(sig)
+        assinaturas.append(sig)
+    gravadas = _candidatos(collection, docs, mesma_empresa, antes_de) if docs else {}
+
+    por_banda = defaultdict(list)  #Originais do próprio lote, por faixa
+    marcados = []
+    for doc, sig in zip(docs, assinaturas):
+        bs = doc["lsh_bandas"]
+        candidatos = _ranquear(gravadas, bs)
+        vistos = set()
+        for banda in bs:
+            for original in por_banda.get(banda, ()):
+                if id(original) not in vistos:
+                    vistos.add(id(original))
+                    candidatos.append(original)
+
+        melhor, melhor_sim = None, limiar
+        for candidato in candidatos:
+            if mesma_empresa and _empresa(candidato.get("empresa")) != _empresa(doc.get("empresa")):
+                continue
+            sim = similaridade(sig, candidato["assinatura"])
+            if sim >= melhor_sim:
+                melhor, melhor_sim = candidato, sim
+
+        if melhor is not None:
+            doc["duplicata_de"] = melhor["id"]
+            doc["similaridade_duplicata"] = round(melhor_sim, 3)
+            marcados.append((doc, melhor))
+        else:
+            #Original: as próximas vagas do lote também são comparadas com ela
+            original = {"id": doc.get("id"), "titulo": doc["titulo"], "empresa": doc["empresa"], "assinatura": sig}
+            for banda in bs:
+                por_banda[banda].append(original)
+    return marcados
+
+
+def backfill(collection, lote=1000, marcar=False, refazer=False, limiar=LIMIAR_PADRAO, mesma_empresa=True,
+             progresso=True):
+    """Calcula as assinaturas das vagas antigas, em ordem de _id. Retorna (processadas, marcadas)."""
+    query = {} if refazer else {"minhash": {"$exists": False}}
+    projecao = {"id": 1, "titulo": 1, "descricao": 1, "empresa": 1}
+    processadas = marcadas = 0
+    ultimo = None
+    while True:
+        filtro = {**query, "_id": {"$gt": ultimo}} if ultimo is not None else query
+        docs = list(collection.find(filtro, projecao).sort("_id", 1).limit(lote))
+        if not docs:
+            return processadas, marcadas
+        ultimo = docs[-1]["_id"]
+        for doc in docs:
+            doc["titulo"] = doc.get("titulo") or ""
+            doc["descricao"] = doc.get("descricao") or ""
+            doc["empresa"] = doc.get("empresa") or ""
+
+        if marcar:
+            marcadas += len(marcar_duplicatas(collection, docs, limiar, mesma_empresa, antes_de=docs[0]["_id"]))
+        else:
+            for doc in docs:
+                sig = assinatura(doc["titulo"], doc["descricao"])
+                doc["minhash"], doc["lsh_bandas"] = Binary(sig.astype("<u4").tobytes()), bandas(sig)
+
+        operacoes = []
+        for doc in docs:
+            atualizacao = {"$set": {c: doc[c] for c in CAMPOS_DUPLICATA if c in doc}}
+            if marcar and "duplicata_de" not in doc:
+                #--refazer --marcar: desfaz marcações que não se confirmam mais
+                atualizacao["$unset"] = {"duplicata_de": "", "similaridade_duplicata": ""}
+            operacoes.append(UpdateOne({"_id": doc["_id"]}, atualizacao))
+        collection.bulk_write(operacoes, ordered=False)
+        processadas += len(docs)
+        if progresso:
+            print(f"… {processadas} vagas processadas ({marcadas} repostagens)")
+
+
+def main():
+    from db_connection import get_collections, ensure_indexes
+
+    parser = argparse.ArgumentParser(description="Assinaturas MinHash/LSH das vagas (detecção de repostagens).")
+    parser.add_argument("--backfill", action="store_true", help="Calcula as assinaturas das vagas que não têm.")
+    parser.add_argument("--marcar", action="store_true", help="Também marca as repostagens existentes.")
+    parser.add_argument("--refazer", action="store_true", help="Recalcula todas (após mudar os parâmetros).")
+    parser.add_argument("--lote", type=int, default=1000)
+    args = parser.parse_args()
+
+    if not args.backfill:
+        parser.print_help()
+        return 0
+
+    col_vagas, _, _ = get_collections()
+    if col_vagas is None:
+        print("❌ Erro crítico: não conectou ao MongoDB.")
+        return 1
+    ensure_indexes()
+
+    limiar, mesma_empresa = configuracao()
+    processadas, marcadas = backfill(col_vagas, max(1, args.lote), args.marcar, args.refazer, limiar, mesma_empresa)
+    print(f"✅ {processadas} vagas com assinatura | {marcadas} repostagens marcadas")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+
+def make_cache_key(model, task_type, text):
+    """
+    Gera a chave do cache: SHA-256 de (modelo, task_type, texto).
+    """
+    payload = "\x1f".join([model, task_type, text])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Cache de embeddings em dois níveis:
+    1. LRU em memória (limitado por max_size);
+    2. Coleção persistente no MongoDB (sobrevive a restarts e é compartilhada entre processos).
+    """
+
+    def __init__(self, collection_getter=None, max_size=2048):
+        #collection_getter é uma função que retorna a coleção (ou None se o banco estiver fora)
+        self._collection_getter = collection_getter
+        self.max_size = max_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "writes": 0}
+
+    def _collection(self):
+        if self._collection_getter is None:
+            return None
+        try:
+            return self._collection_getter()
+        except Exception as e:
+            print(f"⚠️ Cache de embeddings sem camada persistente: {e}")
+            return None
+
+    def _remember(self, key, vector):
+        #Chamado sempre com o lock adquirido
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def get(self, key):
+        """Retorna o vetor em cache ou None."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """
+        Busca várias chaves de uma vez. Os misses da memória vão ao Mongo em um único $in.
+        Retorna um dict {chave: vetor} só com os hits.
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                    self.stats["memory_hits"] += 1
+                elif key not in missing:
+                    missing.append(key)
+
+        if missing:
+            collection = self._collection()
+            if collection is not None:
+                #Import tardio: o NumPy só é carregado quando há leitura no Mongo
+                from embedding_storage import unpack_embedding
+                try:
+                    for doc in collection.find({"_id": {"$in": missing}}, {"embedding": 1}):
+                        vector = unpack_embedding(doc.get("embedding"))
+                        if vector is not None:
+                            found[doc["_id"]] = vector.tolist()
+                except PyMongoError as e:
+                    print(f"⚠️ Erro ao ler o cache de embeddings: {e}")
+
+            with self._lock:
+                for key in missing:
+                    if key in found:
+                        self._remember(key, found[key])
+                        self.stats["persistent_hits"] += 1
+                    else:
+                        self.stats["misses"] += 1
+        return found
+
+    def set(self, key, vector, model, task_type):
+        """Grava o vetor nos dois níveis."""
+        self.set_many({key: vector}, model, task_type)
+
+    def set_many(self, vectors, model, task_type):
+        """Grava vários vetores ({chave: vetor}) nos dois níveis."""
+        if not vectors:
+            return
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            self.stats["writes"] += len(vectors)
+
+        collection = self._collection()
+        if collection is None:
+            return
+        from embedding_storage import pack_embedding
+        now = datetime.datetime.now(datetime.timezone.utc)
+        operations = [
+            UpdateOne(
+                {"_id": key},
+                #Sempre float32 binário: o cache não perde precisão e ocupa ~1/3 do array de doubles
+                {"$set": {"model": model, "task_type": task_type, "embedding": pack_embedding(vector), "criado_em": now}},
+                upsert=True
+            )
+            for key, vector in vectors.items()
+        ]
+        try:
+            collection.bulk_write(operations, ordered=False)
+        except PyMongoError as e:
+            print(f"⚠️ Erro ao gravar no cache de embeddings: {e}")
+
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["persistent_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def snapshot(self):
+        """Contadores atuais (para exibição/diagnóstico)."""
+        with self._lock:
+            data = dict(self.stats)
+            data["memory_size"] = len(self._lru)
+        data["hit_rate"] = self.hit_rate()
+        return data
@@ -0,0 +1,169 @@
+"""
+Provedores de embeddings, escolhidos pelo secret EMBEDDING_PROVIDER (ver get_embedding_provider
+em db_connection.py):
+
+- GeminiProvider: API do Google (text-embedding-004), como sempre foi;
+- SentenceTransformerProvider: modelo local (sentence-transformers/ONNX) lido de EMBEDDING_MODEL_PATH;
+- HashingProvider: sem modelo nenhum. Feature hashing de palavras e bigramas (TF sublinear,
+  sem stopwords) projetado em 768 dimensões por uma projeção aleatória esparsa. Roda em CPU,
+  em lote e em vários processos, sem rede.
+
+Todos expõem `name` (gravado em `embedding_modelo` nos documentos e usado na chave do cache),
+`dim`, `max_batch`, `remote` (se consome cota de API) e `embed(texts, task_type)`, que devolve
+uma lista de vetores (listas de float) ou levanta exceção.
+"""
+import os
+import re
+import hashlib
+import threading
+import unicodedata
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from vector_index import EMBEDDING_DIM
+
+
+class GeminiProvider:
+    """API do Google AI Studio. `configure` deve configurar a chave e retornar True/False."""
+
+    remote = True
+    max_batch = 100  #Limite do batchEmbedContents
+
+    def __init__(self, configure, model="models/text-embedding-004"):
+        self._configure = configure
+        self.name = model
+        self.dim = EMBEDDING_DIM
+
+    def embed(self, texts, task_type="RETRIEVAL_DOCUMENT"):
+        import google.generativeai as genai
+
+        if not self._configure():
+            raise RuntimeError("Google AI não configurado (GOOGLE_AI_KEY).")
+        #O modelo text-embedding-004 gera 768 dimensões por padrão.
+        #Não definimos output_dimensionality para evitar cortes.
+        result = genai.embed_content(model=self.name, content=list(texts), task_type=task_type)
+        return result['embedding']
+
+
+class SentenceTransformerProvider:
+    """Modelo sentence-transformers (ou exportado para ONNX) carregado de um diretório local."""
+
+    remote = False
+
+    def __init__(self, model_path, batch_size=64, device="cpu"):
+        #Import tardio: sentence-transformers (e o torch) só são exigidos por quem usa este backend
+        from sentence_transformers import SentenceTransformer
+
+        backend = "onnx" if any(f.endswith(".onnx") for f in _listar(model_path)) else "torch"
+        kwargs = {"backend": backend} if backend == "onnx" else {}
+        self._model = SentenceTransformer(model_path, device=device, **kwargs)
+        self.dim = self._model.get_sentence_embedding_dimension()
+        if self.dim != EMBEDDING_DIM:
+            raise ValueError(
+                f"O modelo em '{model_path}' gera {self.dim} dimensões; os índices vetoriais esperam {EMBEDDING_DIM}."
+            )
+        self.name = f"local:{os.path.basename(os.path.normpath(model_path))}"
+        self.max_batch = batch_size
+
+    def embed(self, texts, task_type="RETRIEVAL_DOCUMENT"):
+        #O torch/onnxruntime já usa todos os núcleos em cada lote
+        vectors = self._model.encode(
+            list(texts), batch_size=self.max_batch, normalize_embeddings=True,
+            convert_to_numpy=True, show_progress_bar=False
+        )
+        return vectors.astype(np.float32).tolist()
+
+
+def _listar(path):
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
+
+
+#--- Hashing + projeção aleatória ---
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+#Palavras muito frequentes em português (sem IDF de corpus, é o que faz o papel do "IDF")
+STOPWORDS = frozenset(
+    "a ao aos as com como da das de do dos e em na nas no nos o os ou para pela pelo por que se sem "
+    "um uma umas uns the and of to in for with".split()
+)
+#Coordenadas (com sinal) que cada feature ocupa no vetor final
+PROJECAO_NNZ = 4
+
+
+def _tokens(texto):
+    """Minúsculas, sem acentos, sem stopwords."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return [t for t in _TOKEN.findall(texto) if t not in STOPWORDS]
+
+
+@lru_cache(maxsize=200_000)
+def _projecao(feature, dim, seed):
+    """Índices e sinais da feature na projeção esparsa (determinístico, igual em qualquer processo)."""
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=2 * PROJECAO_NNZ + 1,
+                             key=seed.to_bytes(8, "little")).digest()
+    indices = tuple(int.from_bytes(digest[2 * i:2 * i + 2], "little") % dim for i in range(PROJECAO_NNZ))
+    sinais = tuple(1.0 if (digest[-1] >> i) & 1 else -1.0 for i in range(PROJECAO_NNZ))
+    return indices, sinais
+
+
+def _hash_embed(texts, dim, seed):
+    """Vetoriza um bloco de textos (roda dentro dos processos do pool)."""
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, texto in enumerate(texts):
+        tokens = _tokens(texto)
+        contagem = {}
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            contagem[feature] = contagem.get(feature, 0) + 1
+        for feature, n in contagem.items():
+            peso = 1.0 + np.log(n)  #TF sublinear
+            indices, sinais = _projecao(feature, dim, seed)
+            for i, s in zip(indices, sinais):
+                matrix[row, i] += s * peso
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class HashingProvider:
+    """
+    Embeddings locais sem modelo: bag-of-words com hashing + projeção aleatória esparsa para dim.
+    Captura sobreposição de vocabulário (skills, cargos), não sinônimos. Lotes grandes são
+    divididos entre `workers` processos; lotes pequenos (formulários, buscas) rodam no próprio thread.
+    """
+
+    remote = False
+    name_prefix = "local:hashing"
+
+    def __init__(self, dim=EMBEDDING_DIM, workers=None, seed=0, max_batch=2048, min_parallel=256):
+        self.dim = dim
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.min_parallel = min_parallel
+        self.name = f"{self.name_prefix}-{dim}-s{seed}"
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None and self.workers > 1:
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                except (OSError, NotImplementedError) as e:
+                    print(f"⚠️ Pool de embeddings indisponível, usando o thread atual: {e}")
+                    self.workers = 1
+            return self._executor
+
+    def embed(self, texts, task_type="RETRIEVAL_DOCUMENT"):
+        texts = list(texts)
+        pool = self._pool() if len(texts) >= self.min_parallel else None
+        if pool is None:
+            return _hash_embed(texts, self.dim, self.seed).tolist()
+
+        tamanho = -(-len(texts) // self.workers)
+        blocos = [texts[i:i + tamanho] for i in range(0, len(texts), tamanho)]
+        partes = pool.map(_hash_embed, blocos, [self.dim] * len(blocos), [self.seed] * len(blocos))
+        return np.vstack(list(partes)).tolist()
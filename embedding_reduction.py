@@ -0,0 +1,151 @@
+"""
+Representações reduzidas dos embeddings para o pré-filtro da busca em dois estágios.
+
+- "truncado:<d>": as d primeiras dimensões do vetor (o text-embedding-004 concentra a informação
+  nas dimensões iniciais), renormalizadas. Não precisa de ajuste;
+- "pca:<d>": projeção PCA ajustada offline sobre os vetores da coleção e salva na coleção
+  `embedding_reducoes` (uma por coleção de origem). Ajuste:
+
+    python -m embedding_reduction --colecao vagas --dim 128
+    python -m embedding_reduction --colecao curriculos --dim 64 --amostra 50000
+
+O índice local guarda a matriz reduzida ao lado da completa (ela vem do vetor completo em uma
+multiplicação, então não precisa ser gravada em cada documento). Reajuste o PCA quando o modelo
+de embeddings mudar ou a coleção crescer muito; até lá, a projeção antiga continua válida para
+os vetores novos (só fica menos ajustada).
+"""
+import argparse
+import datetime
+import numpy as np
+from bson.binary import Binary
+
+TIPOS_REDUCAO = ("truncado", "pca")
+
+
+class Reducao:
+    """Projeção de vetores normalizados (n, dim_origem) para (n, dim), também normalizados."""
+
+    def __init__(self, tipo, dim, media=None, componentes=None, modelo=None, ajustado_em=None):
+        if tipo not in TIPOS_REDUCAO:
+            raise ValueError(f"Tipo de redução inválido: {tipo}")
+        self.tipo = tipo
+        self.dim = int(dim)
+        self.media = media
+        self.componentes = componentes  #(dim, dim_origem), linhas ortonormais
+        self.modelo = modelo
+        self.ajustado_em = ajustado_em
+
+    @property
+    def nome(self):
+        return f"{self.tipo}:{self.dim}"
+
+    def projetar(self, matriz):
+        """Aceita um vetor ou uma matriz; devolve float32 normalizado (linhas nulas ficam zeradas)."""
+        matriz = np.asarray(matriz, dtype=np.float32)
+        unico = matriz.ndim == 1
+        if unico:
+            matriz = matriz[None, :]
+        if self.tipo == "truncado":
+            reduzida = np.array(matriz[:, :self.dim], dtype=np.float32)
+        else:
+            reduzida = (matriz - self.media) @ self.componentes.T
+        normas = np.linalg.norm(reduzida, axis=1, keepdims=True)
+        np.divide(reduzida, normas, out=reduzida, where=normas > 0)
+        return reduzida[0] if unico else reduzida
+
+    def to_doc(self):
+        doc = {"tipo": self.tipo, "dim": self.dim, "modelo": self.modelo, "ajustado_em": self.ajustado_em}
+        if self.tipo == "pca":
+            doc["dim_origem"] = int(self.componentes.shape[1])
+            doc["media"] = Binary(self.media.astype("<f4").tobytes())
+            doc["componentes"] = Binary(self.componentes.astype("<f4").tobytes())
+        return doc
+
+    @classmethod
+    def from_doc(cls, doc):
+        media = componentes = None
+        if doc["tipo"] == "pca":
+            dim_origem = int(doc["dim_origem"])
+            media = np.frombuffer(doc["media"], dtype="<f4").astype(np.float32)
+            componentes = np.frombuffer(doc["componentes"], dtype="<f4").astype(np.float32)
+            componentes = componentes.reshape(int(doc["dim"]), dim_origem)
+        return cls(doc["tipo"], doc["dim"], media, componentes, doc.get("modelo"), doc.get("ajustado_em"))
+
+
+def parse_reducao(valor):
+    """ "truncado:128" -> ("truncado", 128); "pca" -> ("pca", None) (dimensão da projeção salva)."""
+    tipo, _, dim = str(valor).strip().lower().partition(":")
+    if tipo not in TIPOS_REDUCAO:
+        raise ValueError(f"Redução inválida: '{valor}' (use truncado:<d> ou pca).")
+    return tipo, int(dim) if dim else None
+
+
+def ajustar_pca(matriz, dim, modelo=None):
+    """
+    PCA sobre os vetores (normalizados) da amostra, pela decomposição da covariância
+    (dim_origem x dim_origem), então o custo não cresce com o quadrado da amostra.
+    """
+    matriz = np.asarray(matriz, dtype=np.float64)
+    if matriz.shape[0] <= dim:
+        raise ValueError(f"Amostra pequena demais ({matriz.shape[0]} vetores) para {dim} componentes.")
+    media = matriz.mean(axis=0)
+    centrada = matriz - media
+    covariancia = centrada.T @ centrada / (matriz.shape[0] - 1)
+    autovalores, autovetores = np.linalg.eigh(covariancia)
+    ordem = np.argsort(autovalores)[::-1][:dim]
+    reducao = Reducao(
+        "pca", dim,
+        media=media.astype(np.float32),
+        componentes=autovetores[:, ordem].T.astype(np.float32),
+        modelo=modelo,
+        ajustado_em=datetime.datetime.now(datetime.timezone.utc)
+    )
+    variancia = float(autovalores[ordem].sum() / autovalores.sum()) if autovalores.sum() > 0 else 0.0
+    return reducao, variancia
+
+
+def carregar_amostra(collection, amostra, dim_origem):
+    """Até `amostra` vetores normalizados da coleção ($sample, sem ler a coleção inteira)."""
+    from embedding_storage import unpack_embedding, EMBEDDING_PRESENTE
+
+    vetores = []
+    pipeline = [{"$match": EMBEDDING_PRESENTE}, {"$sample": {"size": amostra}}, {"$project": {"embedding": 1}}]
+    for doc in collection.aggregate(pipeline, allowDiskUse=True):
+        vetor = unpack_embedding(doc["embedding"])
+        if vetor is None or vetor.shape != (dim_origem,):
+            continue
+        norma = np.linalg.norm(vetor)
+        if norma > 0:
+            vetores.append(vetor / norma)
+    return np.array(vetores, dtype=np.float32).reshape(-1, dim_origem)
+
+
+def main():
+    from db_connection import get_db, get_embedding_provider, COL_EMBEDDING_REDUCOES, SEARCH_TARGETS
+    from vector_index import EMBEDDING_DIM
+
+    parser = argparse.ArgumentParser(description="Ajusta a projeção PCA usada no pré-filtro da busca vetorial.")
+    parser.add_argument("--colecao", choices=tuple(SEARCH_TARGETS), required=True)
+    parser.add_argument("--dim", type=int, default=128, help="Dimensões da projeção.")
+    parser.add_argument("--amostra", type=int, default=20000, help="Vetores usados no ajuste.")
+    args = parser.parse_args()
+
+    db = get_db()
+    if db is None:
+        print("❌ Erro crítico: não conectou ao MongoDB.")
+        return 1
+
+    matriz = carregar_amostra(db[SEARCH_TARGETS[args.colecao]["collection"]], args.amostra, EMBEDDING_DIM)
+    try:
+        reducao, variancia = ajustar_pca(matriz, args.dim, modelo=get_embedding_provider().name)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    db[COL_EMBEDDING_REDUCOES].replace_one({"_id": args.colecao}, reducao.to_doc(), upsert=True)
+    print(f"✅ PCA {args.colecao}: {args.dim} componentes ajustados em {len(matriz)} vetores "
+          f"({100 * variancia:.1f}% da variância). Use VECTOR_REDUCAO = \"pca\".")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,248 @@
+"""
+Escalonador de embeddings do processo: todas as chamadas ao provedor passam por aqui.
+
+- Cota única: um TokenBucket de requisições/min e outro de tokens/min, compartilhados por todas
+  as sessões do Streamlit (formulários, buscas da página 07, backfill da página 06, importação).
+- Prioridades: pedidos "interativa" (buscas, formulários) sempre saem antes dos de "background"
+  (backfill, importação, worker). O background só é despachado enquanto sobrar a fração
+  `reserva_interativa` da cota, então uma busca nunca espera o backfill esvaziar o balde.
+- Single-flight: textos idênticos (mesma chave do cache: modelo, task_type, texto) já na fila ou
+  em voo não geram outra chamada; o segundo chamador espera o mesmo Future.
+  Um pedido interativo que encontra o texto ainda na fila do background o promove para a
+  fila interativa.
+- Pedidos pequenos da mesma prioridade e task_type são juntados em uma chamada (até max_batch).
+
+Provedores locais (remote=False) não têm cota: são chamados direto, na thread de quem pediu.
+Métricas: histograma `embedding_espera_seconds` (fila + cota, por prioridade), contadores
+`embedding_chamadas_total` e `embedding_coalescidos_total`; profundidade da fila em snapshot().
+"""
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from embedding_cache import make_cache_key
+from rate_limiter import TokenBucket, estimate_tokens
+import metrics
+
+INTERATIVA = "interativa"
+BACKGROUND = "background"
+PRIORIDADES = (INTERATIVA, BACKGROUND)
+
+
+class _Pedido:
+    __slots__ = ("prioridade", "task_type", "itens", "tokens", "criado_em")
+
+    def __init__(self, prioridade, task_type, itens):
+        self.prioridade = prioridade
+        self.task_type = task_type
+        self.itens = itens  #[(chave, texto, Future)]
+        self.tokens = sum(estimate_tokens(texto) for _, texto, _ in itens)
+        self.criado_em = time.monotonic()
+
+
+class EmbeddingScheduler:
+    """
+    provider_getter: função que retorna o provedor atual (get_embedding_provider).
+    on_result(vetores_por_chave, modelo, task_type): chamado a cada resposta do provedor (cache);
+    roda mesmo que o chamador já tenha desistido por timeout, então o vetor não se perde.
+    """
+
+    def __init__(self, provider_getter, requests_per_minute, tokens_per_minute=None, workers=2,
+                 reserva_interativa=0.2, on_result=None):
+        self._provider_getter = provider_getter
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.reserva_interativa = min(max(float(reserva_interativa), 0.0), 0.9)
+        self._on_result = on_result
+        self._n_workers = max(1, int(workers))
+        self._workers = []
+        self._filas = {prioridade: deque() for prioridade in PRIORIDADES}
+        self._em_voo = {}  #chave -> Future (na fila ou chamando o provedor)
+        self._na_fila = {}  #chave -> _Pedido ainda não despachado (para a promoção)
+        self._max_batch = 1
+        self._cond = threading.Condition()
+        self._ativos = 0
+        self.stats = {"chamadas": 0, "coalescidos": 0, "promovidos": 0, "textos": 0, "erros": 0}
+
+    #--- API ---
+    def embed(self, texts, task_type="RETRIEVAL_DOCUMENT", prioridade=BACKGROUND, timeout=None):
+        """
+        Vetores dos textos, na mesma ordem. Bloqueia até todos ficarem prontos; com timeout,
+        levanta TimeoutError se a fila + cota passarem do limite. Erros do provedor são propagados.
+        """
+        if prioridade not in PRIORIDADES:
+            raise ValueError(f"Prioridade inválida: {prioridade}")
+        provider = self._provider_getter()
+        if not provider.remote:
+            return self._direto(provider, list(texts), task_type)
+
+        futures = self.submit(provider, texts, task_type, prioridade)
+        limite = time.monotonic() + timeout if timeout is not None else None
+        vetores = []
+        for future in futures:
+            restante = None if limite is None else max(0.0, limite - time.monotonic())
+            try:
+                vetores.append(future.result(timeout=restante))
+            except FutureTimeoutError:
+                raise TimeoutError(f"Tempo esgotado na fila de embeddings ({timeout:.0f}s)") from None
+        return vetores
+
+    def submit(self, provider, texts, task_type, prioridade):
+        """Enfileira os textos que ainda não estão em voo. Retorna um Future por texto."""
+        futures, novos = [], []
+        with self._cond:
+            self._max_batch = provider.max_batch
+            for texto in texts:
+                chave = make_cache_key(provider.name, task_type, texto)
+                future = self._em_voo.get(chave)
+                if future is None:
+                    future = Future()
+                    self._em_voo[chave] = future
+                    novos.append((chave, texto, future))
+                else:
+                    self.stats["coalescidos"] += 1
+                    metrics.incr("embedding_coalescidos_total", prioridade=prioridade)
+                    if prioridade == INTERATIVA and self._promover(chave):
+                        novos.append((chave, texto, future))
+                futures.append(future)
+            for start in range(0, len(novos), provider.max_batch):
+                pedido = _Pedido(prioridade, task_type, novos[start:start + provider.max_batch])
+                self._filas[prioridade].append(pedido)
+                for chave, _, _ in pedido.itens:
+                    self._na_fila[chave] = pedido
+            if novos:
+                self._iniciar_workers()
+                self._cond.notify_all()
+        return futures
+
+    def snapshot(self):
+        """Profundidade da fila (textos por prioridade), textos em voo, chamadas ativas e contadores."""
+        with self._cond:
+            fila = {prioridade: sum(len(p.itens) for p in pedidos) for prioridade, pedidos in self._filas.items()}
+            return {"fila": fila, "em_voo": len(self._em_voo), "ativos": self._ativos, **self.stats}
+
+    #--- Internos ---
+    def _promover(self, chave):
+        """Com o lock: tira o texto de um pedido de background ainda na fila (True se tirou)."""
+        pedido = self._na_fila.get(chave)
+        if pedido is None or pedido.prioridade != BACKGROUND:
+            return False
+        item = next(item for item in pedido.itens if item[0] == chave)
+        pedido.itens.remove(item)
+        pedido.tokens -= estimate_tokens(item[1])
+        if not pedido.itens:
+            self._filas[BACKGROUND].remove(pedido)
+        del self._na_fila[chave]
+        self.stats["promovidos"] += 1
+        return True
+
+    def _falhar(self, itens, erro):
+        with self._cond:
+            self.stats["erros"] += 1
+        for _, _, future in itens:
+            if not future.done():
+                future.set_exception(erro)
+
+    def _direto(self, provider, texts, task_type):
+        vetores = provider.embed(texts, task_type=task_type)
+        self._entregar(provider.name, task_type, texts, vetores)
+        return vetores
+
+    def _entregar(self, modelo, task_type, textos, vetores):
+        if self._on_result is None:
+            return
+        try:
+            self._on_result({make_cache_key(modelo, task_type, t): v for t, v in zip(textos, vetores)}, modelo, task_type)
+        except Exception as e:
+            print(f"⚠️ Erro ao guardar embeddings no cache: {e}")
+
+    def _iniciar_workers(self):
+        #Com o lock: as threads só sobem no primeiro pedido a um provedor remoto
+        while len(self._workers) < self._n_workers:
+            worker = threading.Thread(target=self._loop, name=f"embedding-scheduler-{len(self._workers)}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _juntar(self, fila):
+        """Tira o pedido da frente e junta os seguintes (mesmo task_type) enquanto couberem em max_batch."""
+        pedido = fila.popleft()
+        while fila and fila[0].task_type == pedido.task_type and len(pedido.itens) + len(fila[0].itens) <= self._max_batch:
+            proximo = fila.popleft()
+            pedido.itens.extend(proximo.itens)
+            pedido.tokens += proximo.tokens
+            pedido.criado_em = min(pedido.criado_em, proximo.criado_em)
+        for chave, _, _ in pedido.itens:
+            self._na_fila.pop(chave, None)
+        return pedido
+
+    def _falta_background(self, pedido):
+        """Segundos até o pedido de background caber sem invadir a reserva interativa (0 = pode ir)."""
+        necessario = min(self.requests.capacity, self.reserva_interativa * self.requests.capacity + 1)
+        falta = (necessario - self.requests.available()) / self.requests.rate_per_second
+        if self.tokens is not None:
+            livre = self.tokens.capacity * (1 - self.reserva_interativa)
+            necessario = self.tokens.capacity - livre + min(pedido.tokens, livre)
+            falta = max(falta, (necessario - self.tokens.available()) / self.tokens.rate_per_second)
+        return max(0.0, falta)
+
+    def _reservar(self, pedido):
+        espera = self.requests.reserve(1)
+        if self.tokens is not None:
+            espera = max(espera, self.tokens.reserve(pedido.tokens))
+        return espera
+
+    def _proximo(self):
+        """Com o lock: espera e retorna (pedido, segundos de espera pela cota)."""
+        while True:
+            if self._filas[INTERATIVA]:
+                pedido = self._juntar(self._filas[INTERATIVA])
+                return pedido, self._reservar(pedido)
+            if self._filas[BACKGROUND]:
+                falta = self._falta_background(self._filas[BACKGROUND][0])
+                if falta <= 0:
+                    pedido = self._juntar(self._filas[BACKGROUND])
+                    return pedido, self._reservar(pedido)
+                #Acorda antes se chegar um pedido interativo (notify_all em submit)
+                self._cond.wait(timeout=falta)
+                continue
+            self._cond.wait()
+
+    def _loop(self):
+        while True:
+            pedido = None
+            try:
+                with self._cond:
+                    pedido, espera = self._proximo()
+                    self._ativos += 1
+                if espera > 0:
+                    time.sleep(espera)
+                metrics.observe("embedding_espera_seconds", time.monotonic() - pedido.criado_em,
+                                prioridade=pedido.prioridade)
+                self._chamar(self._provider_getter(), pedido)
+            except Exception as e:
+                #Qualquer erro falha só este pedido: a thread continua atendendo a fila
+                if pedido is None:
+                    print(f"⚠️ Erro no escalonador de embeddings: {e}")
+                    time.sleep(1)
+                    continue
+                self._falhar(pedido.itens, e)
+            finally:
+                if pedido is not None:
+                    with self._cond:
+                        for chave, _, _ in pedido.itens:
+                            self._em_voo.pop(chave, None)
+                        self._ativos -= 1
+
+    def _chamar(self, provider, pedido):
+        textos = [texto for _, texto, _ in pedido.itens]
+        metrics.incr("embedding_chamadas_total", prioridade=pedido.prioridade)
+        with self._cond:
+            self.stats["chamadas"] += 1
+            self.stats["textos"] += len(textos)
+        vetores = provider.embed(textos, task_type=pedido.task_type)
+        if len(vetores) != len(textos):
+            #Sem o alinhamento texto -> vetor, nenhum vetor da resposta é confiável (nem vai para o cache)
+            raise ValueError(f"Provedor {provider.name} devolveu {len(vetores)} vetores para {len(textos)} textos")
+        self._entregar(provider.name, pedido.task_type, textos, vetores)
+        for (_, _, future), vetor in zip(pedido.itens, vetores):
+            future.set_result(vetor)
@@ -0,0 +1,77 @@
+"""
+Formato de armazenamento do campo `embedding` (secret EMBEDDING_STORAGE):
+
+- "float32" (padrão): BSON binary vector (subtipo 9, dtype float32). 768 dimensões ocupam ~3 KB,
+  contra ~10 KB do array de doubles (cada elemento do array leva tipo + chave "0".."767" + 8 bytes);
+- "int8": BSON binary vector int8, ~0,8 KB. Cada vetor é escalado pelo próprio máximo absoluto
+  (o cosseno não muda com a escala), com erro de quantização pequeno para o ranking;
+- "array": o array de doubles antigo.
+
+Os leitores (índice local, matching, cache) aceitam qualquer um dos três formatos.
+O binary vector é montado à mão (sem Binary.from_vector), então funciona com qualquer pymongo.
+"""
+import numpy as np
+from bson.binary import Binary
+
+EMBEDDING_STORAGES = ("float32", "int8", "array")
+
+#Subtipo BSON de vetor e o byte de dtype no início do payload (dtype, padding, dados little-endian)
+VECTOR_SUBTYPE = 9
+DTYPE_FLOAT32 = 0x27
+DTYPE_INT8 = 0x03
+
+#Documento com vetor preenchido, em qualquer formato ([] e ausente ficam de fora)
+EMBEDDING_PRESENTE = {"$or": [
+    {"embedding.0": {"$exists": True}},
+    {"embedding": {"$type": "binData"}}
+]}
+
+
+def pack_embedding(vector, storage="float32"):
+    """Converte um vetor (lista, ndarray ou binário) para o formato de armazenamento."""
+    if storage not in EMBEDDING_STORAGES:
+        raise ValueError(f"Formato de embedding inválido: {storage}")
+    array = unpack_embedding(vector)
+    if array is None:
+        return []
+    if storage == "array":
+        return array.astype(np.float64).tolist()
+    if storage == "int8":
+        escala = np.abs(array).max()
+        quantizado = np.zeros(array.shape, dtype=np.int8) if escala == 0 else \
+            np.clip(np.rint(array * (127.0 / escala)), -127, 127).astype(np.int8)
+        return Binary(bytes([DTYPE_INT8, 0]) + quantizado.tobytes(), VECTOR_SUBTYPE)
+    return Binary(bytes([DTYPE_FLOAT32, 0]) + array.astype("<f4").tobytes(), VECTOR_SUBTYPE)
+
+
+def unpack_embedding(value):
+    """
+    Lê o campo embedding em qualquer formato e devolve um ndarray float32 (ou None se vazio/inválido).
+    Vetores int8 voltam na escala quantizada (sem normalizar): use só para cosseno/ranking.
+    """
+    if value is None:
+        return None
+    if isinstance(value, np.ndarray):
+        return value.astype(np.float32, copy=False) if value.size else None
+    if isinstance(value, (bytes, bytearray)):  #Binary é subclasse de bytes
+        subtype = getattr(value, "subtype", VECTOR_SUBTYPE)
+        if subtype != VECTOR_SUBTYPE or len(value) < 2:
+            return None
+        dtype = value[0]
+        if dtype == DTYPE_FLOAT32:
+            return np.frombuffer(bytes(value[2:]), dtype="<f4").astype(np.float32)
+        if dtype == DTYPE_INT8:
+            return np.frombuffer(bytes(value[2:]), dtype=np.int8).astype(np.float32)
+        return None
+    if len(value) == 0:
+        return None
+    return np.asarray(value, dtype=np.float32)
+
+
+def storage_of(value):
+    """Formato em que um valor do campo embedding está gravado ("float32", "int8", "array" ou None)."""
+    if isinstance(value, (bytes, bytearray)) and len(value) >= 2:
+        return {DTYPE_FLOAT32: "float32", DTYPE_INT8: "int8"}.get(value[0])
+    if isinstance(value, list) and value:
+        return "array"
+    return None
@@ -0,0 +1,245 @@
+"""
+Worker de embeddings (roda fora do Streamlit).
+
+Gera os vetores dos documentos de `vagas`/`curriculos` gravados com `embedding_pendente: true`
+(formulários e importação em lote com o Gemini) e grava o campo `embedding`. A fila é o próprio
+documento: o insert que cria a vaga/currículo já o deixa na fila, sem um segundo insert que
+pudesse se perder no meio do caminho. Um índice parcial em (embedding_pendente,
+embedding_disponivel_em) mantém a consulta do worker barata.
+
+Campos controlados pelo worker (removidos quando o vetor é gravado):
+- embedding_disponivel_em: fim da reserva (lease) ou do backoff após uma falha;
+- embedding_lease: token da reserva atual;
+- embedding_tentativas: após MAX_TENTATIVAS o documento sai da fila com `embedding_erro: true`
+  (o backfill da página 06 ainda o cobre).
+
+Uso:
+    python -m embedding_worker                   #loop contínuo
+    python -m embedding_worker --once            #processa o que houver e sai
+    python -m embedding_worker --migrar-outbox   #passa os jobs da antiga coleção embedding_outbox para os documentos
+
+Configuração (secrets.toml ou variáveis de ambiente): MONGO_URI, GOOGLE_AI_KEY,
+EMBEDDING_PROVIDER, EMBEDDING_RPM, EMBEDDING_TPM, EMBEDDING_BATCH_SIZE.
+A cota (EMBEDDING_RPM / EMBEDDING_TPM) é aplicada pelo escalonador de embeddings do processo.
+"""
+import argparse
+import datetime
+import time
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from db_connection import (
+    get_db, get_config, create_embeddings_batch, get_embedding_provider, store_embedding,
+    COL_VAGAS, COL_CURRICULOS, COL_EMBEDDING_OUTBOX, CAMPOS_FILA_EMBEDDING
+)
+from schemas import texto_vaga, texto_curriculo
+
+#Coleções com documentos na fila de embeddings
+COLECOES_VALIDAS = (COL_VAGAS, COL_CURRICULOS)
+#Tempo que um documento fica reservado para um worker antes de voltar para a fila
+LEASE_SEGUNDOS = 300
+#Após esse número de falhas o documento sai da fila (o backfill da página 06 ainda o cobre)
+MAX_TENTATIVAS = 8
+#Espera após um erro do MongoDB (queda de conexão, failover); dobra a cada erro seguido até o teto
+ESPERA_ERRO_SEGUNDOS = 5
+ESPERA_ERRO_MAXIMA = 120
+
+#Texto vetorizado: o mesmo dos formulários e da importação (schemas.py)
+TEXTO = {COL_VAGAS: texto_vaga, COL_CURRICULOS: texto_curriculo}
+CAMPOS_TEXTO = {
+    COL_VAGAS: ("titulo", "descricao", "skills"),
+    COL_CURRICULOS: ("formacao", "experiencia", "resumo", "skills", "idiomas")
+}
+CAMPOS_LISTA = ("skills", "idiomas")
+
+
+def ensure_fila_indexes(db):
+    for nome_colecao in COLECOES_VALIDAS:
+        db[nome_colecao].create_index(
+            [("embedding_pendente", ASCENDING), ("embedding_disponivel_em", ASCENDING)],
+            partialFilterExpression={"embedding_pendente": True}, name=f"{nome_colecao}_embedding_pendente"
+        )
+        db[nome_colecao].create_index(
+            "embedding_lease", partialFilterExpression={"embedding_pendente": True},
+            name=f"{nome_colecao}_embedding_lease"
+        )
+
+
+def texto_documento(nome_colecao, doc):
+    campos = {campo: doc.get(campo) or ([] if campo in CAMPOS_LISTA else "") for campo in CAMPOS_TEXTO[nome_colecao]}
+    return TEXTO[nome_colecao](campos)
+
+
+def claim_docs(collection, batch_size):
+    """
+    Reserva até batch_size documentos pendentes em três round trips, qualquer que seja o lote:
+    lê os _id elegíveis, marca-os com um token de lease novo (update_many que repete o filtro de
+    elegibilidade, então dois workers nunca ficam com o mesmo documento) e lê de volta só os que
+    receberam o token. Reservas vencidas (worker que morreu) voltam a ser elegíveis.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    elegiveis = {"embedding_pendente": True, "$or": [
+        {"embedding_disponivel_em": None},
+        {"embedding_disponivel_em": {"$lte": now}}
+    ]}
+    ids = [
+        doc["_id"] for doc in
+        collection.find(elegiveis, {"_id": 1}).sort("embedding_disponivel_em", ASCENDING).limit(batch_size)
+    ]
+    if not ids:
+        return []
+
+    token = ObjectId()
+    collection.update_many({"_id": {"$in": ids}, **elegiveis}, {
+        "$set": {"embedding_lease": token, "embedding_disponivel_em": now + datetime.timedelta(seconds=LEASE_SEGUNDOS)},
+        "$inc": {"embedding_tentativas": 1}
+    })
+    projecao = {campo: 1 for campo in CAMPOS_TEXTO[collection.name]}
+    projecao.update({"embedding_lease": 1, "embedding_tentativas": 1})
+    return list(collection.find({"embedding_pendente": True, "embedding_lease": token}, projecao))
+
+
+def backoff(tentativas):
+    """Espera (s) antes de um documento com falha voltar para a fila."""
+    return min(3600, 30 * 2 ** (tentativas - 1))
+
+
+def devolver_docs(collection, docs):
+    """Devolve documentos com falha para a fila (com backoff) ou os tira da fila após MAX_TENTATIVAS."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    operacoes = []
+    for doc in docs:
+        #Só mexe na reserva deste worker (outra pode ter assumido após o lease vencer)
+        filtro = {"_id": doc["_id"], "embedding_lease": doc["embedding_lease"]}
+        if doc.get("embedding_tentativas", 0) >= MAX_TENTATIVAS:
+            operacoes.append(UpdateOne(filtro, {"$set": {"embedding_erro": True}, "$unset": CAMPOS_FILA_EMBEDDING}))
+        else:
+            operacoes.append(UpdateOne(filtro, {
+                "$set": {"embedding_disponivel_em": now + datetime.timedelta(seconds=backoff(doc.get("embedding_tentativas", 1)))},
+                "$unset": {"embedding_lease": ""}
+            }))
+    if operacoes:
+        collection.bulk_write(operacoes, ordered=False)
+
+
+def processar_docs(collection, docs):
+    """
+    Gera os embeddings dos documentos reservados e grava o resultado (um bulk_write).
+    Retorna quantos documentos foram atualizados.
+    """
+    vectors = create_embeddings_batch([texto_documento(collection.name, doc) for doc in docs])
+    if vectors is None:
+        devolver_docs(collection, docs)
+        return 0
+
+    modelo = get_embedding_provider().name
+    operacoes = [
+        UpdateOne({"_id": doc["_id"]}, {
+            "$set": {"embedding": store_embedding(vector), "embedding_modelo": modelo},
+            "$currentDate": {"embedding_atualizado_em": True},  #Marca d'água do índice local
+            "$unset": CAMPOS_FILA_EMBEDDING
+        })
+        for doc, vector in zip(docs, vectors)
+    ]
+    try:
+        collection.bulk_write(operacoes, ordered=False)
+        return len(docs)
+    except BulkWriteError as e:
+        #Só as escritas listadas em writeErrors falharam; com erro de write concern, nenhuma é garantida
+        if e.details.get("writeConcernErrors"):
+            indices = set(range(len(docs)))
+        else:
+            indices = {erro["index"] for erro in e.details.get("writeErrors", [])}
+        print(f"⚠️ {len(indices)} embeddings não gravados em '{collection.name}': {e}")
+        devolver_docs(collection, [doc for i, doc in enumerate(docs) if i in indices])
+        return len(docs) - len(indices)
+
+
+def migrar_outbox(db):
+    """Marca como pendentes os documentos com jobs na antiga embedding_outbox e apaga esses jobs."""
+    outbox = db[COL_EMBEDDING_OUTBOX]
+    migrados = 0
+    for nome_colecao in COLECOES_VALIDAS:
+        jobs = list(outbox.find({"colecao": nome_colecao, "status": {"$ne": "erro"}}, {"doc_id": 1}))
+        if not jobs:
+            continue
+        db[nome_colecao].update_many(
+            {"_id": {"$in": [job["doc_id"] for job in jobs]}, "embedding": []},
+            {"$set": {"embedding_pendente": True}}
+        )
+        outbox.delete_many({"_id": {"$in": [job["_id"] for job in jobs]}})
+        migrados += len(jobs)
+    return migrados
+
+
+def run(once=False, batch_size=None, poll_interval=5.0):
+    db = get_db()
+    if db is None:
+        print("❌ Erro crítico: não conectou ao MongoDB.")
+        return 1
+
+    batch_size = batch_size or int(get_config("EMBEDDING_BATCH_SIZE", get_embedding_provider().max_batch))
+
+    ensure_fila_indexes(db)
+    print(f"🚀 Worker de embeddings iniciado (lote de {batch_size}).")
+
+    total = 0
+    erros_seguidos = 0
+    inicio = time.monotonic()
+    while True:
+        try:
+            reservados = atualizados = 0
+            for nome_colecao in COLECOES_VALIDAS:
+                docs = claim_docs(db[nome_colecao], batch_size)
+                if docs:
+                    reservados += len(docs)
+                    atualizados += processar_docs(db[nome_colecao], docs)
+        except PyMongoError as e:
+            #Erro transitório (conexão, failover): o worker continua; documentos reservados voltam quando o lease vencer
+            erros_seguidos += 1
+            espera = min(ESPERA_ERRO_MAXIMA, ESPERA_ERRO_SEGUNDOS * 2 ** (erros_seguidos - 1))
+            print(f"⚠️ Erro no MongoDB ({e}); nova tentativa em {espera}s.")
+            time.sleep(espera)
+            continue
+        erros_seguidos = 0
+
+        if not reservados:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        total += atualizados
+        decorrido = time.monotonic() - inicio
+        print(f"✅ {atualizados}/{reservados} embeddings gravados | total {total} | {total / decorrido:.2f} docs/s")
+
+    print(f"Fila vazia. {total} documentos atualizados.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera os embeddings pendentes de vagas e currículos.")
+    parser.add_argument("--once", action="store_true", help="Processa a fila atual e sai.")
+    parser.add_argument("--batch-size", type=int, default=None, help="Documentos por lote de API.")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Espera (s) quando a fila está vazia.")
+    parser.add_argument("--migrar-outbox", action="store_true",
+                        help="Move os jobs da antiga coleção embedding_outbox para a fila nos documentos e sai.")
+    args = parser.parse_args()
+
+    if args.migrar_outbox:
+        db = get_db()
+        if db is None:
+            print("❌ Erro crítico: não conectou ao MongoDB.")
+            return 1
+        print(f"✅ {migrar_outbox(db)} jobs da outbox migrados para os documentos.")
+        return 0
+
+    try:
+        return run(once=args.once, batch_size=args.batch_size, poll_interval=args.poll_interval)
+    except KeyboardInterrupt:
+        print("\nWorker interrompido.")
+        return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
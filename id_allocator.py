@@ -0,0 +1,69 @@
+import threading
+from pymongo import ReturnDocument
+
+
+class IdAllocator:
+    """
+    Gera os ids sequenciais de vagas/currículos a partir da coleção `counters`.
+
+    Cada reserva é um único find_one_and_update com $inc (atômico no servidor), então
+    submits concorrentes nunca recebem o mesmo id. Com block_size > 1 o processo reserva
+    um bloco de ids de uma vez e os próximos inserts não custam nenhum round trip extra
+    (ao custo de possíveis lacunas se o processo reiniciar com ids não usados).
+    """
+
+    def __init__(self, db_getter, counters_collection="counters", block_size=1):
+        self._db_getter = db_getter
+        self.counters_collection = counters_collection
+        self.block_size = max(1, int(block_size))
+        self._blocks = {}  #nome -> [próximo id, último id do bloco]
+        self._seeded = set()
+        self._lock = threading.RLock()
+
+    def _db(self):
+        db = self._db_getter()
+        if db is None:
+            raise ConnectionError("Sem conexão com o MongoDB para gerar ids.")
+        return db
+
+    def _seed(self, db, name):
+        """
+        Na primeira reserva do processo, garante que o contador começa depois do maior id
+        já existente na coleção (bases criadas antes do contador existir).
+        $max é idempotente, então vários processos podem fazer isso ao mesmo tempo.
+        """
+        if name in self._seeded:
+            return
+        last_doc = db[name].find_one({"id": {"$exists": True}}, {"id": 1}, sort=[("id", -1)])
+        max_id = int(last_doc["id"]) if last_doc else 0
+        db[self.counters_collection].update_one({"_id": name}, {"$max": {"seq": max_id}}, upsert=True)
+        self._seeded.add(name)
+
+    def reserve(self, name, count=1):
+        """
+        Reserva `count` ids consecutivos no servidor e retorna o range reservado.
+        Usado diretamente por importações em lote.
+        """
+        db = self._db()
+        with self._lock:
+            self._seed(db, name)
+        doc = db[self.counters_collection].find_one_and_update(
+            {"_id": name},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        end = int(doc["seq"])
+        return range(end - count + 1, end + 1)
+
+    def next_id(self, name):
+        """Próximo id da coleção `name` (vem do bloco local quando possível)."""
+        with self._lock:
+            block = self._blocks.get(name)
+            if not block or block[0] > block[1]:
+                reservado = self.reserve(name, self.block_size)
+                block = [reservado.start, reservado.stop - 1]
+                self._blocks[name] = block
+            novo_id = block[0]
+            block[0] += 1
+            return novo_id
@@ -0,0 +1,319 @@
+"""
+Consultas das páginas de listagem (vagas e currículos), sem dependência de UI.
+
+As listagens são paginadas por keyset (cursor): a ordem é (data_cadastro, _id) decrescente, ou
+(relevância, _id) nas buscas textuais, e cada página começa logo depois do último item da
+anterior. Assim cada rerun lê só `tamanho` documentos (pelo índice de listagem), em vez de
+pular as páginas anteriores. A listagem projeta só o cabeçalho dos cards; os campos longos
+vêm de `consultar_detalhes` quando o usuário abre o card.
+
+As páginas envolvem estas funções com o cache versionado; os benchmarks chamam as mesmas
+funções diretamente. Erros de banco são propagados para quem chamou.
+"""
+import re
+from db_connection import get_collections, text_search_filter, ensure_indexes, get_skill_index, get_skill_dictionary
+from metrics import timed
+
+#Salário como número (registros antigos podem ter texto); valores inválidos viram null
+SALARIO_FLOAT = {"$convert": {"input": "$salario", "to": "double", "onError": None, "onNull": None}}
+
+#Cabeçalho dos cards de vagas (o embedding e os textos longos nunca saem na listagem)
+CAMPOS_CABECALHO_VAGAS = {
+    "_id": 1, "id": 1, "titulo": 1, "empresa": 1, "cidade": 1, "estado": 1,
+    "tipo_contratacao": 1, "salario_float": 1, "data_cadastro": 1, "duplicata_de": 1
+}
+
+#Cabeçalho dos cards de currículos
+CAMPOS_CABECALHO_CURRICULOS = {"_id": 1, "id": 1, "nome": 1, "formacao": 1, "data_cadastro": 1}
+
+#Campos carregados sob demanda quando o card é aberto
+CAMPOS_DETALHE = {
+    "vagas": {"descricao": 1, "skills": 1},
+    "curriculos": {"email": 1, "telefone": 1, "experiencia": 1, "resumo": 1, "skills": 1, "idiomas": 1}
+}
+
+#Tamanho de página padrão (LISTAGEM_TAMANHO_PAGINA nos secrets)
+TAMANHO_PAGINA = 20
+
+
+def filtro_base(filtro_empresa=None):
+    """Filtro de negócio: empregador só enxerga as vagas da própria empresa."""
+    if filtro_empresa:
+        #Busca case-insensitive para garantir
+        return {"empresa": {"$regex": f"^{re.escape(filtro_empresa)}$", "$options": "i"}}
+    return {}
+
+
+@timed()
+def consultar_opcoes_vagas(filtro_empresa=None):
+    """
+    Opções dos filtros (tipos de contratação, empresas, limites do slider de salário),
+    calculadas em uma única agregação no MongoDB. Retorna None sem conexão.
+    """
+    col_vagas, _, _ = get_collections(read_only=True)
+    if col_vagas is None:
+        return None
+
+    pipeline = [
+        {"$match": filtro_base(filtro_empresa)},
+        {"$project": {"tipo_contratacao": 1, "empresa": 1, "salario_float": SALARIO_FLOAT}},
+        {"$facet": {
+            "total": [{"$count": "n"}],
+            "tipos": [{"$group": {"_id": "$tipo_contratacao"}}, {"$sort": {"_id": 1}}],
+            "empresas": [{"$group": {"_id": "$empresa"}}, {"$sort": {"_id": 1}}],
+            "salario": [{"$group": {
+                "_id": None,
+                "min": {"$min": "$salario_float"},
+                "max": {"$max": "$salario_float"}
+            }}]
+        }}
+    ]
+    resultado = next(col_vagas.aggregate(pipeline))
+
+    salario = resultado["salario"][0] if resultado["salario"] else {}
+    return {
+        "total": resultado["total"][0]["n"] if resultado["total"] else 0,
+        "tipos": [t["_id"] for t in resultado["tipos"] if t["_id"]],
+        "empresas": [e["_id"] for e in resultado["empresas"] if e["_id"]],
+        "salario_min": salario.get("min"),
+        "salario_max": salario.get("max")
+    }
+
+
+def cursor_de(item, campo="data_cadastro"):
+    """Cursor da próxima página a partir do último item exibido: (valor do campo de ordem, _id)."""
+    return item.get(campo), item["_id"]
+
+
+def filtro_keyset(cursor, campo="data_cadastro"):
+    """
+    Filtro dos itens depois do cursor na ordem (campo desc, _id desc).
+    Documentos sem o campo (null) vêm por último na ordem decrescente.
+    """
+    if not cursor:
+        return {}
+    valor, ultimo_id = cursor
+    if valor is None:
+        return {campo: None, "_id": {"$lt": ultimo_id}}
+    return {"$or": [
+        {campo: {"$lt": valor}},
+        {campo: valor, "_id": {"$lt": ultimo_id}},
+        {campo: None}
+    ]}
+
+
+def _pagina(itens, tamanho, campo):
+    """Corta a página (foi pedido tamanho + 1 para saber se há próxima) e calcula o próximo cursor."""
+    tem_proxima = len(itens) > tamanho
+    itens = itens[:tamanho]
+    proximo = cursor_de(itens[-1], campo) if tem_proxima else None
+    return {"itens": itens, "proximo": proximo}
+
+
+def _match_vagas(filtro_empresa=None, tipo_contratacao=None, empresa=None, search_query="",
+                 incluir_repostagens=False):
+    match = filtro_base(filtro_empresa)
+    if not incluir_repostagens:
+        #Repostagens (dedup.py) ficam fora do total e da listagem
+        match["duplicata_de"] = None
+    if tipo_contratacao:
+        match["tipo_contratacao"] = tipo_contratacao
+    if empresa:
+        match["empresa"] = empresa
+    if search_query:
+        #Busca textual indexada ($text precisa estar no primeiro $match do pipeline)
+        match.update(text_search_filter(search_query))
+    return match
+
+
+def _filtro_salario(salario_range):
+    return {"$match": {"$or": [
+        {"salario_float": {"$gte": salario_range[0], "$lte": salario_range[1]}},
+        {"salario_float": None}  #Mantém salários não informados/negociáveis
+    ]}}
+
+
+@timed()
+def consultar_kpis_vagas(filtro_empresa=None, salario_range=None, tipo_contratacao=None,
+                         empresa=None, search_query="", incluir_repostagens=False):
+    """
+    KPIs das vagas filtradas (total, média salarial, cidade com mais vagas), calculados no
+    MongoDB. Não dependem da página, então ficam em cache enquanto o usuário pagina.
+    Retorna None sem conexão.
+    """
+    col_vagas, _, _ = get_collections(read_only=True)
+    if col_vagas is None:
+        return None
+
+    pipeline = [
+        {"$match": _match_vagas(filtro_empresa, tipo_contratacao, empresa, search_query, incluir_repostagens)},
+        {"$project": {"cidade": 1, "salario_float": SALARIO_FLOAT}}
+    ]
+    if salario_range:
+        pipeline.append(_filtro_salario(salario_range))
+    pipeline.append({"$facet": {
+        "kpis": [{"$group": {"_id": None, "total": {"$sum": 1}, "media_salarial": {"$avg": "$salario_float"}}}],
+        "top_cidade": [{"$sortByCount": "$cidade"}, {"$limit": 1}]
+    }})
+    resultado = next(col_vagas.aggregate(pipeline))
+
+    kpis = resultado["kpis"][0] if resultado["kpis"] else {}
+    return {
+        "total": kpis.get("total", 0),
+        "media_salarial": kpis.get("media_salarial"),
+        "top_cidade": resultado["top_cidade"][0]["_id"] if resultado["top_cidade"] else None
+    }
+
+
+@timed()
+def consultar_pagina_vagas(filtro_empresa=None, salario_range=None, tipo_contratacao=None,
+                           empresa=None, search_query="", cursor=None, tamanho=TAMANHO_PAGINA,
+                           incluir_repostagens=False):
+    """
+    Uma página de cabeçalhos de vagas, a partir do cursor (None = primeira página).
+    Retorna {"itens": [...], "proximo": cursor ou None}, ou None sem conexão.
+    """
+    col_vagas, _, _ = get_collections(read_only=True)
+    if col_vagas is None:
+        return None
+    ensure_indexes()
+
+    campo = "relevancia" if search_query else "data_cadastro"
+    match = _match_vagas(filtro_empresa, tipo_contratacao, empresa, search_query, incluir_repostagens)
+    pipeline = []
+    if search_query:
+        #A relevância só existe depois do $text: o keyset é aplicado após calculá-la
+        pipeline += [{"$match": match}, {"$addFields": {"relevancia": {"$meta": "textScore"}}}]
+        if cursor:
+            pipeline.append({"$match": filtro_keyset(cursor, campo)})
+    else:
+        #Keyset no primeiro $match + sort pelo índice de listagem: lê só a página
+        keyset = filtro_keyset(cursor, campo)
+        pipeline.append({"$match": {"$and": [match, keyset]} if keyset else match})
+    pipeline.append({"$sort": {campo: -1, "_id": -1}})
+    pipeline.append({"$addFields": {"salario_float": SALARIO_FLOAT}})
+    if salario_range:
+        pipeline.append(_filtro_salario(salario_range))
+    pipeline += [
+        {"$limit": tamanho + 1},
+        {"$project": {**CAMPOS_CABECALHO_VAGAS, **({"relevancia": 1} if search_query else {})}}
+    ]
+    return _pagina(list(col_vagas.aggregate(pipeline)), tamanho, campo)
+
+
+@timed()
+def contar_curriculos(search_query=""):
+    """Total de currículos (ou dos que casam com a busca). Retorna None sem conexão."""
+    _, col_curriculos, _ = get_collections(read_only=True)
+    if col_curriculos is None:
+        return None
+    if search_query:
+        return col_curriculos.count_documents(text_search_filter(search_query))
+    #Sem filtro: contagem pelos metadados da coleção, sem varrer os documentos
+    return col_curriculos.estimated_document_count()
+
+
+@timed()
+def consultar_pagina_curriculos(search_query="", cursor=None, tamanho=TAMANHO_PAGINA):
+    """
+    Uma página de cabeçalhos de currículos (admin e empregador veem todos), por data de
+    cadastro ou, com busca (skills, formação, idiomas...), por relevância.
+    Retorna {"itens": [...], "proximo": cursor ou None}, ou None sem conexão.
+    """
+    _, col_curriculos, _ = get_collections(read_only=True)
+    if col_curriculos is None:
+        return None
+    ensure_indexes()
+
+    if search_query:
+        pipeline = [
+            {"$match": text_search_filter(search_query)},
+            {"$addFields": {"relevancia": {"$meta": "textScore"}}}
+        ]
+        if cursor:
+            pipeline.append({"$match": filtro_keyset(cursor, "relevancia")})
+        pipeline += [
+            {"$sort": {"relevancia": -1, "_id": -1}},
+            {"$limit": tamanho + 1},
+            {"$project": {**CAMPOS_CABECALHO_CURRICULOS, "relevancia": 1}}
+        ]
+        return _pagina(list(col_curriculos.aggregate(pipeline)), tamanho, "relevancia")
+
+    itens = list(
+        col_curriculos.find(filtro_keyset(cursor), CAMPOS_CABECALHO_CURRICULOS)
+        .sort([("data_cadastro", -1), ("_id", -1)])
+        .limit(tamanho + 1)
+    )
+    return _pagina(itens, tamanho, "data_cadastro")
+
+
+@timed()
+def consultar_detalhes(colecao, ids):
+    """
+    Campos longos dos cards abertos ({_id: detalhes}), em uma única consulta por _id.
+    Retorna None sem conexão.
+    """
+    col_vagas, col_curriculos, _ = get_collections(read_only=True)
+    collection = col_vagas if colecao == "vagas" else col_curriculos
+    if collection is None:
+        return None
+    if not ids:
+        return {}
+    return {
+        doc.pop("_id"): doc
+        for doc in collection.find({"_id": {"$in": list(ids)}}, CAMPOS_DETALHE[colecao])
+    }
+
+
+@timed()
+def consultar_skills_vaga(vaga_id):
+    """
+    Título e skills (nomes canônicos e skill_ids) da vaga com o id sequencial informado.
+    Vagas antigas sem skill_ids são resolvidas pelo vocabulário, sem registrar skills novas.
+    Retorna None se a vaga não existir ou sem conexão.
+    """
+    col_vagas, _, _ = get_collections(read_only=True)
+    if col_vagas is None:
+        return None
+    vaga = col_vagas.find_one({"id": vaga_id}, {"titulo": 1, "empresa": 1, "skills": 1, "skill_ids": 1})
+    if vaga is None:
+        return None
+    if "skill_ids" not in vaga:
+        skills = vaga.get("skills") if isinstance(vaga.get("skills"), list) else []
+        vaga["skills"], vaga["skill_ids"] = get_skill_dictionary().normalizar(skills, registrar=False)
+    return vaga
+
+
+@timed()
+def consultar_ranking_skills(skill_ids, minimo=1, limite=50):
+    """
+    Currículos com pelo menos `minimo` das skills pedidas, da maior sobreposição para a menor
+    (bitsets em memória, ver skills.SkillIndex). Cada item traz o cabeçalho do card, `comum`
+    (quantas skills em comum) e `comum_ids`. Retorna None sem conexão.
+    """
+    _, col_curriculos, _ = get_collections(read_only=True)
+    if col_curriculos is None:
+        return None
+    index = get_skill_index("curriculos")
+    index.refresh()
+    ranking = index.rank(skill_ids, minimo, limite)
+    if not ranking:
+        return []
+
+    cabecalhos = {
+        doc["_id"]: doc
+        for doc in col_curriculos.find(
+            {"_id": {"$in": [doc_id for doc_id, _ in ranking]}},
+            {**CAMPOS_CABECALHO_CURRICULOS, "skill_ids": 1}
+        )
+    }
+    pedidas = set(skill_ids)
+    itens = []
+    for doc_id, comum in ranking:
+        doc = cabecalhos.get(doc_id)
+        if doc is None:
+            continue  #Removido depois do último refresh do índice
+        doc["comum"] = comum
+        doc["comum_ids"] = [s for s in doc.pop("skill_ids", []) if s in pedidas]
+        itens.append(doc)
+    return itens
@@ -0,0 +1,266 @@
+"""
+Matching em lote (offline) entre vagas e currículos.
+
+Carrega todos os embeddings já salvos em `vagas` e `curriculos`, calcula a similaridade de cosseno
+em blocos (memória limitada a block_size x block_size) e grava na coleção `matches` o top-k de
+cada documento nas duas direções: "top 20 candidatos para esta vaga" e "top 20 vagas para mim".
+Nenhuma chamada à API de embeddings é feita.
+
+As execuções seguintes são incrementais: só são recalculadas as linhas de documentos novos ou com
+vetor alterado (marca d'água em _id / embedding_atualizado_em) e as linhas cujo top-k citava algum
+deles; as demais linhas só são comparadas com os documentos novos e mescladas.
+
+Uso:
+    python -m matching_job                #incremental
+    python -m matching_job --full         #recalcula tudo
+    python -m matching_job --k 20 --block-size 2048
+"""
+import argparse
+import datetime
+import time
+import numpy as np
+from pymongo import ReplaceOne
+from db_connection import get_db, COL_VAGAS, COL_CURRICULOS, COL_MATCHES, COL_MATCHES_STATE
+from vector_index import EMBEDDING_DIM
+from embedding_storage import unpack_embedding, EMBEDDING_PRESENTE
+
+#(origem, coleção de origem, coleção de destino)
+DIRECOES = (
+    ("vagas", COL_VAGAS, COL_CURRICULOS),
+    ("curriculos", COL_CURRICULOS, COL_VAGAS)
+)
+ESCRITAS_POR_LOTE = 1000
+
+
+class Embeddings:
+    """Embeddings normalizados de uma coleção, com os metadados para incremental."""
+
+    def __init__(self, collection):
+        ids, seq_ids, vectors, timestamps = [], [], [], []
+        projection = {"id": 1, "embedding": 1, "embedding_atualizado_em": 1}
+        for doc in collection.find(EMBEDDING_PRESENTE, projection, batch_size=1000):
+            vector = unpack_embedding(doc["embedding"])  #Array, float32 ou int8 binário
+            if vector is None or vector.shape != (EMBEDDING_DIM,):
+                continue
+            ids.append(doc["_id"])
+            seq_ids.append(doc.get("id"))
+            vectors.append(vector)
+            timestamps.append(doc.get("embedding_atualizado_em"))
+
+        self.ids = ids
+        self.seq_ids = seq_ids
+        self.timestamps = timestamps
+        self.row_by_id = {doc_id: row for row, doc_id in enumerate(ids)}
+
+        matrix = np.vstack(vectors) if vectors else np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def changed_rows(self, marca):
+        """Linhas novas (_id acima da marca) ou com vetor regravado depois da marca."""
+        if not marca:
+            return np.arange(len(self))
+        max_id, max_ts = marca.get("max_id"), marca.get("max_ts")
+        rows = [
+            row for row, (doc_id, ts) in enumerate(zip(self.ids, self.timestamps))
+            if (max_id is None or doc_id > max_id) or (ts is not None and max_ts is not None and ts >= max_ts)
+        ]
+        return np.asarray(rows, dtype=np.int64)
+
+    def marca(self):
+        """Marca d'água para a próxima execução."""
+        timestamps = [ts for ts in self.timestamps if ts is not None]
+        return {
+            "max_id": max(self.ids) if self.ids else None,
+            "max_ts": max(timestamps) if timestamps else None
+        }
+
+
+def topk_rows(A, B, k, block_size):
+    """
+    Top-k de cada linha de A contra todas as linhas de B (cosseno, vetores já normalizados).
+    A matriz de similaridade é calculada em blocos de block_size x block_size e o top-k de cada
+    linha é mantido incrementalmente, então a memória não depende de len(A) * len(B).
+    Retorna (índices em B, scores), ambos len(A) x min(k, len(B)), em ordem decrescente.
+    """
+    n, m = A.shape[0], B.shape[0]
+    k = min(k, m)
+    best_idx = np.empty((n, k), dtype=np.int64)
+    best_scores = np.empty((n, k), dtype=np.float32)
+    if n == 0 or k == 0:
+        return best_idx, best_scores
+
+    for r0 in range(0, n, block_size):
+        r1 = min(n, r0 + block_size)
+        run_idx = np.empty((r1 - r0, 0), dtype=np.int64)
+        run_scores = np.empty((r1 - r0, 0), dtype=np.float32)
+
+        for c0 in range(0, m, block_size):
+            c1 = min(m, c0 + block_size)
+            bloco = A[r0:r1] @ B[c0:c1].T
+            #Junta o top-k acumulado com o bloco e fica só com os k melhores de novo
+            cand_scores = np.concatenate([run_scores, bloco], axis=1)
+            cand_idx = np.concatenate([run_idx, np.broadcast_to(np.arange(c0, c1), bloco.shape)], axis=1)
+            if cand_scores.shape[1] > k:
+                keep = np.argpartition(-cand_scores, k - 1, axis=1)[:, :k]
+                cand_scores = np.take_along_axis(cand_scores, keep, axis=1)
+                cand_idx = np.take_along_axis(cand_idx, keep, axis=1)
+            run_scores, run_idx = cand_scores, cand_idx
+
+        order = np.argsort(-run_scores, axis=1)
+        best_scores[r0:r1] = np.take_along_axis(run_scores, order, axis=1)
+        best_idx[r0:r1] = np.take_along_axis(run_idx, order, axis=1)
+
+    return best_idx, best_scores
+
+
+def montar_matches(idx_row, scores_row, destino):
+    #Score na mesma escala do Atlas Vector Search para cosseno: (1 + cos) / 2
+    return [
+        {"doc_id": destino.ids[j], "id": destino.seq_ids[j], "score": float((1.0 + s) / 2.0)}
+        for j, s in zip(idx_row, scores_row)
+    ]
+
+
+def carregar_matches(matches_col, origem):
+    """Top-k já gravados: doc_id -> lista de matches."""
+    return {
+        doc["doc_id"]: doc.get("matches", [])
+        for doc in matches_col.find({"origem": origem}, {"doc_id": 1, "matches": 1})
+    }
+
+
+def processar_direcao(db, origem, fonte, destino, changed_fonte, changed_destino, k, block_size, full):
+    """Recalcula e grava o top-k da direção fonte -> destino. Retorna quantas linhas foram gravadas."""
+    matches_col = db[COL_MATCHES]
+    agora = datetime.datetime.now(datetime.timezone.utc)
+
+    #Linhas recalculadas do zero e linhas que só precisam ver os destinos novos
+    if full:
+        dirty = np.arange(len(fonte))
+        existentes = {}
+    else:
+        existentes = carregar_matches(matches_col, origem)
+
+        #Documentos que sumiram da origem: remove o top-k deles
+        removidos = [doc_id for doc_id in existentes if doc_id not in fonte.row_by_id]
+        for start in range(0, len(removidos), ESCRITAS_POR_LOTE):
+            matches_col.delete_many({"origem": origem, "doc_id": {"$in": removidos[start:start + ESCRITAS_POR_LOTE]}})
+
+        #Destinos alterados ou removidos invalidam os top-k que os citavam
+        invalidos = {destino.ids[j] for j in changed_destino}
+        invalidos |= {
+            m["doc_id"] for lista in existentes.values() for m in lista
+            if m["doc_id"] not in destino.row_by_id
+        }
+        dirty = set(changed_fonte.tolist())
+        for doc_id, lista in existentes.items():
+            row = fonte.row_by_id.get(doc_id)
+            if row is not None and (row not in dirty) and any(m["doc_id"] in invalidos for m in lista):
+                dirty.add(row)
+        #Linhas sem top-k gravado também são recalculadas
+        dirty |= {row for doc_id, row in fonte.row_by_id.items() if doc_id not in existentes}
+        dirty = np.asarray(sorted(dirty), dtype=np.int64)
+
+    operacoes = []
+
+    #1. Linhas sujas: top-k contra todos os destinos
+    if dirty.size:
+        idx, scores = topk_rows(fonte.matrix[dirty], destino.matrix, k, block_size)
+        for i, row in enumerate(dirty):
+            operacoes.append((row, montar_matches(idx[i], scores[i], destino)))
+
+    #2. Linhas limpas: compara só com os destinos novos e mescla com o top-k gravado
+    if not full and changed_destino.size:
+        dirty_set = set(dirty.tolist())
+        limpas = np.asarray([row for row in range(len(fonte)) if row not in dirty_set], dtype=np.int64)
+        if limpas.size:
+            novos = destino.matrix[changed_destino]
+            idx, scores = topk_rows(fonte.matrix[limpas], novos, k, block_size)
+            for i, row in enumerate(limpas):
+                candidatos = existentes.get(fonte.ids[row], []) + montar_matches(changed_destino[idx[i]], scores[i], destino)
+                candidatos.sort(key=lambda m: m["score"], reverse=True)
+                operacoes.append((row, candidatos[:k]))
+
+    #Grava em lotes
+    gravadas = 0
+    for start in range(0, len(operacoes), ESCRITAS_POR_LOTE):
+        lote = [
+            ReplaceOne(
+                {"_id": f"{origem}:{fonte.ids[row]}"},
+                {
+                    "_id": f"{origem}:{fonte.ids[row]}",
+                    "origem": origem,
+                    "doc_id": fonte.ids[row],
+                    "id": fonte.seq_ids[row],
+                    "matches": lista,
+                    "atualizado_em": agora
+                },
+                upsert=True
+            )
+            for row, lista in operacoes[start:start + ESCRITAS_POR_LOTE]
+        ]
+        matches_col.bulk_write(lote, ordered=False)
+        gravadas += len(lote)
+    return gravadas
+
+
+def run(k=20, block_size=2048, full=False):
+    db = get_db()
+    if db is None:
+        print("❌ Erro crítico: não conectou ao MongoDB.")
+        return 1
+
+    inicio = time.monotonic()
+    estado = db[COL_MATCHES_STATE].find_one({"_id": "estado"}) or {}
+    if estado.get("k") != k:
+        full = True  #Mudou o k: os top-k gravados não servem mais
+
+    embeddings = {COL_VAGAS: Embeddings(db[COL_VAGAS]), COL_CURRICULOS: Embeddings(db[COL_CURRICULOS])}
+    marcas = {} if full else estado.get("marcas", {})
+    changed = {nome: emb.changed_rows(marcas.get(nome)) for nome, emb in embeddings.items()}
+    print(f"📥 {len(embeddings[COL_VAGAS])} vagas e {len(embeddings[COL_CURRICULOS])} currículos carregados "
+          f"({time.monotonic() - inicio:.1f}s). Alterados: {changed[COL_VAGAS].size} vagas, "
+          f"{changed[COL_CURRICULOS].size} currículos.")
+
+    if full:
+        db[COL_MATCHES].delete_many({})
+    db[COL_MATCHES].create_index([("origem", 1), ("doc_id", 1)])
+
+    for origem, nome_fonte, nome_destino in DIRECOES:
+        t0 = time.monotonic()
+        gravadas = processar_direcao(
+            db, origem, embeddings[nome_fonte], embeddings[nome_destino],
+            changed[nome_fonte], changed[nome_destino], k, block_size, full
+        )
+        print(f"✅ {origem}: {gravadas} linhas gravadas em {time.monotonic() - t0:.1f}s.")
+
+    db[COL_MATCHES_STATE].replace_one(
+        {"_id": "estado"},
+        {
+            "_id": "estado",
+            "k": k,
+            "marcas": {nome: emb.marca() for nome, emb in embeddings.items()},
+            "executado_em": datetime.datetime.now(datetime.timezone.utc)
+        },
+        upsert=True
+    )
+    print(f"🏁 Matching concluído em {time.monotonic() - inicio:.1f}s.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Matching em lote entre vagas e currículos.")
+    parser.add_argument("--k", type=int, default=20, help="Quantos matches guardar por documento.")
+    parser.add_argument("--block-size", type=int, default=2048, help="Tamanho do bloco da matriz de similaridade.")
+    parser.add_argument("--full", action="store_true", help="Ignora o incremental e recalcula tudo.")
+    args = parser.parse_args()
+    return run(k=args.k, block_size=args.block_size, full=args.full)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
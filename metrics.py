@@ -0,0 +1,338 @@
+"""
+Instrumentação leve dos caminhos quentes (sem dependências além do pymongo).
+
+- Histogramas de latência em memória (buckets fixos, p50/p95/p99 por interpolação), alimentados por
+  `timed` (decorator) e `timer` (context manager);
+- MongoCommandListener: latência e bytes retornados por comando/coleção, e captura das consultas
+  lentas com o *formato* do filtro (valores trocados por "?", nunca os dados do usuário);
+- Exportação no formato texto do Prometheus (`prometheus_text`) e um servidor HTTP opcional
+  (`start_exporter`, secret METRICS_PORT) para o scrape.
+
+Os números são por processo (cada processo do Streamlit/worker tem os seus).
+"""
+import time
+import bisect
+import datetime
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bson
+from pymongo import monitoring
+
+PREFIXO = "labbd"
+
+#Limites superiores dos buckets, em segundos (de 0,5 ms a 30 s)
+BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+class Histogram:
+    """Histograma cumulativo de latências (memória constante)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  #Último = acima do maior bucket (+Inf)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """Estimativa do percentil q (0-1) por interpolação linear dentro do bucket."""
+        if self.count == 0:
+            return 0.0
+        alvo = q * self.count
+        acumulado = 0
+        for i, n in enumerate(self.counts):
+            if acumulado + n >= alvo and n > 0:
+                inferior = self.buckets[i - 1] if i > 0 else 0.0
+                superior = self.buckets[i] if i < len(self.buckets) else self.max
+                return inferior + (superior - inferior) * (alvo - acumulado) / n
+            acumulado += n
+        return self.max
+
+    def resumo(self):
+        return {
+            "count": self.count,
+            "media_ms": 1000.0 * self.sum / self.count if self.count else 0.0,
+            "p50_ms": 1000.0 * self.percentile(0.50),
+            "p95_ms": 1000.0 * self.percentile(0.95),
+            "p99_ms": 1000.0 * self.percentile(0.99),
+            "max_ms": 1000.0 * self.max
+        }
+
+
+#--- Registro do processo ---
+_lock = threading.Lock()
+#(nome, labels ordenados) -> Histogram
+_histograms = {}
+#(nome, labels ordenados) -> valor
+_counters = {}
+#Consultas lentas mais recentes
+_slow_queries = deque(maxlen=200)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, seconds, **labels):
+    """Registra uma latência (em segundos) no histograma `name` com os labels dados."""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def incr(name, value=1, **labels):
+    """Soma `value` ao contador `name`."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+@contextmanager
+def timer(op, **labels):
+    """Mede o bloco no histograma de latência das operações (labbd_latency_seconds{op=...})."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("latency_seconds", time.perf_counter() - inicio, op=op, **labels)
+
+
+def timed(op=None):
+    """Decorator: mede cada chamada da função (op padrão: nome da função)."""
+    def decorator(fn):
+        nome = op or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(nome):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+#--- MongoDB ---
+def filter_shape(value, depth=0):
+    """Formato do filtro/pipeline: mantém campos e operadores, troca valores por "?"."""
+    if depth > 6:
+        return "…"
+    if isinstance(value, dict):
+        return {k: filter_shape(v, depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        #$and/$or/pipelines: formato de cada item; listas de valores ($in) viram ["?"]
+        if value and all(isinstance(v, dict) for v in value):
+            return [filter_shape(v, depth + 1) for v in value]
+        return ["?"] if value else []
+    return "?"
+
+
+def _command_shape(command_name, command):
+    if command_name == "find":
+        return filter_shape(command.get("filter", {}))
+    if command_name == "aggregate":
+        return filter_shape(command.get("pipeline", []))
+    if command_name in ("update", "delete"):
+        itens = command.get("updates") or command.get("deletes") or []
+        return filter_shape(itens[0].get("q", {})) if itens else {}
+    if command_name in ("findAndModify", "count", "distinct"):
+        return filter_shape(command.get("query", {}))
+    return None
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Latência e tamanho da resposta de cada comando, por (comando, coleção).
+    Comandos acima de slow_ms entram na lista de consultas lentas com o formato do filtro.
+    """
+
+    #Comandos internos que não interessam (handshake, heartbeat, sessões)
+    IGNORADOS = frozenset({"hello", "isMaster", "ismaster", "ping", "saslStart", "saslContinue",
+                           "endSessions", "buildInfo"})
+
+    def __init__(self, slow_ms=100.0, measure_reply_bytes=True):
+        self.slow_ms = slow_ms
+        self.measure_reply_bytes = measure_reply_bytes
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+    def _event_key(self, event):
+        return event.request_id, event.connection_id
+
+    def started(self, event):
+        if event.command_name in self.IGNORADOS:
+            return
+        command = event.command
+        #getMore traz o cursor no campo do comando e a coleção em "collection"
+        collection = command.get("collection" if event.command_name == "getMore" else event.command_name)
+        info = (
+            event.command_name,
+            collection if isinstance(collection, str) else "",
+            _command_shape(event.command_name, command)
+        )
+        with self._pending_lock:
+            self._pending[self._event_key(event)] = info
+
+    def _finish(self, event, reply=None, failed=False):
+        with self._pending_lock:
+            info = self._pending.pop(self._event_key(event), None)
+        if info is None:
+            return
+        command_name, collection, shape = info
+        seconds = event.duration_micros / 1e6
+        observe("mongo_command_seconds", seconds, command=command_name, collection=collection)
+
+        reply_bytes = 0
+        if reply is not None and self.measure_reply_bytes:
+            try:
+                #A resposta já chega decodificada: re-encoda para medir (custo proporcional ao tamanho)
+                reply_bytes = len(bson.encode(reply))
+            except Exception:
+                reply_bytes = 0
+            incr("mongo_reply_bytes_total", reply_bytes, command=command_name, collection=collection)
+        if failed:
+            incr("mongo_command_errors_total", command=command_name, collection=collection)
+
+        if seconds * 1000.0 >= self.slow_ms:
+            with _lock:
+                _slow_queries.append({
+                    "quando": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+                    "comando": command_name,
+                    "colecao": collection,
+                    "formato": shape,
+                    "ms": seconds * 1000.0,
+                    "bytes": reply_bytes,
+                    "falhou": failed
+                })
+
+    def succeeded(self, event):
+        self._finish(event, reply=event.reply)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+_listener = None
+
+
+def get_command_listener(slow_ms=100.0, measure_reply_bytes=True):
+    """Listener único do processo (passe em MongoClient(event_listeners=[...]))."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            _listener = MongoCommandListener(slow_ms=slow_ms, measure_reply_bytes=measure_reply_bytes)
+        return _listener
+
+
+#--- Leitura / exportação ---
+def snapshot():
+    """Cópia dos números atuais: histogramas resumidos, contadores e consultas lentas."""
+    with _lock:
+        histogramas = [
+            {"nome": name, **dict(labels), **histogram.resumo()}
+            for (name, labels), histogram in _histograms.items()
+        ]
+        contadores = [
+            {"nome": name, **dict(labels), "valor": valor}
+            for (name, labels), valor in _counters.items()
+        ]
+        lentas = list(_slow_queries)
+    return {"histogramas": histogramas, "contadores": contadores, "consultas_lentas": lentas}
+
+
+def reset():
+    """Zera tudo (página de métricas / benchmarks)."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _slow_queries.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(labels, extra=()):
+    itens = list(labels) + list(extra)
+    if not itens:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in itens) + "}"
+
+
+def prometheus_text(gauges=None):
+    """
+    Métricas no formato texto do Prometheus (exposition format 0.0.4).
+    gauges: valores extras {nome: valor} ou {nome: [(labels dict, valor), ...]} (ex: estatísticas de cache).
+    """
+    linhas = []
+    with _lock:
+        histogramas = sorted(_histograms.items())
+        contadores = sorted(_counters.items())
+
+    declarados = set()
+    for (name, labels), histogram in histogramas:
+        metric = f"{PREFIXO}_{name}"
+        if metric not in declarados:
+            linhas.append(f"# TYPE {metric} histogram")
+            declarados.add(metric)
+        acumulado = 0
+        for limite, n in zip(histogram.buckets, histogram.counts):
+            acumulado += n
+            linhas.append(f"{metric}_bucket{_labels_text(labels, [('le', repr(limite))])} {acumulado}")
+        linhas.append(f"{metric}_bucket{_labels_text(labels, [('le', '+Inf')])} {histogram.count}")
+        linhas.append(f"{metric}_sum{_labels_text(labels)} {histogram.sum}")
+        linhas.append(f"{metric}_count{_labels_text(labels)} {histogram.count}")
+
+    for (name, labels), valor in contadores:
+        metric = f"{PREFIXO}_{name}"
+        if metric not in declarados:
+            linhas.append(f"# TYPE {metric} counter")
+            declarados.add(metric)
+        linhas.append(f"{metric}{_labels_text(labels)} {valor}")
+
+    for name, valor in (gauges or {}).items():
+        metric = f"{PREFIXO}_{name}"
+        linhas.append(f"# TYPE {metric} gauge")
+        series = valor if isinstance(valor, list) else [({}, valor)]
+        for labels, v in series:
+            linhas.append(f"{metric}{_labels_text(sorted(labels.items()))} {float(v)}")
+    return "\n".join(linhas) + "\n"
+
+
+def start_exporter(port, gauges_fn=None, host="0.0.0.0"):
+    """
+    Sobe um servidor HTTP (thread daemon) respondendo GET /metrics com prometheus_text().
+    gauges_fn, se passado, é chamado a cada scrape para os gauges extras.
+    """
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            corpo = prometheus_text(gauges_fn() if gauges_fn else None).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass  #Sem uma linha de log por scrape
+
+    server = ThreadingHTTPServer((host, int(port)), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
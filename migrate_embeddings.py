@@ -0,0 +1,77 @@
+"""
+Migração do campo `embedding` para o formato compacto (BSON binary vector float32 ou int8).
+
+Converte, em lotes, os documentos de `vagas` e `curriculos` cujo vetor ainda está em outro formato
+(ex: o array de doubles antigo) e o cache de embeddings (sempre para float32). Os valores do vetor não
+mudam (a menos da quantização int8), então `embedding_atualizado_em` não é alterado e o matching
+não precisa recalcular nada. Pode ser interrompida e executada de novo: só o que falta é convertido.
+
+Uso:
+    python -m migrate_embeddings                    #formato de EMBEDDING_STORAGE (padrão float32)
+    python -m migrate_embeddings --storage int8
+    python -m migrate_embeddings --dry-run          #só mede o tamanho antes/depois
+"""
+import argparse
+import time
+import bson
+from pymongo import UpdateOne
+from db_connection import get_db, get_embedding_storage, COL_VAGAS, COL_CURRICULOS, COL_EMBEDDING_CACHE
+from embedding_storage import pack_embedding, storage_of, EMBEDDING_STORAGES, EMBEDDING_PRESENTE
+
+
+def tamanho(valor):
+    """Bytes que o campo embedding ocupa no documento BSON."""
+    return len(bson.encode({"embedding": valor}))
+
+
+def migrar_colecao(collection, storage, batch_size, dry_run):
+    """Converte os vetores de uma coleção. Retorna (convertidos, bytes antes, bytes depois)."""
+    convertidos, antes, depois = 0, 0, 0
+    operacoes = []
+    for doc in collection.find(EMBEDDING_PRESENTE, {"embedding": 1}, batch_size=batch_size):
+        if storage_of(doc["embedding"]) == storage:
+            continue
+        novo = pack_embedding(doc["embedding"], storage)
+        antes += tamanho(doc["embedding"])
+        depois += tamanho(novo)
+        convertidos += 1
+        #Só troca se o vetor ainda for o mesmo (não sobrescreve um vetor regravado no meio da migração)
+        operacoes.append(UpdateOne({"_id": doc["_id"], "embedding": doc["embedding"]}, {"$set": {"embedding": novo}}))
+        if len(operacoes) >= batch_size:
+            if not dry_run:
+                collection.bulk_write(operacoes, ordered=False)
+            operacoes = []
+    if operacoes and not dry_run:
+        collection.bulk_write(operacoes, ordered=False)
+    return convertidos, antes, depois
+
+
+def run(storage=None, batch_size=500, dry_run=False):
+    db = get_db()
+    if db is None:
+        print("❌ Erro crítico: não conectou ao MongoDB.")
+        return 1
+
+    storage = storage or get_embedding_storage()
+    alvos = ((COL_VAGAS, storage), (COL_CURRICULOS, storage), (COL_EMBEDDING_CACHE, "float32"))
+    for nome, formato in alvos:
+        inicio = time.monotonic()
+        convertidos, antes, depois = migrar_colecao(db[nome], formato, batch_size, dry_run)
+        reducao = antes / depois if depois else 0.0
+        print(f"{'🔎' if dry_run else '✅'} {nome}: {convertidos} vetores -> {formato} | "
+              f"{antes / 1e6:.1f} MB -> {depois / 1e6:.1f} MB ({reducao:.1f}x menor) em {time.monotonic() - inicio:.1f}s")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte o campo embedding para binary vector.")
+    parser.add_argument("--storage", choices=EMBEDDING_STORAGES, default=None,
+                        help="Formato de destino (padrão: EMBEDDING_STORAGE).")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documentos por bulk_write.")
+    parser.add_argument("--dry-run", action="store_true", help="Não grava; só mostra quanto seria economizado.")
+    args = parser.parse_args()
+    return run(storage=args.storage, batch_size=args.batch_size, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,12 @@
+import startup_profile
+startup_profile.begin(__file__)
 import streamlit as st
 from db_connection import get_collections
 import re
-import bcrypt
+from auth import hash_password
 from pymongo.errors import PyMongoError
 import datetime
+startup_profile.imports_done()
 
 
 #--- Funções auxiliares ---
@@ -12,10 +15,6 @@ def is_valid_email(email):
     return re.match(regex, email)
 
 
-def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-
-
 #--- Configuração da página ---
 st.set_page_config(page_title="Cadastro de Usuário", page_icon="📝", layout="centered")
 
@@ -105,4 +104,6 @@ if submit_button:
         st.info("Vá para a página de **Login** para entrar.")
 
     except Exception as e:
-        st.error(f"Erro ao salvar: {e}")
\ No newline at end of file
+        st.error(f"Erro ao salvar: {e}")
+
+startup_profile.rendered()
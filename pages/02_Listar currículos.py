@@ -1,6 +1,13 @@
+import startup_profile
+startup_profile.begin(__file__)
 import streamlit as st
-import pandas as pd
-from db_connection import get_collections
+from listings import (
+    contar_curriculos, consultar_pagina_curriculos, consultar_detalhes, consultar_skills_vaga, consultar_ranking_skills
+)
+from db_connection import get_skill_dictionary
+from data_cache import versioned_cache
+import pagination
+startup_profile.imports_done()
 
 #--- CONTROLE DE ACESSO ---
 if 'logged_in' not in st.session_state or not st.session_state['logged_in']:
@@ -17,29 +24,49 @@ if tipo_usuario == 'candidato':
 #--------------------------
 
 #Carregamento de dados
-@st.cache_data
-def load_curriculos_data():
-    _, col_curriculos, _ = get_collections()
-    if col_curriculos is None:
-        st.error("Não foi possível conectar à coleção de currículos.")
-        return pd.DataFrame()
+@versioned_cache("curriculos", max_entries=256)
+def load_total_curriculos(search_query=""):
+    """Total de currículos (ou dos que casam com a busca)."""
+    try:
+        return contar_curriculos(search_query)
+    except Exception as e:
+        st.error(f"Erro ao carregar currículos do MongoDB: {e}")
+        return None
 
+
+@versioned_cache("curriculos", max_entries=256)
+def load_curriculos_pagina(search_query="", cursor=None, tamanho=20):
+    """Uma página de cabeçalhos (por data de cadastro ou, com busca, por relevância)."""
     try:
-        #Admin e empregador veem tudo
-        cursor = col_curriculos.find()
-        curriculos_list = list(cursor)
-        df = pd.DataFrame(curriculos_list)
+        pagina = consultar_pagina_curriculos(search_query, cursor, tamanho)
+    except Exception as e:
+        st.error(f"Erro ao carregar currículos do MongoDB: {e}")
+        return None
+    if pagina is None:
+        st.error("Não foi possível conectar à coleção de currículos.")
+    return pagina
+
 
-        if df.empty:
-            return df
+@versioned_cache("curriculos", max_entries=256)
+def load_curriculos_detalhes(ids):
+    """Perfil profissional e contato dos cards abertos."""
+    try:
+        return consultar_detalhes("curriculos", ids) or {}
+    except Exception as e:
+        st.error(f"Erro ao carregar os detalhes dos currículos: {e}")
+        return {}
 
-        if '_id' in df.columns:
-            df['_id'] = df['_id'].astype(str)
 
-        return df
+def load_ranking_vaga(vaga_id, minimo, limite):
+    """Vaga e currículos com mais skills em comum (bitsets em memória, sem cache de página)."""
+    try:
+        vaga = consultar_skills_vaga(vaga_id)
+        if vaga is None:
+            return None, []
+        return vaga, consultar_ranking_skills(vaga["skill_ids"], minimo, limite) or []
     except Exception as e:
-        st.error(f"Erro ao carregar currículos do MongoDB: {e}")
-        return pd.DataFrame()
+        st.error(f"Erro ao calcular a compatibilidade: {e}")
+        return None, []
 
 
 def format_list_display(data_list):
@@ -50,69 +77,114 @@ def format_list_display(data_list):
     return "N/A"
 
 
+def desenhar_card(row, detalhes, compatibilidade=None):
+    """Card do currículo; perfil e contato só quando o toggle está ligado."""
+    title = f"**{row.get('nome', 'N/A')}** - {row.get('formacao', 'Formação N/A')}"
+
+    with st.container(border=True):
+        st.markdown(title)
+        st.caption(f"ID: {row.get('id', 'N/A')}")
+        if compatibilidade:
+            st.markdown(compatibilidade)
+        if not st.toggle("Perfil e contato", key=pagination.chave_detalhe("curriculo", row["_id"])):
+            return
+
+        detalhe = detalhes.get(row["_id"])
+        if detalhe is None:
+            st.caption("Detalhes indisponíveis (o currículo pode ter sido removido).")
+            return
+
+        #Layout em colunas: Dados profissionais | Contato
+        col_dados, col_contato = st.columns([2, 1])
+
+        with col_dados:
+            st.markdown("#### 💼 Perfil profissional")
+
+            skills = format_list_display(detalhe.get('skills', []))
+            idiomas = format_list_display(detalhe.get('idiomas', []))
+
+            if skills != "N/A": st.markdown(f"**🛠 Skills:** {skills}")
+            if idiomas != "N/A": st.markdown(f"**🗣 Idiomas:** {idiomas}")
+
+            st.markdown(f"**Experiência:** {detalhe.get('experiencia', 'N/A')}")
+            st.info(f"**Resumo:** {detalhe.get('resumo', 'N/A')}")
+
+        with col_contato:
+            st.markdown("#### 📞 Contato")
+            st.markdown(f"**Email:** {detalhe.get('email', 'N/A')}")
+            st.markdown(f"**Tel:** {detalhe.get('telefone', 'N/A')}")
+
+
 #--- "main()" ---
 st.set_page_config(page_title="Banco de talentos", page_icon="👥", layout="wide")
 st.title("👥 Banco de talentos")
 st.markdown("Explore os currículos cadastrados no sistema.")
 
 if st.sidebar.button("🔄 Atualizar lista"):
-    st.cache_data.clear()
+    #Limpa só os caches desta página
+    load_total_curriculos.clear()
+    load_curriculos_pagina.clear()
+    load_curriculos_detalhes.clear()
     st.rerun()
 
-df_curriculos = load_curriculos_data()
-
-if df_curriculos.empty:
-    st.info("Ainda não há currículos cadastrados.")
-    st.stop()
-
 #--- FILTROS ---
 st.sidebar.header("Filtros")
-search_query = st.sidebar.text_input("🔍 Buscar (Skill, Idioma, Formação)", "").lower()
-
-df_filtered = df_curriculos.copy()
+search_query = st.sidebar.text_input("🔍 Buscar (Skill, Idioma, Formação)", "").strip()
+tamanho_pagina = pagination.seletor_tamanho("curriculos_pagina")
+
+#--- COMPATIBILIDADE COM UMA VAGA (skills canônicas em comum) ---
+st.sidebar.header("🎯 Compatibilidade com vaga")
+vaga_id = st.sidebar.number_input("ID da vaga (0 = desligado)", min_value=0, step=1, value=0)
+minimo_skills = st.sidebar.slider("Mínimo de skills em comum", min_value=1, max_value=10, value=2)
+
+if vaga_id:
+    vaga, ranking = load_ranking_vaga(int(vaga_id), minimo_skills, tamanho_pagina)
+    if vaga is None:
+        st.warning(f"Vaga {int(vaga_id)} não encontrada.")
+        st.stop()
+
+    nomes_vaga = get_skill_dictionary().nomes(vaga["skill_ids"])
+    st.subheader(f"Mais compatíveis com a vaga {int(vaga_id)}: {vaga.get('titulo', '')} ({vaga.get('empresa', '')})")
+    st.caption(f"Skills da vaga: {', '.join(nomes_vaga) or 'nenhuma no vocabulário'}")
+    st.metric("Candidatos exibidos", len(ranking))
+    st.markdown("---")
+    if not ranking:
+        st.warning("Nenhum currículo com as skills mínimas em comum.")
+        st.stop()
+
+    detalhes = load_curriculos_detalhes(pagination.abertos("curriculo", ranking))
+    for row in ranking:
+        comuns = ", ".join(get_skill_dictionary().nomes(row["comum_ids"]))
+        desenhar_card(row, detalhes, f"**🎯 {row['comum']}/{len(vaga['skill_ids'])} skills em comum:** {comuns}")
+    startup_profile.rendered()
+    st.stop()
 
-#Lógica de filtro Pandas (simplificada para brevidade)
-if search_query:
-    #Função lambda rápida para juntar listas
-    to_str = lambda x: ' '.join(x).lower() if isinstance(x, list) else str(x).lower()
+#Busca indexada no MongoDB: só a página atual dos currículos que casam com a busca é lida
+total = load_total_curriculos(search_query)
+if total is None:
+    st.stop()
+if total == 0 and not search_query:
+    st.info("Ainda não há currículos cadastrados.")
+    st.stop()
 
-    mask = (
-            df_filtered['formacao'].apply(to_str).str.contains(search_query) |
-            df_filtered['skills'].apply(to_str).str.contains(search_query) |
-            df_filtered['idiomas'].apply(to_str).str.contains(search_query)
-    )
-    df_filtered = df_filtered[mask]
+cursor = pagination.cursor_atual("curriculos_pagina", (search_query, tamanho_pagina))
+pagina = load_curriculos_pagina(search_query, cursor, tamanho_pagina)
+if pagina is None:
+    st.stop()
 
-st.metric("Candidatos encontrados", len(df_filtered))
+st.metric("Candidatos encontrados", total)
 st.markdown("---")
 
-if df_filtered.empty:
+if not pagina["itens"]:
     st.warning("Nenhum currículo encontrado com os filtros atuais.")
     st.stop()
 
-#--- EXIBIÇÃO ---
-for index, row in df_filtered.iterrows():
-    title = f"**{row['nome']}** - {row.get('formacao', 'Formação N/A')}"
-
-    with st.expander(title):
-        #Layout em colunas: Dados profissionais | Contato
-        col_dados, col_contato = st.columns([2, 1])
-
-        with col_dados:
-            st.markdown("#### 💼 Perfil profissional")
+#--- EXIBIÇÃO (só a página atual; perfil e contato só dos cards abertos) ---
+detalhes = load_curriculos_detalhes(pagination.abertos("curriculo", pagina["itens"]))
 
-            skills = format_list_display(row.get('skills', []))
-            idiomas = format_list_display(row.get('idiomas', []))
+for row in pagina["itens"]:
+    desenhar_card(row, detalhes)
 
-            if skills != "N/A": st.markdown(f"**🛠 Skills:** {skills}")
-            if idiomas != "N/A": st.markdown(f"**🗣 Idiomas:** {idiomas}")
-
-            st.markdown(f"**Experiência:** {row.get('experiencia', 'N/A')}")
-            st.info(f"**Resumo:** {row.get('resumo', 'N/A')}")
-
-        with col_contato:
-            st.markdown("#### 📞 Contato")
-            st.markdown(f"**Email:** {row.get('email', 'N/A')}")
-            st.markdown(f"**Tel:** {row.get('telefone', 'N/A')}")
+pagination.controles("curriculos_pagina", pagina["proximo"])
 
-        st.caption(f"ID: {row.get('id', 'N/A')}")
\ No newline at end of file
+startup_profile.rendered()
@@ -1,16 +1,34 @@
+import startup_profile
+startup_profile.begin(__file__)
+import functools
 import streamlit as st
-import pandas as pd
-from db_connection import get_collections
-import locale
-
-#Config de localidade (para moeda)
-try:
-    locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-except locale.Error:
-    try:
-        locale.setlocale(locale.LC_ALL, 'Portuguese_Brazil.1252')
-    except locale.Error:
-        pass
+from listings import consultar_opcoes_vagas, consultar_kpis_vagas, consultar_pagina_vagas, consultar_detalhes
+from data_cache import versioned_cache
+import pagination
+startup_profile.imports_done()
+
+
+@functools.lru_cache(maxsize=1)
+def _locale_moeda():
+    """Config de localidade (para moeda), feita uma vez, só quando há salário para exibir."""
+    import locale
+    for nome in ('pt_BR.UTF-8', 'Portuguese_Brazil.1252'):
+        try:
+            locale.setlocale(locale.LC_ALL, nome)
+            return locale
+        except locale.Error:
+            pass
+    return None
+
+
+def formatar_salario(valor):
+    locale = _locale_moeda()
+    if locale is not None:
+        try:
+            return locale.currency(valor, grouping=True, symbol=True)
+        except ValueError:
+            pass
+    return f"R$ {valor:,.2f}"
 
 #--- GESTÃO DE SESSÃO (visitante vs logado) ---
 #Não bloqueamos o acesso, apenas identificamos quem é
@@ -18,37 +36,52 @@ is_logged_in = st.session_state.get('logged_in', False)
 tipo_usuario = st.session_state.get('tipo_usuario', 'visitante')
 empresa_usuario = st.session_state.get('empresa', None)
 
-@st.cache_data
-def load_vagas_data(filtro_empresa=None):
-    """
-    Carrega vagas. Se filtro_empresa for passado, filtra no MongoDB.
-    """
-    col_vagas, _, _ = get_collections()
-    if col_vagas is None:
-        return pd.DataFrame()
 
+@versioned_cache("vagas", empresa_param="filtro_empresa")
+def load_vagas_opcoes(filtro_empresa=None):
+    """Opções dos filtros (tipos, empresas, limites do slider de salário)."""
     try:
-        #LÓGICA DE FILTRO DE NEGÓCIO DIRETO NO MONGO
-        query = {}
-        if filtro_empresa:
-            #Busca case-insensitive para garantir
-            query = {"empresa": {"$regex": f"^{filtro_empresa}$", "$options": "i"}}
+        return consultar_opcoes_vagas(filtro_empresa)
+    except Exception as e:
+        st.error(f"Erro ao carregar vagas: {e}")
+        return None
 
-        cursor = col_vagas.find(query)
-        vagas_list = list(cursor)
-        df = pd.DataFrame(vagas_list)
 
-        if df.empty:
-            return df
+@versioned_cache("vagas", empresa_param="filtro_empresa", max_entries=256)
+def load_vagas_kpis(filtro_empresa=None, salario_range=None, tipo_contratacao=None,
+                    empresa=None, search_query="", incluir_repostagens=False):
+    """KPIs das vagas filtradas (não mudam ao trocar de página)."""
+    try:
+        return consultar_kpis_vagas(
+            filtro_empresa, salario_range, tipo_contratacao, empresa, search_query, incluir_repostagens
+        )
+    except Exception as e:
+        st.error(f"Erro ao carregar vagas: {e}")
+        return None
 
-        if '_id' in df.columns:
-            df['_id'] = df['_id'].astype(str)
 
-        df['salario_float'] = pd.to_numeric(df['salario'], errors='coerce')
-        return df
+@versioned_cache("vagas", empresa_param="filtro_empresa", max_entries=256)
+def load_vagas_pagina(filtro_empresa=None, salario_range=None, tipo_contratacao=None,
+                      empresa=None, search_query="", incluir_repostagens=False, cursor=None, tamanho=20):
+    """Uma página de cabeçalhos de vagas (keyset a partir do cursor)."""
+    try:
+        return consultar_pagina_vagas(
+            filtro_empresa, salario_range, tipo_contratacao, empresa, search_query, cursor, tamanho,
+            incluir_repostagens
+        )
     except Exception as e:
         st.error(f"Erro ao carregar vagas: {e}")
-        return pd.DataFrame()
+        return None
+
+
+@versioned_cache("vagas", max_entries=256)
+def load_vagas_detalhes(ids):
+    """Descrição e skills dos cards abertos."""
+    try:
+        return consultar_detalhes("vagas", ids) or {}
+    except Exception as e:
+        st.error(f"Erro ao carregar os detalhes das vagas: {e}")
+        return {}
 
 
 #"main()"
@@ -58,20 +91,26 @@ st.set_page_config(page_title="Dashboard de vagas", page_icon="💼", layout="wi
 if is_logged_in and tipo_usuario == 'empregador':
     st.title(f"📊 Minhas vagas ({empresa_usuario})")
     #Carrega SÓ as vagas da empresa associada ao empregador
-    df_vagas = load_vagas_data(filtro_empresa=empresa_usuario)
+    filtro_empresa = empresa_usuario
 else:
     st.title("📊 Mural de vagas")
     if not is_logged_in:
         st.info("💡 Dica: faça login para acessar funcionalidades avançadas ou cadastrar seu currículo.")
     #Carrega TUDO (Candidato/Admin/Visitante)
-    df_vagas = load_vagas_data(filtro_empresa=None)
+    filtro_empresa = None
+
+opcoes = load_vagas_opcoes(filtro_empresa=filtro_empresa)
 
 #Botão de atualização
 if st.sidebar.button("🔄 Atualizar dados"):
-    st.cache_data.clear()
+    #Limpa só os caches desta página
+    load_vagas_opcoes.clear()
+    load_vagas_kpis.clear()
+    load_vagas_pagina.clear()
+    load_vagas_detalhes.clear()
     st.rerun()
 
-if df_vagas.empty:
+if not opcoes or opcoes["total"] == 0:
     if tipo_usuario == 'empregador':
         st.info(f"Você ainda não cadastrou nenhuma vaga para {empresa_usuario}.")
         st.markdown("Vá em **Cadastrar Vaga** no menu lateral.")
@@ -79,23 +118,25 @@ if df_vagas.empty:
         st.warning("Nenhuma vaga encontrada no sistema.")
     st.stop()
 
-#--- APLICAÇÃO DOS FILTROS (mantido igual, mas agora sobre o df já filtrado) ---
+#--- FILTROS (aplicados no MongoDB) ---
 st.sidebar.header("Filtros avançados")
 
 #1. Filtro de texto
-search_query = st.sidebar.text_input("🔍 Buscar (Título/Empresa/Cidade)", "").lower()
+search_query = st.sidebar.text_input("🔍 Buscar (Título/Empresa/Cidade/Skills)", "").strip()
 
 #2. Filtro de tipo de contratação
-if 'tipo_contratacao' in df_vagas.columns:
-    tipos_unicos = ['Todos'] + list(df_vagas['tipo_contratacao'].unique())
-    tipo_selecionado = st.sidebar.selectbox("📋 Tipo de contratação", options=tipos_unicos)
-else:
-    tipo_selecionado = 'Todos'
-
-#3. Filtro de aalário (alider)
-if 'salario_float' in df_vagas.columns and not df_vagas['salario_float'].isnull().all():
-    min_sal = float(df_vagas['salario_float'].min())
-    max_sal = float(df_vagas['salario_float'].max())
+tipos_unicos = ['Todos'] + opcoes["tipos"]
+tipo_selecionado = st.sidebar.selectbox("📋 Tipo de contratação", options=tipos_unicos)
+
+#3. Filtro de empresa (empregador já está restrito à própria empresa)
+empresa_selecionada = 'Todas'
+if filtro_empresa is None and opcoes["empresas"]:
+    empresa_selecionada = st.sidebar.selectbox("🏢 Empresa", options=['Todas'] + opcoes["empresas"])
+
+#4. Filtro de salário (slider)
+if opcoes["salario_max"] is not None:
+    min_sal = float(opcoes["salario_min"])
+    max_sal = float(opcoes["salario_max"])
     #Margem de segurança para o slider não quebrar se min==max
     if min_sal == max_sal:
         max_sal += 1000.0
@@ -110,72 +151,84 @@ if 'salario_float' in df_vagas.columns and not df_vagas['salario_float'].isnull(
 else:
     salario_range = None
 
-#--- APLICAÇÃO DOS FILTROS ---
-df_filtered = df_vagas.copy()
-
-#Filtro salário
-if salario_range:
-    df_filtered = df_filtered[
-        (df_filtered['salario_float'] >= salario_range[0]) &
-        (df_filtered['salario_float'] <= salario_range[1]) |
-        (df_filtered['salario_float'].isna()) ] #Mantém salários não informados/negociáveis
-
-#Filtro tipo contratação
-if tipo_selecionado != 'Todos':
-    df_filtered = df_filtered[df_filtered['tipo_contratacao'] == tipo_selecionado]
-
-#Filtro texto
-if search_query:
-    df_filtered = df_filtered[
-        df_filtered['titulo'].str.lower().str.contains(search_query, na=False) |
-        df_filtered['descricao'].str.lower().str.contains(search_query, na=False) |
-        df_filtered['empresa'].str.lower().str.contains(search_query, na=False) |
-        df_filtered['cidade'].str.lower().str.contains(search_query, na=False)
-        ]
+#5. Repostagens (vagas quase idênticas a uma já publicada) ficam ocultas por padrão
+incluir_repostagens = st.sidebar.toggle("🔁 Mostrar repostagens", value=False)
+
+tamanho_pagina = pagination.seletor_tamanho("vagas_pagina")
+
+filtros = {
+    "filtro_empresa": filtro_empresa,
+    "salario_range": salario_range,
+    "tipo_contratacao": None if tipo_selecionado == 'Todos' else tipo_selecionado,
+    "empresa": None if empresa_selecionada == 'Todas' else empresa_selecionada,
+    "search_query": search_query,
+    "incluir_repostagens": incluir_repostagens
+}
+kpis = load_vagas_kpis(**filtros)
+if kpis is None:
+    st.stop()
+
+#Filtros diferentes (ou outro tamanho de página) voltam para a primeira página
+cursor = pagination.cursor_atual("vagas_pagina", (tuple(filtros.values()), tamanho_pagina))
+pagina = load_vagas_pagina(**filtros, cursor=cursor, tamanho=tamanho_pagina)
+if pagina is None:
+    st.stop()
 
 #Métricas
 st.markdown("---")
 col_kpi1, col_kpi2, col_kpi3 = st.columns(3)
 
 with col_kpi1:
-    st.metric(label="Total de vagas", value=len(df_filtered))
+    st.metric(label="Total de vagas", value=kpis["total"])
 with col_kpi2:
-    media_salarial = df_filtered['salario_float'].mean()
-    val_media = f"R$ {media_salarial:,.2f}" if pd.notna(media_salarial) else "N/A"
+    media_salarial = kpis["media_salarial"]
+    val_media = f"R$ {media_salarial:,.2f}" if media_salarial is not None else "N/A"
     st.metric(label="Média salarial", value=val_media)
 with col_kpi3:
-    top_cidade = df_filtered['cidade'].mode()[0] if not df_filtered.empty else "N/A"
+    top_cidade = kpis["top_cidade"] or "N/A"
     st.metric(label="Cidade com mais vagas", value=top_cidade)
 
 st.markdown("---")
 
-#--- LISTAGEM ---
-for index, row in df_filtered.iterrows():
+#--- LISTAGEM (só a página atual; descrição e skills só dos cards abertos) ---
+if not pagina["itens"]:
+    st.warning("Nenhuma vaga encontrada com os filtros atuais.")
+
+detalhes = load_vagas_detalhes(pagination.abertos("vaga", pagina["itens"]))
+
+for row in pagina["itens"]:
     salario_display = "A combinar"
-    if pd.notna(row['salario_float']) and row['salario_float'] > 0:
-        try:
-            salario_display = locale.currency(row['salario_float'], grouping=True, symbol=True)
-        except:
-            salario_display = f"R$ {row['salario_float']:,.2f}"
+    if row.get('salario_float') is not None and row['salario_float'] > 0:
+        salario_display = formatar_salario(row['salario_float'])
 
-        #Header do card com cor baseada no tipo
-        tipo_emoji = "💼" if row['tipo_contratacao'] == "CLT" else "📄"
-        title = f"{tipo_emoji} **{row['titulo']}** | {row['empresa']}"
+    #Header do card com cor baseada no tipo
+    tipo_emoji = "💼" if row.get('tipo_contratacao') == "CLT" else "📄"
+    title = f"{tipo_emoji} **{row.get('titulo', 'Sem título')}** | {row.get('empresa', 'N/A')}"
 
-    with st.expander(title):
-        #Layout em colunas dentro do card para ficar mais bonito
+    with st.container(border=True):
+        st.markdown(title)
         c1, c2 = st.columns([1, 2])
         with c1:
-            st.markdown(f"**📍 Local:** {row['cidade']} - {row['estado']}")
+            st.markdown(f"**📍 Local:** {row.get('cidade', 'N/A')} - {row.get('estado', 'N/A')}")
             st.markdown(f"**💰 Salário:** {salario_display}")
-            st.markdown(f"**📝 Tipo de contrato:** {row['tipo_contratacao']}")
+            st.markdown(f"**📝 Tipo de contrato:** {row.get('tipo_contratacao', 'N/A')}")
+            st.caption(f"ID: {row.get('id', 'N/A')}")
+            if row.get('duplicata_de') is not None:
+                st.caption(f"🔁 Repostagem da vaga {row['duplicata_de']}")
         with c2:
-            st.caption("Descrição e requisitos")
-            st.markdown(row['descricao'])
-            skills = row.get('skills', [])
-            if isinstance(skills, list) and skills:
-                st.markdown(f"**🛠 Skills:** {', '.join(skills)}")
-            elif isinstance(skills, str):
-                st.markdown(f"**🛠 Skills:** {skills}")
-
-        st.caption(f"ID: {row.get('id', 'N/A')}")
\ No newline at end of file
+            if st.toggle("Descrição e requisitos", key=pagination.chave_detalhe("vaga", row["_id"])):
+                #O clique no toggle já chega no session_state antes do rerun, então o card está em `detalhes`
+                detalhe = detalhes.get(row["_id"])
+                if detalhe is None:
+                    st.caption("Detalhes indisponíveis (a vaga pode ter sido removida).")
+                else:
+                    st.markdown(detalhe.get('descricao', ''))
+                    skills = detalhe.get('skills', [])
+                    if isinstance(skills, list) and skills:
+                        st.markdown(f"**🛠 Skills:** {', '.join(skills)}")
+                    elif isinstance(skills, str):
+                        st.markdown(f"**🛠 Skills:** {skills}")
+
+pagination.controles("vagas_pagina", pagina["proximo"])
+
+startup_profile.rendered()
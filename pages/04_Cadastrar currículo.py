@@ -1,7 +1,11 @@
+import startup_profile
+startup_profile.begin(__file__)
 import streamlit as st
-from db_connection import get_collections, create_embedding
+from db_connection import get_collections, inline_embedding_fields, next_id, get_skill_dictionary
+from data_cache import bump_data_version
+from schemas import montar_curriculo, SchemaError
 from pymongo.errors import PyMongoError
-import datetime
+startup_profile.imports_done()
 
 #------- CONTROLE DE ACESSO -------
 if 'logged_in' not in st.session_state or not st.session_state['logged_in']:
@@ -132,9 +136,15 @@ with st.form(key="curriculo_form", clear_on_submit=True):
 
 #Lógica de salvamento
 if submitted:
-    #Validação
-    if not all([nome, email, formacao, experiencia, skills_input, idiomas_input, resumo]):
-        st.error("⚠️ Por favor, preencha todos os campos obrigatórios.")
+    #Validação e montagem do documento (mesmo esquema da importação em lote)
+    try:
+        novo_curriculo_doc, text_to_embed = montar_curriculo({
+            "nome": nome, "email": email, "telefone": telefone, "formacao": formacao,
+            "experiencia": experiencia, "resumo": resumo, "skills": skills_input,
+            "idiomas": idiomas_input, "certificacoes": cert_input, "empresas_previas": empresas_input
+        }, dicionario=get_skill_dictionary())
+    except SchemaError as e:
+        st.error(f"⚠️ {e}")
     else:
         try:
             _, col_curriculos, col_usuarios = get_collections()
@@ -142,56 +152,23 @@ if submitted:
                 st.error("Não foi possível conectar à coleção de currículos.")
                 st.stop()
 
-            #Lógica para gerar ID sequencial
-            last_doc = col_curriculos.find_one(sort=[("id", -1)])
-            novo_id = 1
-            if last_doc and "id" in last_doc:
-                novo_id = int(last_doc["id"]) + 1
-
-            #Converte inputs de string para listas
-            skills_list = [s.strip() for s in skills_input.split('\n') if s.strip()]
-            idiomas_list = [s.strip() for s in idiomas_input.split('\n') if s.strip()]
-            cert_list = [s.strip() for s in cert_input.split('\n') if s.strip()]
-            empresas_list = [s.strip() for s in empresas_input.split('\n') if s.strip()]
-
-            #---------- GERAÇÃO DE EMBEDDING ----------
-            embedding_to_save = []
-            st.info("Gerando embedding para o currículo...")
-            text_to_embed = (
-                f"Formação: {formacao}. Experiência: {experiencia}. "
-                f"Resumo: {resumo}. Skills: {', '.join(skills_list)}. "
-                f"Idiomas: {', '.join(idiomas_list)}."
-            )
-
-            embedding = create_embedding(text_to_embed)
-            if embedding:
-                embedding_to_save = embedding
-                st.success("✨ Embedding gerado com sucesso!")
-            else:
-                st.warning("⚠️ Cota do Google AI Studio excedida. O registro foi salvo no banco sem embedding.")
-            #-----------------------------------------
-
-            #Montar o documento (direto, sem lógica de IA)
+            #ID sequencial atômico (coleção counters)
+            novo_id = next_id("curriculos")
+
+            #Texto vetorizado na hora (provedor local) ou pelo worker em segundo plano (Gemini)
             novo_curriculo_doc = {
                 "id": novo_id,
-                "nome": nome,
-                "email": email,
-                "telefone": telefone,
-                "formacao": formacao,
-                "experiencia": experiencia,
-                "skills": skills_list,
-                "idiomas": idiomas_list,
-                "certificacoes": cert_list,
-                "resumo": resumo,
-                "empresas_previas": empresas_list,
-                "embedding": embedding_to_save, #Salva o vetor ou lista vazia
-                "data_cadastro": datetime.datetime.now(datetime.timezone.utc)
+                **novo_curriculo_doc,
+                **inline_embedding_fields(text_to_embed)  #Com o Gemini: embedding_pendente, o worker preenche
             }
 
             #Inserir no banco
-            #1. Insere Currículo
+            #1. Insere Currículo (com o Gemini o mesmo insert já o põe na fila de embeddings)
             col_curriculos.insert_one(novo_curriculo_doc)
 
+            #Invalida os caches de currículos (banco de talentos)
+            bump_data_version("curriculos")
+
             #2. VINCULA AO USUÁRIO (se for candidato)
             if tipo_usuario == 'candidato':
                 col_usuarios.update_one(
@@ -208,4 +185,6 @@ if submitted:
         except PyMongoError as e:
             st.error(f"Erro ao salvar no MongoDB: {e}")
         except Exception as e:
-            st.error(f"Um erro inesperado ocorreu: {e}")
\ No newline at end of file
+            st.error(f"Um erro inesperado ocorreu: {e}")
+
+startup_profile.rendered()
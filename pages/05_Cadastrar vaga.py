@@ -1,7 +1,15 @@
+import startup_profile
+startup_profile.begin(__file__)
 import streamlit as st
-from db_connection import get_collections, create_embedding
+from db_connection import (
+    get_collections, inline_embedding_fields, next_id, get_skill_dictionary,
+    TIPOS_CONTRATACAO, ESTADOS_BRASIL
+)
+from data_cache import bump_data_version
+from schemas import montar_vaga, SchemaError
+from dedup import marcar_duplicatas, configuracao as dedup_configuracao
 from pymongo.errors import PyMongoError
-import datetime
+startup_profile.imports_done()
 
 #------- CONTROLE DE ACESSO -------
 if 'logged_in' not in st.session_state or not st.session_state['logged_in']:
@@ -22,13 +30,6 @@ st.set_page_config(page_title="Cadastro de Vagas", page_icon="🚀", layout="wid
 st.title("🚀 Cadastro de nova vaga")
 st.write("Preencha o formulário abaixo para adicionar uma nova vaga ao banco de dados.")
 
-#Constantes de opções
-TIPOS_CONTRATACAO = ["CLT", "PJ", "Estágio", "Temporário"]
-ESTADOS_BRASIL = [
-    "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA", "MT", "MS", "MG",
-    "PA", "PB", "PR", "PE", "PI", "RJ", "RN", "RS", "RO", "RR", "SC", "SP", "SE", "TO"
-]
-
 #Formulário
 with st.form(key="vaga_form", clear_on_submit=True):
     st.subheader("Informações principais")
@@ -63,9 +64,15 @@ if submitted:
     if tipo_usuario == 'empregador':
         empresa = empresa_usuario
 
-    #Validação
-    if not all([titulo, empresa, tipo_contratacao, skills_input, cidade, estado, descricao]):
-        st.error("⚠️ Por favor, preencha todos os campos obrigatórios.")
+    #Validação e montagem do documento (mesmo esquema da importação em lote)
+    try:
+        nova_vaga_doc, text_to_embed = montar_vaga({
+            "titulo": titulo, "descricao": descricao, "cidade": cidade, "estado": estado,
+            "tipo_contratacao": tipo_contratacao, "salario": salario, "empresa": empresa,
+            "skills": skills_input
+        }, dicionario=get_skill_dictionary())
+    except SchemaError as e:
+        st.error(f"⚠️ {e}")
     else:
         try:
             col_vagas, _, _ = get_collections()
@@ -73,53 +80,45 @@ if submitted:
                 st.error("Não foi possível conectar à coleção de vagas.")
                 st.stop()
 
-            #Lógica para gerar ID sequencial
-            last_doc = col_vagas.find_one(sort=[("id", -1)])
-            novo_id = 1
-            if last_doc and "id" in last_doc:
-                novo_id = int(last_doc["id"]) + 1
-
-            #Converte skills de string para lista
-            skills_list = [s.strip() for s in skills_input.split('\n') if s.strip()]
-
-            #--------- GERAÇÃO DE EMBEDDING ---------
-            embedding_to_save = []
-            st.info("Gerando embedding para a vaga...")
-            text_to_embed = f"Título: {titulo}. Descrição: {descricao}. Skills: {', '.join(skills_list)}"
-            embedding = create_embedding(text_to_embed)
-
-            if embedding:
-                embedding_to_save = embedding
-                st.success("✨ Embedding gerado com sucesso!")
-            else:
-                st.warning("⚠️ Cota do Google AI Studio excedida. O registro foi salvo no banco sem embedding.")
-            #----------------------------------------
-
-            #Montar o documento para o MongoDB
+            #ID sequencial atômico (coleção counters)
+            novo_id = next_id("vagas")
+
+            #Texto vetorizado na hora (provedor local) ou pelo worker em segundo plano (Gemini)
             nova_vaga_doc = {
                 "id": novo_id,
-                "titulo": titulo,
-                "descricao": descricao,
-                "cidade": cidade,
-                "estado": estado.upper(),
-                "tipo_contratacao": tipo_contratacao,
-                "salario": salario,
-                "empresa": empresa,
-                "skills": skills_list,
-                "embedding": embedding_to_save, #Salva o vetor ou lista vazia
-                "data_cadastro": datetime.datetime.now(datetime.timezone.utc)
+                **nova_vaga_doc,
+                **inline_embedding_fields(text_to_embed)  #Com o Gemini: embedding_pendente, o worker preenche
             }
 
-            #Inserir no banco
+            #Repostagem? Compara com as vagas já publicadas (MinHash/LSH, consulta indexada)
+            repostagens = []
+            try:
+                limiar, mesma_empresa = dedup_configuracao()
+                repostagens = marcar_duplicatas(col_vagas, [nova_vaga_doc], limiar, mesma_empresa)
+            except PyMongoError as e:
+                #Sem a verificação a vaga entra como original; `python -m dedup --backfill --marcar` revisa depois
+                print(f"⚠️ Erro na verificação de repostagem: {e}")
+
+            #Inserir no banco: um único insert grava a vaga e, com o Gemini, já a põe na fila de embeddings
             result = col_vagas.insert_one(nova_vaga_doc)
 
-            st.success(f"🎉 Vaga '{titulo}' (ID: {novo_id}) cadastrada com sucesso!")
+            if repostagens:
+                _, original = repostagens[0]
+                st.warning(
+                    f"🔁 Esta vaga é quase idêntica à vaga {original['id']} ('{original['titulo']}', "
+                    f"{nova_vaga_doc['similaridade_duplicata']:.0%} de similaridade). Ela foi registrada como "
+                    "repostagem: não entra no total de vagas e fica oculta nas listagens."
+                )
+            st.success(f"🎉 Vaga '{nova_vaga_doc['titulo']}' (ID: {novo_id}) cadastrada com sucesso!")
             st.info(f"ID do MongoDB: `{result.inserted_id}`")
             st.balloons()
 
-            st.cache_data.clear()
+            #Invalida só os caches de vagas (mural geral e visão desta empresa)
+            bump_data_version("vagas", empresa)
 
         except PyMongoError as e:
             st.error(f"Erro ao salvar no MongoDB: {e}")
         except Exception as e:
-            st.error(f"Um erro inesperado ocorreu: {e}")
\ No newline at end of file
+            st.error(f"Um erro inesperado ocorreu: {e}")
+
+startup_profile.rendered()
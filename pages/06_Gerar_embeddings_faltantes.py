@@ -1,8 +1,13 @@
+import startup_profile
+startup_profile.begin(__file__)
 import time
 import datetime
 import streamlit as st
 import traceback  #Para ver o erro real
-from db_connection import get_collections, create_embedding
+from db_connection import get_collections, get_config, get_embedding_provider
+from backfill import CAMPOS_TEXTO, buscar_pendentes, processar_lote, tempo_de_espera
+from rate_limiter import RateLimiter
+startup_profile.imports_done()
 
 #--- CONTROLE DE ACESSO (ADMIN ONLY) ---
 if 'logged_in' not in st.session_state or not st.session_state['logged_in']:
@@ -47,63 +52,54 @@ def log_ui(msg, tipo="info"):
     log_area.code("\n".join(logs_history[-10:]), language="text")
 
 
-def processar_colecao_visual(nome, collection, campos_texto):
+def processar_colecao_visual(nome, collection, campos_texto, limiter, batch_size, modelo=None):
     st.subheader(f"📂 Processando coleção: {nome}")
 
-    #CORREÇÃO AQUI ---
-    #Busca pendentes: onde não existe OU onde é uma lista vazia []
-    query = {"$or": [{"embedding": {"$exists": False}}, {"embedding": []}]}
-
-    pendentes = list(collection.find(query).sort("id", 1))
+    #Busca pendentes (só o necessário para montar o texto; nunca trazemos vetores)
+    pendentes = buscar_pendentes(collection, campos_texto, modelo)
     total = len(pendentes)
 
     if total == 0:
         st.success(f"✅ Coleção {nome} já está 100% atualizada!")
-        return
+        return 0
 
     #Barra de progresso
     progress_bar = st.progress(0, text=f"Iniciando {total} registros...")
     status_text = st.empty()
+    throughput_text = st.empty()
+
+    inicio = time.monotonic()
+    processados = 0
 
-    for i, doc in enumerate(pendentes):
-        doc_id = doc.get('id', 'N/A')
-        titulo = doc.get('titulo') or doc.get('nome') or 'Sem Título'
+    for start in range(0, total, batch_size):
+        lote = pendentes[start:start + batch_size]
+        primeiro_id = lote[0].get('id', 'N/A')
+        ultimo_id = lote[-1].get('id', 'N/A')
 
-        status_msg = f"Processando item {i + 1}/{total}: ID {doc_id} - {titulo}"
+        status_msg = f"Processando itens {start + 1}-{start + len(lote)}/{total} (IDs {primeiro_id} a {ultimo_id})"
         status_text.text(status_msg)
-        progress_bar.progress((i) / total, text=status_msg)
-
-        #Montar texto
-        partes = []
-        for campo in campos_texto:
-            valor = doc.get(campo, "")
-            if isinstance(valor, list):
-                valor = ", ".join(valor)
-            partes.append(f"{str(campo).capitalize()}: {valor}")
-        texto_final = ". ".join(partes)
-
-        #Retry loop
+        progress_bar.progress(start / total, text=status_msg)
+
+        #Retry loop (o limitador já segura o ritmo; aqui tratamos só falhas da API)
         tentativas = 0
         while True:
-            vector = create_embedding(texto_final)
+            salvos = processar_lote(collection, lote, campos_texto, limiter)
+
+            if salvos is not None:
+                #SUCESSO: uma única escrita em lote para todo o batch
+                processados += salvos
 
-            if vector:
-                #SUCESSO
-                collection.update_one({"_id": doc["_id"]}, {"$set": {"embedding": vector}})
-                log_ui(f"ID {doc_id}: Salvo com sucesso.", "success")
-                time.sleep(10)  #Pausa de segurança para não exceder limite de requests/min (Free Tier)
+                decorrido = time.monotonic() - inicio
+                docs_por_segundo = processados / decorrido if decorrido > 0 else 0.0
+                throughput_text.text(f"⚡ {processados}/{total} documentos | {docs_por_segundo:.2f} docs/s")
+                log_ui(f"IDs {primeiro_id} a {ultimo_id}: {len(lote)} salvos com sucesso.", "success")
                 break
             else:
                 #FALHA
                 tentativas += 1
-                if tentativas == 1:
-                    wait = 60
-                elif tentativas <= 3:
-                    wait = 300
-                else:
-                    wait = 3600
+                wait = tempo_de_espera(tentativas)
 
-                log_ui(f"Falha ao gerar ID {doc_id}. Tentativa {tentativas}. Esperando {wait}s...", "warning")
+                log_ui(f"Falha no lote {primeiro_id}-{ultimo_id}. Tentativa {tentativas}. Esperando {wait}s...", "warning")
 
                 #Countdown visual
                 for s in range(wait, 0, -1):
@@ -112,13 +108,40 @@ def processar_colecao_visual(nome, collection, campos_texto):
 
                 status_text.text("🔄 Tentando novamente...")
 
+    decorrido = time.monotonic() - inicio
     progress_bar.progress(1.0, text="Concluído!")
-    st.success(f"Coleção {nome} finalizada!")
+    st.success(
+        f"Coleção {nome} finalizada! {processados} documentos em {decorrido:.1f}s "
+        f"({processados / decorrido if decorrido > 0 else 0.0:.2f} docs/s)."
+    )
+    return processados
 
 
 def main():
+    provider = get_embedding_provider()
+    st.caption(f"Provedor de embeddings: `{provider.name}`" + ("" if provider.remote else " (local, sem cota)"))
+
+    #Configuração do limitador (padrões vêm do secrets.toml / variáveis de ambiente)
+    with st.sidebar:
+        st.header("Cota da API" if provider.remote else "Lotes")
+        batch_size = st.number_input("Textos por requisição", min_value=1, max_value=provider.max_batch,
+                                     value=min(int(get_config("EMBEDDING_BATCH_SIZE", provider.max_batch)), provider.max_batch))
+        #Provedores locais não consomem cota: o limitador só vale para o Gemini
+        rpm = st.number_input("Requisições por minuto", min_value=1, disabled=not provider.remote,
+                              value=int(get_config("EMBEDDING_RPM", 100)))
+        tpm = st.number_input("Tokens por minuto", min_value=1000, step=1000, disabled=not provider.remote,
+                              value=int(get_config("EMBEDDING_TPM", 1_000_000)))
+        if provider.remote:
+            #A cota do processo (EMBEDDING_RPM / EMBEDDING_TPM) vale sempre; os campos acima só a reduzem
+            st.caption("A cota é compartilhada com as buscas e os cadastros, que têm prioridade sobre o backfill.")
+        regerar = st.checkbox("Regerar vetores de outro modelo",
+                              help="Inclui documentos vetorizados por um provedor diferente do atual.")
+    modelo = provider.name if regerar else None
+
     if st.button("▶️ Iniciar processamento"):
         try:
+            limiter = RateLimiter(requests_per_minute=rpm, tokens_per_minute=tpm)
+
             col_vagas, col_curriculos, _ = get_collections()
 
             #Trocamos "if not col_vagas:" por "if col_vagas is None:"
@@ -127,12 +150,10 @@ def main():
                 return
 
             #Vagas
-            campos_vaga = ['titulo', 'descricao', 'skills', 'empresa', 'tipo_contratacao']
-            processar_colecao_visual("VAGAS", col_vagas, campos_vaga)
+            processar_colecao_visual("VAGAS", col_vagas, CAMPOS_TEXTO["vagas"], limiter, batch_size, modelo)
 
             #Currículos
-            campos_curriculo = ['formacao', 'experiencia', 'resumo', 'skills', 'idiomas']
-            processar_colecao_visual("CURRÍCULOS", col_curriculos, campos_curriculo)
+            processar_colecao_visual("CURRÍCULOS", col_curriculos, CAMPOS_TEXTO["curriculos"], limiter, batch_size, modelo)
 
             st.balloons()
             st.success("Progresso completo. Todos os dados agora possuem embeddings.")
@@ -142,4 +163,6 @@ def main():
             st.code(traceback.format_exc())  #Mostra o erro real na tela
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+
+startup_profile.rendered()
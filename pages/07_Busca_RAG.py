@@ -1,5 +1,8 @@
+import startup_profile
+startup_profile.begin(__file__)
 import streamlit as st
-from db_connection import search_rag
+from db_connection import search_rag, search_rag_multi, TIPOS_CONTRATACAO, ESTADOS_BRASIL
+startup_profile.imports_done()
 
 #--- CONTROLE DE ACESSO (ADMIN ONLY) ---
 if 'logged_in' not in st.session_state or not st.session_state['logged_in']:
@@ -22,12 +25,14 @@ O sistema entenderá o **contexto** e o **significado** da sua busca (busca sem
 #--- Radio Button ---
 tipo_busca = st.radio(
     "O que você deseja buscar?",
-    ["Vagas", "Currículos"],
+    ["Vagas", "Currículos", "Tudo"],
     horizontal=True,
-    help="Selecione 'Vagas' se você é um candidato, ou 'Currículos' se você é uma empresa."
+    help="Selecione 'Vagas' se você é um candidato, 'Currículos' se você é uma empresa, "
+         "ou 'Tudo' para buscar nas duas bases ao mesmo tempo."
 )
 
-target_collection = "vagas" if tipo_busca == "Vagas" else "curriculos"
+TARGETS_POR_TIPO = {"Vagas": ["vagas"], "Currículos": ["curriculos"], "Tudo": ["vagas", "curriculos"]}
+targets = TARGETS_POR_TIPO[tipo_busca]
 
 #--- Campo de busca ---
 user_query = st.text_input(
@@ -37,33 +42,85 @@ user_query = st.text_input(
                 else "Ex: Vagas para desenvolvedor junior home office com foco em frontend."
 )
 
+#--- Filtros estruturados (aplicados dentro da busca vetorial) ---
+filtros = None
+if "vagas" in targets:
+    with st.expander("🎯 Filtros de vagas (opcional)"):
+        col_f1, col_f2, col_f3 = st.columns(3)
+        with col_f1:
+            estados = st.multiselect("Estado (UF)", options=ESTADOS_BRASIL)
+            cidade = st.text_input("Cidade", placeholder="Ex: São Paulo")
+        with col_f2:
+            tipos = st.multiselect("Tipo de contratação", options=TIPOS_CONTRATACAO)
+            empresa = st.text_input("Empresa", placeholder="Ex: Microsoft Brasil")
+        with col_f3:
+            salario_min = st.number_input("Salário mínimo (R$)", min_value=0.0, step=500.0, value=0.0)
+            salario_max = st.number_input("Salário máximo (R$)", min_value=0.0, step=500.0, value=0.0,
+                                          help="Deixe 0 para não limitar.")
+
+    filtros = {
+        "estado": estados,
+        "cidade": cidade.strip(),
+        "tipo_contratacao": tipos,
+        "empresa": empresa.strip(),
+        "salario_min": salario_min or None,
+        "salario_max": salario_max or None
+    }
+
 st.markdown("---")
 
+
+def render_vaga(doc, score_percent):
+    #Layout para Vagas
+    with st.expander(f"{doc.get('titulo', 'Sem título')} | {doc.get('empresa', 'N/A')} ({score_percent} match)"):
+        st.markdown(f"**Descrição:** {doc.get('descricao')}")
+        st.markdown(f"**Skills:** {', '.join(doc.get('skills', []))}")
+        if doc.get('salario'):
+            st.markdown(f"**Salário:** R$ {doc.get('salario'):.2f}")
+
+
+def render_curriculo(doc, score_percent):
+    #Layout para Currículos
+    with st.expander(f"{doc.get('nome', 'Candidato')} | {doc.get('formacao', 'N/A')} ({score_percent} match)"):
+        st.markdown(f"**Resumo:** {doc.get('resumo')}")
+        st.markdown(f"**Experiência:** {doc.get('experiencia')}")
+        st.markdown(f"**Skills:** {', '.join(doc.get('skills', []))}")
+
+
+def render_resultados(target, resultados):
+    render = render_vaga if target == "vagas" else render_curriculo
+    for doc in resultados:
+        score = doc.get('score', 0)
+        render(doc, f"{score * 100:.1f}%")
+
+
 if user_query:
     with st.spinner(f"A IA está analisando sua busca na base de {tipo_busca}..."):
-        resultados = search_rag(user_query, target_collection, limit=6)
+        if len(targets) == 1:
+            por_colecao = {targets[0]: search_rag(user_query, targets[0], limit=6, filtros=filtros)}
+        else:
+            #Embedding único + buscas em paralelo (latência = a mais lenta, não a soma)
+            por_colecao = search_rag_multi(user_query, targets, limit=6, filtros=filtros)
 
-    if not resultados:
+    total = sum(len(r) for r in por_colecao.values() if r)
+    if total == 0:
         st.warning("Nenhum resultado relevante encontrado para essa descrição.")
     else:
-        st.success(f"Encontramos {len(resultados)} correspondências baseadas no significado!")
-        
+        st.success(f"Encontramos {total} correspondências baseadas no significado!")
+
         #Exibição dos cards
-        for doc in resultados:
-            score = doc.get('score', 0)
-            score_percent = f"{score * 100:.1f}%"
-            
-            if target_collection == "vagas":
-                #Layout para Vagas
-                with st.expander(f"{doc.get('titulo', 'Sem título')} | {doc.get('empresa', 'N/A')} ({score_percent} match)"):
-                    st.markdown(f"**Descrição:** {doc.get('descricao')}")
-                    st.markdown(f"**Skills:** {', '.join(doc.get('skills', []))}")
-                    if doc.get('salario'):
-                        st.markdown(f"**Salário:** R$ {doc.get('salario'):.2f}")
-                        
-            else:
-                #Layout para Currículos
-                with st.expander(f"{doc.get('nome', 'Candidato')} | {doc.get('formacao', 'N/A')} ({score_percent} match)"):
-                    st.markdown(f"**Resumo:** {doc.get('resumo')}")
-                    st.markdown(f"**Experiência:** {doc.get('experiencia')}")
-                    st.markdown(f"**Skills:** {', '.join(doc.get('skills', []))}")
\ No newline at end of file
+        if len(targets) == 1:
+            render_resultados(targets[0], por_colecao[targets[0]])
+        else:
+            col_vagas, col_curriculos = st.columns(2)
+            for target, coluna, titulo in [("vagas", col_vagas, "💼 Vagas"), ("curriculos", col_curriculos, "👥 Currículos")]:
+                with coluna:
+                    st.subheader(titulo)
+                    if por_colecao[target] is None:
+                        st.warning("A busca nesta base não respondeu a tempo. Mostrando resultados parciais.")
+                    elif not por_colecao[target]:
+                        st.info("Nenhum resultado nesta base.")
+                    else:
+                        render_resultados(target, por_colecao[target])
+
+startup_profile.rendered()
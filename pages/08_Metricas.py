@@ -0,0 +1,133 @@
+import startup_profile
+startup_profile.begin(__file__)
+import json
+import streamlit as st
+import pandas as pd
+import metrics
+from db_connection import get_embedding_cache, get_embedding_scheduler, get_connection_manager, metrics_gauges
+from data_cache import cache_stats
+startup_profile.imports_done()
+
+#--- CONTROLE DE ACESSO (ADMIN ONLY) ---
+if 'logged_in' not in st.session_state or not st.session_state['logged_in']:
+    st.warning("Faça login.")
+    st.stop()
+
+if st.session_state['tipo_usuario'] != 'admin':
+    st.error("⛔ ACESSO RESTRITO: apenas ADMINISTRADORES podem acessar ferramentas de sistema.")
+    st.stop()
+#---------------------------------------
+
+st.set_page_config(page_title="Métricas", page_icon="📈", layout="wide")
+
+st.title("📈 Métricas de desempenho")
+st.caption("Números deste processo do Streamlit, desde o último restart (ou desde o último 'Zerar').")
+
+with st.sidebar:
+    if st.button("🔄 Atualizar"):
+        st.rerun()
+    if st.button("🗑️ Zerar métricas"):
+        metrics.reset()
+        st.rerun()
+    if st.button("🔌 Reconectar ao MongoDB"):
+        get_connection_manager().reset()
+        st.rerun()
+
+dados = metrics.snapshot()
+histogramas = pd.DataFrame(dados["histogramas"])
+colunas_tempo = ["count", "media_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+#--- Operações (decorators @timed / timer) ---
+st.subheader("⏱️ Latência por operação")
+if not histogramas.empty and (histogramas["nome"] == "latency_seconds").any():
+    ops = histogramas[histogramas["nome"] == "latency_seconds"][["op"] + colunas_tempo]
+    st.dataframe(ops.sort_values("p95_ms", ascending=False), hide_index=True, use_container_width=True)
+else:
+    st.info("Nenhuma operação medida ainda.")
+
+#--- Inicialização (STARTUP_PROFILE=1) ---
+if startup_profile.ATIVO:
+    st.subheader("🚀 Cold start por página")
+    if startup_profile.resultados:
+        st.dataframe(pd.DataFrame(startup_profile.resultados), hide_index=True, use_container_width=True)
+    else:
+        st.info("Nenhuma página terminou a primeira renderização ainda.")
+
+#--- MongoDB (CommandListener) ---
+st.subheader("🍃 Comandos do MongoDB")
+if not histogramas.empty and (histogramas["nome"] == "mongo_command_seconds").any():
+    comandos = histogramas[histogramas["nome"] == "mongo_command_seconds"][["command", "collection"] + colunas_tempo]
+
+    #Bytes retornados por (comando, coleção)
+    contadores = pd.DataFrame(dados["contadores"])
+    if not contadores.empty and (contadores["nome"] == "mongo_reply_bytes_total").any():
+        bytes_df = contadores[contadores["nome"] == "mongo_reply_bytes_total"][["command", "collection", "valor"]]
+        comandos = comandos.merge(bytes_df.rename(columns={"valor": "bytes_retornados"}),
+                                  on=["command", "collection"], how="left")
+        comandos["kb_por_comando"] = comandos["bytes_retornados"] / comandos["count"] / 1024
+    st.dataframe(comandos.sort_values("p95_ms", ascending=False), hide_index=True, use_container_width=True)
+else:
+    st.info("Nenhum comando registrado ainda.")
+
+#--- Conexão / pool ---
+st.subheader("🔌 Conexão e pool")
+conexao = get_connection_manager().status()
+if conexao["ultimo_erro"]:
+    st.error(f"Último erro de conexão: {conexao['ultimo_erro']}")
+pool = conexao["pool"]
+col_abertas, col_uso, col_checkouts, col_falhos = st.columns(4)
+col_abertas.metric("Conexões abertas", pool["abertas"])
+col_uso.metric("Em uso", pool["em_uso"])
+col_checkouts.metric("Checkouts", pool["checkouts"])
+col_falhos.metric("Checkouts falhos", pool["checkouts_falhos"])
+if conexao["servidores"]:
+    st.dataframe(pd.DataFrame(conexao["servidores"]), hide_index=True, use_container_width=True)
+with st.expander("Opções do cliente"):
+    st.json({**conexao["opcoes"], "read_preference_leitura": conexao["read_preference_leitura"],
+             "pools_limpos": pool["pools_limpos"], "conexoes_criadas": pool["criadas"],
+             "conexoes_fechadas": pool["fechadas"]})
+
+st.subheader("🐢 Consultas lentas")
+if dados["consultas_lentas"]:
+    lentas = pd.DataFrame(dados["consultas_lentas"]).iloc[::-1]
+    #Formato do filtro (valores trocados por "?") como texto para a tabela
+    lentas["formato"] = lentas["formato"].apply(lambda f: json.dumps(f, ensure_ascii=False))
+    st.dataframe(lentas, hide_index=True, use_container_width=True)
+else:
+    st.success("Nenhuma consulta acima do limite (METRICS_SLOW_MS).")
+
+#--- Caches ---
+st.subheader("🗃️ Caches")
+col_dados, col_emb = st.columns(2)
+with col_dados:
+    st.markdown("**Listagens (versioned_cache)**")
+    stats = cache_stats()
+    if stats:
+        st.dataframe(pd.DataFrame.from_dict(stats, orient="index"), use_container_width=True)
+    else:
+        st.caption("Nenhum loader chamado ainda.")
+with col_emb:
+    st.markdown("**Embeddings**")
+    st.json(get_embedding_cache().snapshot())
+
+#--- Fila de embeddings ---
+st.subheader("🚦 Fila de embeddings")
+fila = get_embedding_scheduler().snapshot()
+col_int, col_bg, col_voo, col_coal = st.columns(4)
+col_int.metric("Na fila (interativa)", fila["fila"]["interativa"])
+col_bg.metric("Na fila (background)", fila["fila"]["background"])
+col_voo.metric("Em voo", fila["em_voo"])
+col_coal.metric("Chamadas poupadas", fila["coalescidos"], help="Textos idênticos resolvidos por uma chamada já em voo.")
+if not histogramas.empty and (histogramas["nome"] == "embedding_espera_seconds").any():
+    #Espera de cada pedido: fila + cota, do enfileiramento até a chamada ao provedor
+    espera = histogramas[histogramas["nome"] == "embedding_espera_seconds"][["prioridade"] + colunas_tempo]
+    st.dataframe(espera, hide_index=True, use_container_width=True)
+
+#--- Exportação ---
+st.subheader("📤 Prometheus")
+texto = metrics.prometheus_text(metrics_gauges())
+st.download_button("Baixar métricas (.txt)", texto, file_name="metrics.txt", mime="text/plain")
+with st.expander("Ver no formato texto"):
+    st.code(texto, language="text")
+
+startup_profile.rendered()
@@ -0,0 +1,57 @@
+"""
+Estado da paginação por keyset das páginas de listagem (02 e 03).
+
+O st.session_state guarda a pilha de cursores das páginas visitadas: o topo é o cursor da
+página atual, "Próxima" empilha o cursor devolvido pela consulta e "Anterior" desempilha.
+Mudar os filtros (ou o tamanho da página) volta para a primeira página.
+"""
+import streamlit as st
+from db_connection import get_config
+from listings import TAMANHO_PAGINA
+
+TAMANHOS_PAGINA = (10, 20, 50, 100)
+
+
+def tamanho_pagina_padrao():
+    """Tamanho de página configurado (LISTAGEM_TAMANHO_PAGINA), limitado a 100."""
+    return max(1, min(int(get_config("LISTAGEM_TAMANHO_PAGINA", TAMANHO_PAGINA)), 100))
+
+
+def seletor_tamanho(chave):
+    """Selectbox (sidebar) com o tamanho da página."""
+    padrao = tamanho_pagina_padrao()
+    opcoes = sorted(set(TAMANHOS_PAGINA) | {padrao})
+    return st.sidebar.selectbox("📄 Itens por página", opcoes, index=opcoes.index(padrao), key=f"{chave}_tamanho")
+
+
+def cursor_atual(chave, filtros):
+    """Cursor da página atual; `filtros` (tupla) diferente do anterior volta para a primeira página."""
+    estado = st.session_state.get(chave)
+    if estado is None or estado["filtros"] != filtros:
+        estado = st.session_state[chave] = {"filtros": filtros, "cursores": [None]}
+    return estado["cursores"][-1]
+
+
+def controles(chave, proximo):
+    """Botões Anterior/Próxima e o número da página. `proximo` é o cursor devolvido pela consulta."""
+    estado = st.session_state[chave]
+    col_anterior, col_info, col_proxima = st.columns([1, 2, 1])
+    with col_anterior:
+        if st.button("⬅️ Anterior", key=f"{chave}_anterior", disabled=len(estado["cursores"]) == 1):
+            estado["cursores"].pop()
+            st.rerun()
+    with col_info:
+        st.caption(f"Página {len(estado['cursores'])}")
+    with col_proxima:
+        if st.button("Próxima ➡️", key=f"{chave}_proxima", disabled=proximo is None):
+            estado["cursores"].append(proximo)
+            st.rerun()
+
+
+def chave_detalhe(prefixo, doc_id):
+    return f"{prefixo}_detalhe_{doc_id}"
+
+
+def abertos(prefixo, itens):
+    """_ids dos cards com o toggle de detalhes ligado (lido antes de desenhar, para uma consulta só)."""
+    return tuple(item["_id"] for item in itens if st.session_state.get(chave_detalhe(prefixo, item["_id"])))
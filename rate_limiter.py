@@ -0,0 +1,65 @@
+import time
+import threading
+
+
+def estimate_tokens(text):
+    """
+    Estimativa grosseira de tokens (~4 caracteres por token), suficiente para respeitar a cota.
+    """
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """
+    Balde de fichas clássico: enche a `rate_per_minute` fichas/min até `capacity`.
+    O saldo pode ficar negativo (reserva), então cada chamador sabe exatamente quanto esperar
+    e pedidos maiores que a capacidade não travam para sempre.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate_per_second = float(rate_per_minute) / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate_per_second)
+        self._last = now
+
+    def reserve(self, amount=1):
+        """Debita `amount` fichas e retorna quantos segundos o chamador deve esperar."""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate_per_second
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class RateLimiter:
+    """
+    Limita chamadas à API por requisições/min e tokens/min ao mesmo tempo.
+    Com tokens_per_minute=None, só o limite de requisições é aplicado.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.total_wait = 0.0
+
+    def acquire(self, tokens=0):
+        """Bloqueia até a chamada caber na cota. Retorna o tempo esperado (s)."""
+        wait = self.requests.reserve(1)
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            time.sleep(wait)
+            self.total_wait += wait
+        return wait
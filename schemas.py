@@ -0,0 +1,158 @@
+"""
+Esquemas dos documentos de vagas e currículos, compartilhados pelos formulários (páginas 04/05)
+e pela importação em lote (bulk_import.py): campos obrigatórios, normalização das listas e dos
+números e o texto que é vetorizado.
+
+Os builders não atribuem `id` nem os campos de embedding: quem grava decide como
+(next_id ou IdAllocator.reserve; inline_embedding_fields ou inline_embedding_fields_batch). Com o
+vocabulário de skills (get_skill_dictionary), as skills são gravadas pelo nome canônico, com
+`skill_ids` e `skills_atualizado_em` (marca d'água do índice de skills, no mesmo insert).
+"""
+import re
+import datetime
+from db_connection import TIPOS_CONTRATACAO, ESTADOS_BRASIL
+
+CAMPOS_OBRIGATORIOS_VAGA = ("titulo", "empresa", "tipo_contratacao", "skills", "cidade", "estado", "descricao")
+CAMPOS_OBRIGATORIOS_CURRICULO = ("nome", "email", "formacao", "experiencia", "skills", "idiomas", "resumo")
+
+EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$')
+
+
+class SchemaError(ValueError):
+    """Registro inválido (a mensagem diz qual campo)."""
+
+
+def texto(valor):
+    return "" if valor is None else str(valor).strip()
+
+
+def lista(valor):
+    """Lista a partir de uma lista ou de texto com um item por linha (ou separado por ';', como no CSV)."""
+    if valor is None:
+        return []
+    itens = valor if isinstance(valor, (list, tuple)) else str(valor).replace(";", "\n").split("\n")
+    return [texto(item) for item in itens if texto(item)]
+
+
+#Separador de milhar sem casas decimais: "5.000", "1.250.000" (ponto) e "5,000" (vírgula, ambíguo)
+_MILHAR_PONTO = re.compile(r"^\d{1,3}(\.\d{3})+$")
+_MILHAR_VIRGULA = re.compile(r"^\d{1,3}(,\d{3})+$")
+#Com os dois separadores: "5.000,50" (brasileiro) ou "5,000.50" (americano)
+_BRASILEIRO = re.compile(r"^\d{1,3}(\.\d{3})+,\d+$")
+_AMERICANO = re.compile(r"^\d{1,3}(,\d{3})+\.\d+$")
+
+
+def numero(valor, campo):
+    """
+    Float a partir de número ou texto; vazio vira 0. Aceita:
+    "5000", "5000.50", "5000,50", "5.000" e "R$ 12.500" (ponto de milhar), "5.000,50", "5,000.50".
+    "5,000" é ambíguo (5 ou 5 mil) e é rejeitado, assim como separadores fora do lugar ("5.00,0").
+    """
+    if valor is None or valor == "":
+        return 0.0
+    original = valor
+    if isinstance(valor, str):
+        valor = valor.replace("R$", "").replace("\u00a0", "").replace(" ", "")
+        if _MILHAR_PONTO.match(valor):
+            valor = valor.replace(".", "")
+        elif _MILHAR_VIRGULA.match(valor):
+            raise SchemaError(f"{campo} ambíguo: {original!r} (use 5000, 5.000 ou 5.000,00).")
+        elif "," in valor and "." in valor:
+            if _BRASILEIRO.match(valor):
+                valor = valor.replace(".", "").replace(",", ".")
+            elif _AMERICANO.match(valor):
+                valor = valor.replace(",", "")
+            else:
+                raise SchemaError(f"{campo} inválido: {original!r}.")
+        elif "," in valor:
+            valor = valor.replace(",", ".")
+    try:
+        resultado = float(valor)
+    except (TypeError, ValueError):
+        raise SchemaError(f"{campo} inválido: {original!r}.")
+    if resultado != resultado or resultado < 0:
+        raise SchemaError(f"{campo} inválido: {original!r}.")
+    return resultado
+
+
+def _exigir(campos, obrigatorios):
+    faltando = [campo for campo in obrigatorios if not campos.get(campo)]
+    if faltando:
+        raise SchemaError(f"Campos obrigatórios não preenchidos: {', '.join(faltando)}.")
+
+
+def _normalizar_skills(doc, dicionario):
+    if dicionario is not None:
+        doc["skills"], doc["skill_ids"] = dicionario.normalizar(doc["skills"])
+
+
+def texto_vaga(doc):
+    """Texto vetorizado de uma vaga."""
+    return f"Título: {doc['titulo']}. Descrição: {doc['descricao']}. Skills: {', '.join(doc['skills'])}"
+
+
+def texto_curriculo(doc):
+    """Texto vetorizado de um currículo."""
+    return (
+        f"Formação: {doc['formacao']}. Experiência: {doc['experiencia']}. "
+        f"Resumo: {doc['resumo']}. Skills: {', '.join(doc['skills'])}. "
+        f"Idiomas: {', '.join(doc['idiomas'])}."
+    )
+
+
+def montar_vaga(dados, empresa=None, agora=None, dicionario=None):
+    """
+    Documento de vaga a partir dos campos do formulário ou de uma linha importada.
+    empresa, se passada, substitui a do registro (empregador só cadastra vagas da própria empresa).
+    dicionario (SkillDictionary) normaliza as skills e preenche skill_ids.
+    Retorna (documento sem id/embedding, texto a vetorizar). Levanta SchemaError.
+    """
+    doc = {
+        "titulo": texto(dados.get("titulo")),
+        "descricao": texto(dados.get("descricao")),
+        "cidade": texto(dados.get("cidade")),
+        "estado": texto(dados.get("estado")).upper(),
+        "tipo_contratacao": texto(dados.get("tipo_contratacao")),
+        "salario": numero(dados.get("salario"), "Salário"),
+        "empresa": texto(empresa or dados.get("empresa")),
+        "skills": lista(dados.get("skills"))
+    }
+    _exigir(doc, CAMPOS_OBRIGATORIOS_VAGA)
+    if doc["estado"] not in ESTADOS_BRASIL:
+        raise SchemaError(f"Estado (UF) inválido: {doc['estado']!r}.")
+    if doc["tipo_contratacao"] not in TIPOS_CONTRATACAO:
+        raise SchemaError(f"Tipo de contratação inválido: {doc['tipo_contratacao']!r} "
+                          f"(use {', '.join(TIPOS_CONTRATACAO)}).")
+    _normalizar_skills(doc, dicionario)
+    doc["data_cadastro"] = agora or datetime.datetime.now(datetime.timezone.utc)
+    if "skill_ids" in doc:
+        doc["skills_atualizado_em"] = doc["data_cadastro"]  #Marca d'água do SkillIndex, no mesmo insert
+    return doc, texto_vaga(doc)
+
+
+def montar_curriculo(dados, agora=None, dicionario=None):
+    """
+    Documento de currículo a partir dos campos do formulário ou de uma linha importada.
+    dicionario (SkillDictionary) normaliza as skills e preenche skill_ids.
+    Retorna (documento sem id/embedding, texto a vetorizar). Levanta SchemaError.
+    """
+    doc = {
+        "nome": texto(dados.get("nome")),
+        "email": texto(dados.get("email")),
+        "telefone": texto(dados.get("telefone")),
+        "formacao": texto(dados.get("formacao")),
+        "experiencia": texto(dados.get("experiencia")),
+        "skills": lista(dados.get("skills")),
+        "idiomas": lista(dados.get("idiomas")),
+        "certificacoes": lista(dados.get("certificacoes")),
+        "resumo": texto(dados.get("resumo")),
+        "empresas_previas": lista(dados.get("empresas_previas"))
+    }
+    _exigir(doc, CAMPOS_OBRIGATORIOS_CURRICULO)
+    if not EMAIL_REGEX.match(doc["email"]):
+        raise SchemaError(f"Email inválido: {doc['email']!r}.")
+    _normalizar_skills(doc, dicionario)
+    doc["data_cadastro"] = agora or datetime.datetime.now(datetime.timezone.utc)
+    if "skill_ids" in doc:
+        doc["skills_atualizado_em"] = doc["data_cadastro"]  #Marca d'água do SkillIndex, no mesmo insert
+    return doc, texto_curriculo(doc)
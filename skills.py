@@ -0,0 +1,414 @@
+"""
+Vocabulário canônico de skills e índice de bitsets para o ranking de compatibilidade.
+
+Vocabulário (coleção `skills`): cada skill tem um id inteiro estável, o nome de exibição e os
+aliases aceitos, guardados como chaves normalizadas (sem acentos, minúsculas, só letras, dígitos,
+'+' e '#': "Node.js", "node js" e "NodeJS" viram "nodejs"). Na gravação (páginas 04/05 e
+bulk_import) as skills digitadas são trocadas pelo nome canônico e o documento ganha `skill_ids`
+(índice multikey). Uma skill fora do vocabulário é registrada na hora com o texto digitado;
+aliases novos para uma skill existente:
+
+    python -m skills --alias "py=Python" --alias "pyspark=Spark"
+    python -m skills --backfill            # normaliza as skills e grava skill_ids dos documentos antigos
+
+Índice (SkillIndex): uma matriz de bits (linhas = currículos, colunas = palavras de 64 bits dos
+ids de skill) em memória, atualizada de forma incremental como o índice vetorial local. A
+sobreposição com as skills de uma vaga é um AND + popcount só nas palavras que a vaga usa, para
+todos os currículos de uma vez.
+"""
+import re
+import time
+import argparse
+import threading
+import unicodedata
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError, BulkWriteError
+from vector_index import ATRASO_MARCA_DAGUA
+
+#Nome canônico -> aliases (além do próprio nome). Semeia a coleção `skills`.
+VOCABULARIO = {
+    "Python": ["py", "python3", "python 3"],
+    "Java": ["java se", "java ee", "jdk"],
+    "JavaScript": ["js", "ecmascript", "es6", "vanilla js"],
+    "TypeScript": ["ts"],
+    "C": ["linguagem c"],
+    "C++": ["cpp", "cplusplus"],
+    "C#": ["csharp", "c sharp"],
+    ".NET": ["dotnet", "net core", ".net core", "asp.net", "aspnet core"],
+    "Go": ["golang"],
+    "Rust": [],
+    "PHP": [],
+    "Ruby": ["ruby on rails", "rails"],
+    "Kotlin": [],
+    "Swift": [],
+    "R": ["linguagem r", "rstudio"],
+    "SQL": ["t-sql", "tsql", "pl/sql", "plsql", "ansi sql"],
+    "MongoDB": ["mongo", "mongo db"],
+    "PostgreSQL": ["postgres", "postgre", "psql"],
+    "MySQL": ["mariadb"],
+    "Oracle": ["oracle db", "oracle database"],
+    "SQL Server": ["mssql", "ms sql", "microsoft sql server"],
+    "Redis": [],
+    "Docker": ["containers docker"],
+    "Kubernetes": ["k8s", "kube"],
+    "AWS": ["amazon web services", "amazon aws"],
+    "Azure": ["microsoft azure"],
+    "GCP": ["google cloud", "google cloud platform"],
+    "Terraform": [],
+    "Linux": ["gnu/linux", "unix"],
+    "Git": ["github", "gitlab", "controle de versao"],
+    "CI/CD": ["cicd", "integracao continua", "github actions", "jenkins"],
+    "React": ["reactjs", "react.js"],
+    "Angular": ["angularjs", "angular.js"],
+    "Vue.js": ["vue", "vuejs"],
+    "Node.js": ["node", "nodejs"],
+    "HTML": ["html5"],
+    "CSS": ["css3", "sass", "scss"],
+    "Django": [],
+    "FastAPI": ["fast api"],
+    "Flask": [],
+    "Spring": ["spring boot", "springboot"],
+    "Pandas": [],
+    "NumPy": [],
+    "Spark": ["apache spark", "pyspark"],
+    "Machine Learning": ["ml", "aprendizado de maquina", "scikit-learn", "sklearn"],
+    "Power BI": ["powerbi", "pbi"],
+    "Excel": ["microsoft excel", "ms excel", "excel avancado"],
+    "Tableau": [],
+    "Scrum": [],
+    "Kanban": [],
+    "Figma": [],
+    "Selenium": [],
+    "Redes": ["redes de computadores", "networking"],
+    "Segurança da informação": ["seguranca", "infosec", "ciberseguranca", "cybersecurity"],
+}
+
+
+def chave(texto):
+    """Chave de comparação: sem acentos, minúsculas, só [a-z0-9+#]."""
+    texto = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode().lower()
+    return re.sub(r"[^a-z0-9+#]", "", texto)
+
+
+class SkillDictionary:
+    """
+    Vocabulário em memória (alias -> (id, nome)), carregado da coleção `skills`.
+    Skills desconhecidas são registradas na coleção (ids de `reserve_ids`, ex: IdAllocator).
+    """
+
+    def __init__(self, collection_getter, reserve_ids):
+        self._collection_getter = collection_getter
+        self._reserve_ids = reserve_ids
+        self._por_alias = {}
+        self._nomes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._nomes)
+
+    def _adicionar(self, doc):
+        self._nomes[doc["id"]] = doc["nome"]
+        for alias in doc.get("aliases", []):
+            self._por_alias[alias] = (doc["id"], doc["nome"])
+
+    def carregar(self, semear=True):
+        """Lê o vocabulário (e, na primeira vez, grava as skills de VOCABULARIO que faltam)."""
+        collection = self._collection_getter()
+        if collection is None:
+            return False
+        if semear:
+            self.semear(collection)
+        with self._lock:
+            self._por_alias.clear()
+            self._nomes.clear()
+            for doc in collection.find({}, {"id": 1, "nome": 1, "aliases": 1}):
+                self._adicionar(doc)
+        return True
+
+    def semear(self, collection):
+        existentes = {doc["_id"] for doc in collection.find({"_id": {"$in": [chave(n) for n in VOCABULARIO]}}, {"_id": 1})}
+        faltando = [nome for nome in VOCABULARIO if chave(nome) not in existentes]
+        operacoes = []
+        if faltando:
+            for nome, novo_id in zip(faltando, self._reserve_ids(len(faltando))):
+                operacoes.append(UpdateOne(
+                    {"_id": chave(nome)},
+                    {"$setOnInsert": {"id": novo_id, "nome": nome}},
+                    upsert=True
+                ))
+        #Aliases do VOCABULARIO entram também em skills já existentes
+        for nome, aliases in VOCABULARIO.items():
+            operacoes.append(UpdateOne(
+                {"_id": chave(nome)},
+                {"$addToSet": {"aliases": {"$each": sorted({chave(nome), *map(chave, aliases)})}}}
+            ))
+        try:
+            collection.bulk_write(operacoes, ordered=False)
+        except BulkWriteError as e:
+            #Alias já usado por outra skill (índice único): mantém o cadastro existente
+            print(f"⚠️ {len(e.details.get('writeErrors', []))} aliases do vocabulário padrão ignorados (já em uso).")
+
+    def procurar(self, texto):
+        """(id, nome canônico) do texto digitado, ou None. Aceita sufixo de versão ("python3", "c++17")."""
+        k = chave(texto)
+        if not k:
+            return None
+        encontrado = self._por_alias.get(k)
+        if encontrado is None:
+            sem_versao = re.sub(r"v?\d+$", "", k)
+            if sem_versao and sem_versao != k:
+                encontrado = self._por_alias.get(sem_versao)
+        return encontrado
+
+    def _registrar(self, texto):
+        collection = self._collection_getter()
+        if collection is None:
+            return None
+        k = chave(texto)
+        nome = str(texto).strip()
+        novo_id = next(iter(self._reserve_ids(1)))
+        try:
+            collection.insert_one({"_id": k, "id": novo_id, "nome": nome, "aliases": [k]})
+            doc = {"id": novo_id, "nome": nome, "aliases": [k]}
+        except DuplicateKeyError:
+            #Outro processo registrou a mesma skill antes
+            doc = collection.find_one({"aliases": k}, {"id": 1, "nome": 1, "aliases": 1})
+            if doc is None:
+                return None
+        with self._lock:
+            self._adicionar(doc)
+        return doc["id"], doc["nome"]
+
+    def normalizar(self, textos, registrar=True):
+        """
+        (nomes canônicos, ids) das skills digitadas, sem repetições e na ordem original.
+        Com registrar=False, skills desconhecidas mantêm o texto e ficam sem id.
+        """
+        nomes, ids = [], []
+        for texto in textos:
+            encontrado = self.procurar(texto)
+            if encontrado is None and registrar and chave(texto):
+                try:
+                    encontrado = self._registrar(texto)
+                except PyMongoError as e:
+                    print(f"⚠️ Erro ao registrar a skill '{texto}': {e}")
+            if encontrado is None:
+                if texto not in nomes:
+                    nomes.append(texto)
+                continue
+            skill_id, nome = encontrado
+            if skill_id not in ids:
+                ids.append(skill_id)
+                nomes.append(nome)
+        return nomes, ids
+
+    def nomes(self, ids):
+        return [self._nomes.get(skill_id, f"#{skill_id}") for skill_id in ids]
+
+    def adicionar_alias(self, alias, nome_canonico):
+        """Liga um alias a uma skill existente (as próximas gravações passam a reconhecê-lo)."""
+        collection = self._collection_getter()
+        alvo = self.procurar(nome_canonico)
+        if collection is None or alvo is None:
+            raise ValueError(f"Skill '{nome_canonico}' não está no vocabulário.")
+        collection.update_one({"id": alvo[0]}, {"$addToSet": {"aliases": chave(alias)}})
+        with self._lock:
+            self._por_alias[chave(alias)] = alvo
+
+
+def _popcount(matriz):
+    """Bits ligados de cada elemento de uma matriz uint64."""
+    if hasattr(np, "bitwise_count"):  #NumPy 2.x
+        return np.bitwise_count(matriz)
+    bytes_ = np.ascontiguousarray(matriz).view(np.uint8)
+    return _POPCOUNT8[bytes_].reshape(*matriz.shape, 8).sum(axis=-1)
+
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class SkillIndex:
+    """
+    Bitsets de skill_ids de uma coleção (uma linha por documento) em uma matriz uint64 contígua.
+    A atualização é incremental (marca d'água em _id e em skills_atualizado_em, que os formulários
+    e a importação gravam no próprio insert e o backfill com $currentDate); a marca de tempo é
+    consultada com a folga ATRASO_MARCA_DAGUA.
+    """
+
+    def __init__(self, collection_getter, refresh_interval=30.0):
+        self._collection_getter = collection_getter
+        self.refresh_interval = refresh_interval
+        self._bits = np.zeros((0, 1), dtype=np.uint64)
+        self._size = 0
+        self._ids = []
+        self._row_by_id = {}
+        self._watermark_id = None
+        self._watermark_ts = None
+        self._last_refresh = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._size
+
+    def _ensure_capacity(self, linhas, maior_skill):
+        palavras = max(self._bits.shape[1], maior_skill // 64 + 1)
+        capacidade = self._bits.shape[0]
+        if self._size + linhas > capacidade:
+            capacidade = max(self._size + linhas, 2 * capacidade, 1024)
+        if (capacidade, palavras) != self._bits.shape:
+            novo = np.zeros((capacidade, palavras), dtype=np.uint64)
+            novo[:self._size, :self._bits.shape[1]] = self._bits[:self._size]
+            self._bits = novo
+
+    def upsert(self, doc_id, skill_ids):
+        skill_ids = [int(s) for s in skill_ids or () if isinstance(s, int) and s >= 0]
+        with self._lock:
+            self._ensure_capacity(1, max(skill_ids, default=0))
+            row = self._row_by_id.get(doc_id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._ids.append(doc_id)
+                self._row_by_id[doc_id] = row
+            self._bits[row] = 0
+            for skill_id in skill_ids:
+                self._bits[row, skill_id // 64] |= np.uint64(1) << np.uint64(skill_id % 64)
+
+    def _refresh_query(self):
+        query = {"skill_ids.0": {"$exists": True}}
+        if self._watermark_id is None:
+            return query
+        incremental = [{"_id": {"$gt": self._watermark_id}}]
+        if self._watermark_ts is not None:
+            #Relê a janela de ATRASO_MARCA_DAGUA (relógios diferentes entre processos)
+            incremental.append({"skills_atualizado_em": {"$gte": self._watermark_ts - ATRASO_MARCA_DAGUA}})
+        return {"$and": [query, {"$or": incremental}]}
+
+    def refresh(self, force=False):
+        """Lê do Mongo só o que mudou desde a última marca d'água. Retorna quantos documentos leu."""
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+                return 0
+            collection = self._collection_getter()
+            if collection is None:
+                return 0
+            lidos = 0
+            try:
+                for doc in collection.find(self._refresh_query(), {"skill_ids": 1, "skills_atualizado_em": 1}):
+                    self.upsert(doc["_id"], doc.get("skill_ids"))
+                    lidos += 1
+                    if self._watermark_id is None or doc["_id"] > self._watermark_id:
+                        self._watermark_id = doc["_id"]
+                    ts = doc.get("skills_atualizado_em")
+                    if ts is not None and (self._watermark_ts is None or ts > self._watermark_ts):
+                        self._watermark_ts = ts
+            except PyMongoError as e:
+                print(f"⚠️ Erro ao atualizar o índice de skills: {e}")
+                return lidos
+            self._last_refresh = time.monotonic()
+            return lidos
+
+    def rank(self, skill_ids, minimo=1, limite=50):
+        """
+        [(_id, skills em comum)] dos documentos com pelo menos `minimo` das skills pedidas,
+        da maior sobreposição para a menor (empate: os mais recentes primeiro).
+        """
+        mascaras = {}
+        for skill_id in {int(s) for s in skill_ids if isinstance(s, int) and s >= 0}:
+            mascaras[skill_id // 64] = mascaras.get(skill_id // 64, 0) | (1 << (skill_id % 64))
+        with self._lock:
+            n = self._size
+            if n == 0 or not mascaras:
+                return []
+            palavras = [p for p in mascaras if p < self._bits.shape[1]]
+            if not palavras:
+                return []
+            q = np.array([mascaras[p] for p in palavras], dtype=np.uint64)
+            sobreposicao = _popcount(self._bits[:n, palavras] & q).sum(axis=1).astype(np.int64)
+
+            linhas = np.flatnonzero(sobreposicao >= max(1, minimo))
+            if linhas.size > limite:
+                #Top-`limite` por (sobreposição, linha): a linha mais alta é o documento mais novo
+                chave_ordem = sobreposicao[linhas] * (n + 1) + linhas
+                linhas = linhas[np.argpartition(-chave_ordem, limite)[:limite]]
+            linhas = linhas[np.lexsort((-linhas, -sobreposicao[linhas]))]
+            return [(self._ids[row], int(sobreposicao[row])) for row in linhas]
+
+
+def ranquear_no_mongo(collection, skill_ids, minimo=1, limite=50):
+    """Mesmo ranking do SkillIndex calculado no MongoDB (índice multikey em skill_ids); linha de base."""
+    pipeline = [
+        {"$match": {"skill_ids": {"$in": list(skill_ids)}}},
+        {"$project": {"comum": {"$size": {"$setIntersection": ["$skill_ids", list(skill_ids)]}}}},
+        {"$match": {"comum": {"$gte": max(1, minimo)}}},
+        {"$sort": {"comum": -1, "_id": -1}},
+        {"$limit": limite}
+    ]
+    return [(doc["_id"], doc["comum"]) for doc in collection.aggregate(pipeline)]
+
+
+def backfill(collection, dicionario, lote=1000, progresso=True):
+    """Normaliza `skills` e grava `skill_ids` dos documentos que ainda não têm. Retorna quantos atualizou."""
+    atualizados = 0
+    ultimo = None
+    while True:
+        filtro = {"skill_ids": {"$exists": False}}
+        if ultimo is not None:
+            filtro["_id"] = {"$gt": ultimo}
+        docs = list(collection.find(filtro, {"skills": 1}).sort("_id", 1).limit(lote))
+        if not docs:
+            return atualizados
+        ultimo = docs[-1]["_id"]
+        operacoes = []
+        for doc in docs:
+            skills = doc.get("skills")
+            if isinstance(skills, str):
+                skills = [s for s in re.split(r"[;,\n]", skills) if s.strip()]
+            nomes, ids = dicionario.normalizar(skills if isinstance(skills, list) else [])
+            operacoes.append(UpdateOne({"_id": doc["_id"]}, {
+                "$set": {"skills": nomes, "skill_ids": ids},
+                "$currentDate": {"skills_atualizado_em": True}  #Marca d'água do SkillIndex (relógio do servidor)
+            }))
+        collection.bulk_write(operacoes, ordered=False)
+        atualizados += len(operacoes)
+        if progresso:
+            print(f"… {collection.name}: {atualizados} documentos normalizados ({len(dicionario)} skills no vocabulário)")
+
+
+def main():
+    from db_connection import get_collections, get_skill_dictionary, ensure_indexes
+
+    parser = argparse.ArgumentParser(description="Vocabulário canônico de skills.")
+    parser.add_argument("--alias", action="append", default=[], metavar="ALIAS=CANONICO",
+                        help="Liga um alias a uma skill existente (pode repetir).")
+    parser.add_argument("--backfill", action="store_true", help="Normaliza as skills dos documentos antigos.")
+    parser.add_argument("--lote", type=int, default=1000)
+    args = parser.parse_args()
+
+    col_vagas, col_curriculos, _ = get_collections()
+    if col_vagas is None:
+        print("❌ Erro crítico: não conectou ao MongoDB.")
+        return 1
+    ensure_indexes()
+    dicionario = get_skill_dictionary()
+
+    for par in args.alias:
+        alias, _, canonico = par.partition("=")
+        try:
+            dicionario.adicionar_alias(alias, canonico)
+            print(f"✅ '{alias}' -> {canonico}")
+        except (ValueError, PyMongoError) as e:
+            print(f"❌ {e}")
+            return 1
+
+    if args.backfill:
+        for collection in (col_vagas, col_curriculos):
+            total = backfill(collection, dicionario, max(1, args.lote))
+            print(f"✅ {collection.name}: {total} documentos com skill_ids")
+    print(f"📚 {len(dicionario)} skills no vocabulário")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
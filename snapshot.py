@@ -0,0 +1,267 @@
+"""
+Snapshot colunar (Parquet) das coleções, para análise e para o warm start do índice local.
+
+Exportação:
+    python -m snapshot --saida snapshots/
+    python -m snapshot --saida snapshots/ --colecoes vagas curriculos --lote 2000
+
+Gera um arquivo <colecao>.parquet por coleção, com colunas tipadas (texto, inteiro, float,
+timestamp UTC, listas de texto e de skill_ids). O embedding vira uma coluna de lista de tamanho fixo de float32
+(EMBEDDING_DIM), já normalizada, em vez dos ~10 KB de JSON por vetor de um find() comum; documentos
+sem vetor ficam com embedding nulo. `usuarios` é exportada sem o password_hash.
+
+A leitura usa o cursor em lotes (--lote documentos por row group), então a memória não cresce com
+a coleção. O arquivo é escrito em <colecao>.parquet.tmp e renomeado no final: quem lê nunca vê um
+snapshot pela metade. O horário de início da exportação (relógio do servidor do MongoDB, o mesmo
+do $currentDate) fica nos metadados do arquivo.
+
+Leitura:
+- ler_snapshot(pasta, colecao, colunas) devolve uma pyarrow.Table (`.to_pandas()` para análise);
+- aquecer_indice(index, caminho) carrega o LocalVectorIndex direto do arquivo. As marcas d'água
+  ficam no início da exportação, então o próximo refresh só lê do Atlas o que mudou desde então
+  (VECTOR_SNAPSHOT_DIR em db_connection.get_local_index).
+
+O pyarrow é opcional: só é importado por este módulo, na primeira chamada.
+"""
+import os
+import argparse
+import datetime
+import time
+import numpy as np
+from embedding_storage import unpack_embedding
+from vector_index import EMBEDDING_DIM, ATRASO_MARCA_DAGUA
+
+#Versão do layout do arquivo (metadado "versao"); o warm start ignora versões diferentes
+VERSAO_SNAPSHOT = "1"
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("O snapshot precisa do pacote pyarrow (pip install pyarrow).")
+    return pa, pq
+
+
+def esquemas(pa):
+    """Colunas exportadas de cada coleção: lista de (campo, tipo arrow). Campos fora daqui são ignorados."""
+    texto, inteiro, real = pa.string(), pa.int64(), pa.float64()
+    data = pa.timestamp("ms", tz="UTC")
+    lista_texto = pa.list_(pa.string())
+    lista_inteiros = pa.list_(pa.int64())
+    embedding = pa.list_(pa.float32(), EMBEDDING_DIM)
+    campos_embedding = [("embedding", embedding), ("embedding_modelo", texto), ("embedding_atualizado_em", data)]
+    return {
+        "vagas": [
+            ("_id", texto), ("id", inteiro), ("titulo", texto), ("descricao", texto), ("empresa", texto),
+            ("cidade", texto), ("estado", texto), ("tipo_contratacao", texto), ("salario", real),
+            ("skills", lista_texto), ("skill_ids", lista_inteiros), ("data_cadastro", data), *campos_embedding
+        ],
+        "curriculos": [
+            ("_id", texto), ("id", inteiro), ("nome", texto), ("email", texto), ("telefone", texto),
+            ("formacao", texto), ("experiencia", texto), ("resumo", texto), ("skills", lista_texto),
+            ("skill_ids", lista_inteiros), ("idiomas", lista_texto), ("certificacoes", lista_texto),
+            ("empresas_previas", lista_texto), ("data_cadastro", data), *campos_embedding
+        ],
+        "usuarios": [
+            ("_id", texto), ("email", texto), ("tipo_usuario", texto), ("empresa", texto),
+            ("id_curriculo", inteiro), ("data_cadastro", data)
+        ]
+    }
+
+
+#Campos que nunca saem do banco
+CAMPOS_EXCLUIDOS = {"usuarios": ("password_hash",)}
+
+
+def _coagir(valor, tipo, pa):
+    """Valor do documento no tipo da coluna (None se ausente ou incompatível, ex: dado legado)."""
+    if valor is None:
+        return None
+    if pa.types.is_string(tipo):
+        return str(valor)
+    if pa.types.is_integer(tipo) or pa.types.is_floating(tipo):
+        if isinstance(valor, bool):
+            return None
+        try:
+            return int(valor) if pa.types.is_integer(tipo) else float(valor)
+        except (TypeError, ValueError):
+            return None
+    if pa.types.is_timestamp(tipo):
+        return valor if isinstance(valor, datetime.datetime) else None
+    if pa.types.is_list(tipo):
+        if not isinstance(valor, (list, tuple)):
+            return None
+        itens = [_coagir(item, tipo.value_type, pa) for item in valor]
+        return [item for item in itens if item is not None]
+    return None
+
+
+def _coluna_embedding(valores, tipo, pa):
+    """Lista de tamanho fixo float32 a partir dos vetores em qualquer formato (normalizados; nulo se ausente)."""
+    matriz = np.zeros((len(valores), EMBEDDING_DIM), dtype=np.float32)
+    nulos = np.ones(len(valores), dtype=bool)
+    for i, valor in enumerate(valores):
+        vetor = unpack_embedding(valor)
+        if vetor is None or vetor.shape != (EMBEDDING_DIM,):
+            continue
+        norma = np.linalg.norm(vetor)
+        if norma > 0:
+            matriz[i] = vetor / norma
+            nulos[i] = False
+    return pa.FixedSizeListArray.from_arrays(pa.array(matriz.ravel(), type=pa.float32()), type=tipo, mask=pa.array(nulos))
+
+
+def _lote_para_tabela(docs, campos, schema, pa):
+    colunas = []
+    for campo, tipo in campos:
+        valores = [doc.get(campo) for doc in docs]
+        if campo == "embedding":
+            colunas.append(_coluna_embedding(valores, tipo, pa))
+        else:
+            colunas.append(pa.array([_coagir(v, tipo, pa) for v in valores], type=tipo))
+    return pa.Table.from_arrays(colunas, schema=schema)
+
+
+def hora_servidor(db):
+    """Hora atual do servidor do MongoDB (UTC): não depende do relógio da máquina que exporta."""
+    hora = db.command("hello")["localTime"]
+    return hora.replace(tzinfo=datetime.timezone.utc) if hora.tzinfo is None else hora
+
+
+def exportar_colecao(collection, colecao, caminho, lote=5000, compressao="zstd", progresso=True):
+    """Exporta a coleção para `caminho` (Parquet). Retorna o número de documentos exportados."""
+    pa, pq = _pyarrow()
+    campos = esquemas(pa)[colecao]
+    exportado_em = hora_servidor(collection.database)
+    schema = pa.schema([pa.field(campo, tipo) for campo, tipo in campos]).with_metadata({
+        "colecao": colecao,
+        "exportado_em": exportado_em.isoformat(),
+        "embedding_dim": str(EMBEDDING_DIM),
+        "versao": VERSAO_SNAPSHOT
+    })
+
+    projecao = {campo: 0 for campo in CAMPOS_EXCLUIDOS.get(colecao, ())} or None
+    cursor = collection.find({}, projecao, batch_size=lote).sort("_id", 1)
+
+    temporario = f"{caminho}.tmp"
+    total = 0
+    inicio = time.perf_counter()
+    try:
+        with pq.ParquetWriter(temporario, schema, compression=compressao) as writer:
+            docs = []
+            for doc in cursor:
+                docs.append(doc)
+                if len(docs) >= lote:
+                    writer.write_table(_lote_para_tabela(docs, campos, schema, pa))
+                    total += len(docs)
+                    docs = []
+                    if progresso:
+                        print(f"… {colecao}: {total} documentos ({total / (time.perf_counter() - inicio):.0f}/s)")
+            if docs:
+                writer.write_table(_lote_para_tabela(docs, campos, schema, pa))
+                total += len(docs)
+        os.replace(temporario, caminho)
+    finally:
+        cursor.close()
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return total
+
+
+def caminho_snapshot(pasta, colecao):
+    return os.path.join(pasta, f"{colecao}.parquet")
+
+
+def metadados(caminho):
+    """Metadados do snapshot (colecao, exportado_em como datetime UTC, embedding_dim, versao)."""
+    _, pq = _pyarrow()
+    brutos = pq.read_schema(caminho).metadata or {}
+    meta = {chave.decode(): valor.decode() for chave, valor in brutos.items()}
+    if "exportado_em" in meta:
+        meta["exportado_em"] = datetime.datetime.fromisoformat(meta["exportado_em"])
+    return meta
+
+
+def ler_snapshot(pasta, colecao, colunas=None):
+    """Tabela arrow do snapshot (só as colunas pedidas: o Parquet não lê as demais do disco)."""
+    _, pq = _pyarrow()
+    return pq.read_table(caminho_snapshot(pasta, colecao), columns=colunas)
+
+
+def aquecer_indice(index, caminho, idade_maxima=None, lote=50000):
+    """
+    Carrega o LocalVectorIndex a partir do snapshot, antes do primeiro refresh.
+    Retorna quantos vetores foram carregados (0 se o arquivo for de outra versão/dimensão ou
+    mais velho que idade_maxima, um timedelta; nesse caso o índice carrega do Mongo como antes).
+    """
+    _, pq = _pyarrow()
+    import pyarrow.compute as pc
+    from bson import ObjectId
+
+    meta = metadados(caminho)
+    exportado_em = meta.get("exportado_em")
+    if meta.get("versao") != VERSAO_SNAPSHOT or meta.get("embedding_dim") != str(index.dim) or exportado_em is None:
+        print(f"⚠️ Snapshot {caminho} incompatível com o índice. Ignorando.")
+        return 0
+    if idade_maxima is not None and datetime.datetime.now(datetime.timezone.utc) - exportado_em > idade_maxima:
+        print(f"⚠️ Snapshot {caminho} exportado em {exportado_em:%d/%m %H:%M} está velho demais. Ignorando.")
+        return 0
+
+    arquivo = pq.ParquetFile(caminho)
+    disponiveis = set(arquivo.schema_arrow.names)
+    campos = [c for c in dict.fromkeys((*index.return_fields, *index.filter_fields)) if c in disponiveis]
+
+    carregados = 0
+    for batch in arquivo.iter_batches(batch_size=lote, columns=["_id", "embedding", *campos]):
+        batch = batch.filter(pc.is_valid(batch.column("embedding")))
+        if batch.num_rows == 0:
+            continue
+        vetores = batch.column("embedding").flatten().to_numpy(zero_copy_only=False).reshape(-1, index.dim)
+        ids = [ObjectId(valor) for valor in batch.column("_id").to_pylist()]
+        colunas = {campo: batch.column(campo).to_pylist() for campo in campos}
+        docs = [{campo: colunas[campo][i] for campo in campos} for i in range(batch.num_rows)]
+        carregados += index.bulk_load(ids, vetores, docs)
+
+    #O Mongo devolve datas sem fuso (UTC); as marcas d'água seguem o mesmo formato.
+    #Tudo o que entrou ou foi vetorizado depois do início da exportação volta no próximo refresh.
+    #Os _id (ObjectId) são gerados pelo relógio de cada app: recua a marca de _id a mesma folga
+    #que o refresh já aplica à marca de tempo.
+    inicio = exportado_em.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    index.set_watermarks(ObjectId.from_datetime(inicio - ATRASO_MARCA_DAGUA), inicio)
+    return carregados
+
+
+def main():
+    from db_connection import get_db, COL_VAGAS, COL_CURRICULOS, COL_USUARIOS
+
+    parser = argparse.ArgumentParser(description="Exporta as coleções para Parquet (análise e warm start).")
+    parser.add_argument("--saida", required=True, help="Pasta dos arquivos <colecao>.parquet.")
+    parser.add_argument("--colecoes", nargs="+", choices=(COL_VAGAS, COL_CURRICULOS, COL_USUARIOS),
+                        default=[COL_VAGAS, COL_CURRICULOS, COL_USUARIOS])
+    parser.add_argument("--lote", type=int, default=5000, help="Documentos por lote do cursor / row group.")
+    parser.add_argument("--compressao", default="zstd", help="Codec do Parquet (zstd, snappy, gzip, none).")
+    args = parser.parse_args()
+
+    db = get_db(read_only=True)
+    if db is None:
+        print("❌ Erro crítico: não conectou ao MongoDB.")
+        return 1
+
+    os.makedirs(args.saida, exist_ok=True)
+    for colecao in args.colecoes:
+        caminho = caminho_snapshot(args.saida, colecao)
+        inicio = time.perf_counter()
+        try:
+            total = exportar_colecao(db[colecao], colecao, caminho, max(1, args.lote), args.compressao)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            return 1
+        tamanho = os.path.getsize(caminho) / 1024 / 1024
+        print(f"✅ {colecao}: {total} documentos em {time.perf_counter() - inicio:.1f}s -> {caminho} ({tamanho:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,81 @@
+"""
+Modo de profiling da inicialização das páginas (variável de ambiente STARTUP_PROFILE=1).
+
+Cada página chama `begin(__file__)` antes dos imports, `imports_done()` depois deles e
+`rendered()` no fim do script. Só a primeira execução de cada página no processo é medida
+(a que o usuário sente num cold start do container): tempo de import, módulos carregados por
+ela e tempo até a primeira renderização completa. Os números vão para o histograma
+`startup_seconds{pagina, fase}` do metrics (página Métricas / Prometheus) e para o log.
+
+Sem STARTUP_PROFILE as funções não fazem nada. Este módulo só usa a biblioteca padrão
+(o metrics é importado depois que a página já carregou o pymongo).
+"""
+import os
+import sys
+import time
+import threading
+
+ATIVO = os.environ.get("STARTUP_PROFILE", "").lower() in ("1", "true", "sim")
+
+_lock = threading.Lock()
+#Páginas que já tiveram a primeira renderização medida neste processo
+_medidas = set()
+#Cada sessão do Streamlit roda o script no seu próprio thread
+_atual = threading.local()
+#Resultados da primeira execução de cada página (para a página Métricas)
+resultados = []
+
+
+def _nome(arquivo):
+    return os.path.splitext(os.path.basename(arquivo))[0]
+
+
+def begin(arquivo):
+    """Início do script da página (antes de qualquer import pesado)."""
+    if not ATIVO:
+        return
+    pagina = _nome(arquivo)
+    with _lock:
+        if pagina in _medidas:
+            _atual.run = None
+            return
+    _atual.run = {"pagina": pagina, "inicio": time.perf_counter(), "modulos": set(sys.modules)}
+
+
+def imports_done():
+    """Fim dos imports da página."""
+    run = getattr(_atual, "run", None)
+    if run is None:
+        return
+    run["imports_s"] = time.perf_counter() - run["inicio"]
+    #Pacotes de topo carregados pelos imports desta página (ex: google, pandas)
+    run["novos"] = sorted({nome.split(".")[0] for nome in set(sys.modules) - run.pop("modulos")})
+
+
+def rendered():
+    """Fim do script: registra a primeira renderização da página (uma vez por processo)."""
+    run = getattr(_atual, "run", None)
+    if run is None or "imports_s" not in run:
+        return
+    _atual.run = None
+    with _lock:
+        if run["pagina"] in _medidas:
+            return
+        _medidas.add(run["pagina"])
+
+    total = time.perf_counter() - run["inicio"]
+    from metrics import observe
+    observe("startup_seconds", run["imports_s"], pagina=run["pagina"], fase="imports")
+    observe("startup_seconds", total, pagina=run["pagina"], fase="primeira_renderizacao")
+
+    resultado = {
+        "pagina": run["pagina"],
+        "imports_ms": 1000.0 * run["imports_s"],
+        "primeira_renderizacao_ms": 1000.0 * total,
+        "modulos_novos": ", ".join(run["novos"])
+    }
+    with _lock:
+        resultados.append(resultado)
+    print(f"⏱️ [startup] {resultado['pagina']}: imports {resultado['imports_ms']:.0f} ms, "
+          f"primeira renderização {resultado['primeira_renderizacao_ms']:.0f} ms "
+          f"(carregou: {resultado['modulos_novos'] or '-'})")
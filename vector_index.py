@@ -0,0 +1,315 @@
+import time
+import datetime
+import threading
+import numpy as np
+from pymongo.errors import PyMongoError
+from embedding_storage import unpack_embedding, EMBEDDING_PRESENTE
+
+#Dimensão dos vetores do text-embedding-004
+EMBEDDING_DIM = 768
+#Folga da marca d'água de tempo: as datas vêm do relógio de cada processo/servidor e uma escrita
+#confirmada depois do refresh pode ter data um pouco anterior à maior já lida. O refresh relê essa
+#janela (o upsert é idempotente) para não perder o documento.
+ATRASO_MARCA_DAGUA = datetime.timedelta(seconds=120)
+
+
+class LocalVectorIndex:
+    """
+    Índice vetorial em memória (busca exata), usado quando o Atlas Vector Search não está disponível.
+
+    Os embeddings ficam normalizados em uma matriz float32 contígua; a busca é um único
+    produto matriz-vetor seguido de argpartition para o top-k.
+    A atualização é incremental: só lê documentos com _id acima da marca d'água ou com
+    `embedding_atualizado_em` mais recente (vetores gerados depois do insert pelo backfill/worker),
+    com a folga ATRASO_MARCA_DAGUA na marca de tempo.
+
+    Com uma redução (embedding_reduction.Reducao), mantém também a matriz reduzida e aceita a
+    busca em dois estágios: `search(..., shortlist=n)` ranqueia todos os candidatos na matriz
+    reduzida, guarda os n melhores e só reordena esses com os vetores completos.
+    """
+
+    def __init__(self, collection_getter, return_fields, filter_fields=(), dim=EMBEDDING_DIM,
+                 refresh_interval=30.0, reduction=None):
+        self._collection_getter = collection_getter
+        self.return_fields = dict(return_fields)
+        self.filter_fields = tuple(filter_fields)
+        self.dim = dim
+        self.refresh_interval = refresh_interval
+
+        #Buffer com capacidade extra (cresce dobrando) para não copiar a matriz a cada refresh
+        self._matrix = np.empty((0, dim), dtype=np.float32)
+        self.reduction = reduction
+        self._reduced = np.empty((0, reduction.dim if reduction else 0), dtype=np.float32)
+        self._size = 0
+        self._ids = []
+        self._meta = []
+        self._row_by_id = {}
+
+        #Valores dos campos de filtro por linha (colunas NumPy montadas sob demanda)
+        self._filter_values = {field: [] for field in self.filter_fields}
+        self._filter_arrays = {}
+
+        self._watermark_id = None
+        self._watermark_ts = None
+        self._last_refresh = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._size
+
+    def _ensure_capacity(self, extra):
+        needed = self._size + extra
+        if needed <= self._matrix.shape[0]:
+            return
+        capacity = max(needed, 2 * self._matrix.shape[0], 1024)
+        new_matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        new_matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = new_matrix
+        if self.reduction is not None:
+            new_reduced = np.empty((capacity, self.reduction.dim), dtype=np.float32)
+            new_reduced[:self._size] = self._reduced[:self._size]
+            self._reduced = new_reduced
+
+    def set_reduction(self, reduction):
+        """Troca a redução (ex: PCA reajustado) recalculando a matriz reduzida de uma vez."""
+        with self._lock:
+            self.reduction = reduction
+            if reduction is None:
+                self._reduced = np.empty((0, 0), dtype=np.float32)
+                return
+            self._reduced = np.empty((self._matrix.shape[0], reduction.dim), dtype=np.float32)
+            if self._size:
+                self._reduced[:self._size] = reduction.projetar(self._matrix[:self._size])
+
+    def _normalize(self, vector):
+        #Aceita array de doubles, binário float32/int8 ou ndarray
+        vector = unpack_embedding(vector)
+        if vector is None or vector.shape != (self.dim,):
+            return None
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def _refresh_query(self):
+        query = EMBEDDING_PRESENTE  #Só documentos com vetor preenchido (qualquer formato)
+        if self._watermark_id is None:
+            return query
+        incremental = [{"_id": {"$gt": self._watermark_id}}]
+        if self._watermark_ts is not None:
+            incremental.append({"embedding_atualizado_em": {"$gte": self._watermark_ts - ATRASO_MARCA_DAGUA}})
+        return {"$and": [query, {"$or": incremental}]}
+
+    def upsert(self, doc):
+        """Insere ou substitui a linha de um documento (precisa de _id e embedding)."""
+        vector = self._normalize(doc.get("embedding"))
+        if vector is None:
+            return False
+        meta = {field: doc[field] for field in self.return_fields if field in doc}
+        with self._lock:
+            row = self._row_by_id.get(doc["_id"])
+            if row is None:
+                self._ensure_capacity(1)
+                row = self._size
+                self._size += 1
+                self._ids.append(doc["_id"])
+                self._meta.append(meta)
+                self._row_by_id[doc["_id"]] = row
+                for field in self.filter_fields:
+                    self._filter_values[field].append(doc.get(field))
+            else:
+                self._meta[row] = meta
+                for field in self.filter_fields:
+                    self._filter_values[field][row] = doc.get(field)
+            self._matrix[row] = vector
+            if self.reduction is not None:
+                self._reduced[row] = self.reduction.projetar(vector)
+            self._filter_arrays.clear()
+        return True
+
+    def bulk_load(self, ids, vectors, docs):
+        """
+        Carga em bloco (warm start a partir de um snapshot): vectors é uma matriz (n, dim) e docs
+        traz os campos de retorno/filtro de cada linha. Linhas novas entram em uma cópia só;
+        _ids já presentes passam pelo upsert. Retorna quantos vetores foram carregados.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(vectors, axis=1)
+        with self._lock:
+            novos = []
+            carregados = 0
+            for i in np.flatnonzero(norms > 0):
+                if ids[i] in self._row_by_id:
+                    carregados += self.upsert({"_id": ids[i], "embedding": vectors[i], **docs[i]})
+                else:
+                    novos.append(i)
+            if not novos:
+                return carregados
+
+            self._ensure_capacity(len(novos))
+            inicio, fim = self._size, self._size + len(novos)
+            self._matrix[inicio:fim] = vectors[novos] / norms[novos, None]
+            if self.reduction is not None:
+                self._reduced[inicio:fim] = self.reduction.projetar(self._matrix[inicio:fim])
+            for row, i in enumerate(novos, start=inicio):
+                doc = docs[i]
+                self._ids.append(ids[i])
+                self._meta.append({field: doc[field] for field in self.return_fields if field in doc})
+                self._row_by_id[ids[i]] = row
+                for field in self.filter_fields:
+                    self._filter_values[field].append(doc.get(field))
+            self._size = fim
+            self._filter_arrays.clear()
+        return carregados + len(novos)
+
+    def set_watermarks(self, watermark_id, watermark_ts):
+        """Marcas d'água após um warm start: o próximo refresh só lê o que mudou depois delas."""
+        with self._lock:
+            self._watermark_id = watermark_id
+            self._watermark_ts = watermark_ts
+            self._last_refresh = 0.0
+
+    def refresh(self, force=False):
+        """
+        Lê do Mongo só o que mudou desde a última marca d'água.
+        Retorna quantos documentos foram carregados/atualizados.
+        """
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+                return 0
+
+            collection = self._collection_getter()
+            if collection is None:
+                return 0
+
+            projection = {"embedding": 1, "embedding_atualizado_em": 1, **self.return_fields}
+            projection.update({field: 1 for field in self.filter_fields})
+            loaded = 0
+            try:
+                for doc in collection.find(self._refresh_query(), projection):
+                    if self.upsert(doc):
+                        loaded += 1
+                    if self._watermark_id is None or doc["_id"] > self._watermark_id:
+                        self._watermark_id = doc["_id"]
+                    ts = doc.get("embedding_atualizado_em")
+                    if ts is not None and (self._watermark_ts is None or ts > self._watermark_ts):
+                        self._watermark_ts = ts
+            except PyMongoError as e:
+                #Mantém o que já está em memória; tenta de novo no próximo refresh
+                print(f"⚠️ Erro ao atualizar o índice local: {e}")
+                return loaded
+
+            self._last_refresh = time.monotonic()
+            if loaded:
+                print(f"🔄 Índice local: {loaded} vetores carregados ({self._size} no total).")
+            return loaded
+
+    def _column(self, field, numeric=False):
+        """Coluna do campo de filtro como array NumPy (objeto ou float com NaN para não numéricos)."""
+        key = (field, numeric)
+        if key not in self._filter_arrays:
+            values = self._filter_values[field][:self._size]
+            if numeric:
+                column = np.array([
+                    float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan
+                    for v in values
+                ], dtype=np.float64)
+            else:
+                column = np.empty(len(values), dtype=object)
+                column[:] = values
+            self._filter_arrays[key] = column
+        return self._filter_arrays[key]
+
+    def _mask(self, vector_filter):
+        """
+        Avalia o mesmo subconjunto de MQL aceito pelo filtro do $vectorSearch:
+        $and, $eq, $in, $gte, $lte, $gt, $lt.
+        """
+        if "$and" in vector_filter:
+            mask = np.ones(self._size, dtype=bool)
+            for condicao in vector_filter["$and"]:
+                mask &= self._mask(condicao)
+            return mask
+
+        mask = np.ones(self._size, dtype=bool)
+        for field, condicao in vector_filter.items():
+            if field not in self._filter_values:
+                raise ValueError(f"Campo '{field}' não é um campo de filtro do índice.")
+            if not isinstance(condicao, dict):
+                condicao = {"$eq": condicao}
+            for op, valor in condicao.items():
+                if op == "$eq":
+                    mask &= self._column(field) == valor
+                elif op == "$in":
+                    #Comparação elemento a elemento (np.isin ordenaria a coluna, que mistura None e str)
+                    column = self._column(field)
+                    em_lista = np.zeros(self._size, dtype=bool)
+                    for item in valor:
+                        em_lista |= column == item
+                    mask &= em_lista
+                elif op in ("$gte", "$lte", "$gt", "$lt"):
+                    column = self._column(field, numeric=True)
+                    with np.errstate(invalid="ignore"):
+                        if op == "$gte":
+                            mask &= column >= valor
+                        elif op == "$lte":
+                            mask &= column <= valor
+                        elif op == "$gt":
+                            mask &= column > valor
+                        else:
+                            mask &= column < valor
+                else:
+                    raise ValueError(f"Operador '{op}' não suportado no índice local.")
+        return mask
+
+    def search(self, query_vector, limit=5, vector_filter=None, shortlist=None):
+        """
+        Busca top-k por similaridade de cosseno: exata, ou em dois estágios com shortlist
+        (precisa de uma redução; o score final é sempre o do vetor completo).
+        vector_filter (MQL, como no $vectorSearch) restringe as linhas antes do ranking.
+        O score segue a escala do Atlas para cosseno: (1 + cos) / 2, em [0, 1].
+        """
+        query = self._normalize(query_vector)
+        if query is None:
+            return []
+
+        with self._lock:
+            n = self._size
+            if n == 0 or limit <= 0:
+                return []
+
+            if vector_filter:
+                rows = np.flatnonzero(self._mask(vector_filter))
+                if rows.size == 0:
+                    return []
+            else:
+                rows = None
+            candidatos = n if rows is None else rows.size
+
+            if shortlist and self.reduction is not None and max(shortlist, limit) < candidatos:
+                #1º estágio: ranking aproximado na matriz reduzida, só os `shortlist` melhores seguem
+                reduced = self._reduced[:n] if rows is None else self._reduced[rows]
+                coarse = reduced @ self.reduction.projetar(query)
+                finalistas = np.argpartition(-coarse, max(shortlist, limit))[:max(shortlist, limit)]
+                rows = finalistas if rows is None else rows[finalistas]
+                #2º estágio: vetores completos só dos finalistas
+                scores = self._matrix[rows] @ query
+            elif rows is not None:
+                scores = self._matrix[rows] @ query
+            else:
+                scores = self._matrix[:n] @ query
+
+            if limit < scores.size:
+                top = np.argpartition(-scores, limit)[:limit]
+            else:
+                top = np.arange(scores.size)
+            top = top[np.argsort(-scores[top])]
+
+            return [
+                {
+                    "_id": self._ids[row],
+                    "score": float((1.0 + score) / 2.0),
+                    **self._meta[row]
+                }
+                for row, score in zip(top if rows is None else rows[top], scores[top])
+            ]